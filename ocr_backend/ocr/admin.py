@@ -1,9 +1,112 @@
 # ocr/admin.py
 
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.urls import reverse
 from django.utils.html import format_html
-from django.utils.safestring import mark_safe
-from .models import OCRJob
+from .models import OCRJob, OCRPage
+from .services.dedup import result_cache
+from .services.search import search_jobs
+from .services.thumbnails import thumbnail_cache
+from .utils.pagination import (
+    EstimatedCountPaginator, decode_cursor, encode_cursor, newer_than, older_than
+)
+
+
+class OCRPageInline(admin.TabularInline):
+    """
+    Per-page results of multi-page jobs
+    """
+    model = OCRPage
+    fields = ['page_number', 'status', 'processing_time', 'error_message']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+    show_change_link = False
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Job list paged by (created_at, id) keyset instead of OFFSET
+
+    Every page is one range scan of the created_at index however deep
+    it is: ?after=<cursor> continues with older jobs, ?before=<cursor>
+    goes back to newer ones. The total comes from EstimatedCountPaginator.
+    """
+    
+    AFTER_VAR = 'after'
+    BEFORE_VAR = 'before'
+    
+    def __init__(self, request, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        # Filter and search links start again from the newest jobs
+        for var in (self.AFTER_VAR, self.BEFORE_VAR):
+            self.params.pop(var, None)
+            self.filter_params.pop(var, None)
+    
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for var in (self.AFTER_VAR, self.BEFORE_VAR):
+            lookup_params.pop(var, None)
+        return lookup_params
+    
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).defer(
+            *self.model_admin.list_defer
+        )
+    
+    def _cursor(self, request, var):
+        try:
+            value = request.GET.get(var)
+            return decode_cursor(value) if value else None
+        except ValueError:
+            return None
+    
+    def get_results(self, request):
+        paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+        size = self.list_per_page
+        ordered = self.queryset.order_by('-created_at', '-id')
+        after = self._cursor(request, self.AFTER_VAR)
+        before = self._cursor(request, self.BEFORE_VAR)
+        
+        if before is not None:
+            rows = list(
+                self.queryset.filter(newer_than(*before))
+                .order_by('created_at', 'id')[:size + 1]
+            )
+            has_newer, has_older = len(rows) > size, True
+            rows = rows[:size][::-1]
+        else:
+            if after is not None:
+                ordered = ordered.filter(older_than(*after))
+            rows = list(ordered[:size + 1])
+            has_newer, has_older = after is not None, len(rows) > size
+            rows = rows[:size]
+        
+        self.result_count = paginator.count
+        self.result_count_estimated = paginator.estimated
+        self.result_count_capped = paginator.capped
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = has_newer or has_older
+        self.paginator = paginator
+        self.newer_url = self.older_url = None
+        if rows and has_newer:
+            self.newer_url = self.get_query_string(
+                {self.BEFORE_VAR: encode_cursor(rows[0].created_at, rows[0].id)},
+                remove=[self.AFTER_VAR]
+            )
+        if rows and has_older:
+            self.older_url = self.get_query_string(
+                {self.AFTER_VAR: encode_cursor(rows[-1].created_at, rows[-1].id)},
+                remove=[self.BEFORE_VAR]
+            )
 
 
 @admin.register(OCRJob)
@@ -18,19 +121,19 @@ class OCRJobAdmin(admin.ModelAdmin):
         'file_size_display',
         'created_at',
         'processing_time_display',
+        'dedup_hit',
         'view_image_link'
     ]
     
     list_filter = [
         'status',
-        'created_at',
-        'updated_at'
+        'priority',
+        ('duplicate_of', admin.EmptyFieldListFilter)
     ]
     
     search_fields = [
-        'id',
-        'file_name',
-        'extracted_text'
+        '=id',
+        'file_name'
     ]
     
     readonly_fields = [
@@ -42,6 +145,20 @@ class OCRJobAdmin(admin.ModelAdmin):
         'file_size',
         'file_name',
         'processing_time',
+        'content_hash',
+        'duplicate_of',
+        'batch',
+        'pages_done',
+        'pages_total',
+        'priority',
+        'client_id',
+        'dispatched_at',
+        'started_at',
+        'detail',
+        'preprocess',
+        'engine_stats',
+        'timings',
+        'extracted_text',
         'image_preview'
     ]
     
@@ -51,17 +168,24 @@ class OCRJobAdmin(admin.ModelAdmin):
                 'id',
                 'status',
                 'file_name',
-                'file_size'
+                'file_size',
+                'batch',
+                'pages_done',
+                'pages_total'
             )
         }),
         ('Image', {
             'fields': (
                 'image',
-                'image_preview'
+                'image_preview',
+                'content_hash',
+                'duplicate_of'
             )
         }),
         ('Results', {
             'fields': (
+                'detail',
+                'preprocess',
                 'extracted_text',
                 'error_message'
             )
@@ -69,15 +193,55 @@ class OCRJobAdmin(admin.ModelAdmin):
         ('Timestamps', {
             'fields': (
                 'created_at',
+                'dispatched_at',
+                'started_at',
                 'updated_at',
                 'completed_at',
-                'processing_time'
+                'processing_time',
+                'timings',
+                'engine_stats'
+            )
+        }),
+        ('Scheduling', {
+            'fields': (
+                'priority',
+                'client_id'
             )
         }),
     )
     
     list_per_page = 25
-    date_hierarchy = 'created_at'
+    inlines = [OCRPageInline]
+    
+    # Large-table friendly changelist: keyset pages in created_at order,
+    # estimated counts, no column sorting and no heavy columns loaded
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    sortable_by = ()
+    list_defer = ('error_message', 'engine_stats', 'timings')
+    
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+    
+    def changelist_view(self, request, extra_context=None):
+        """Show deduplication cache counters above the job list"""
+        extra_context = extra_context or {}
+        extra_context['dedup_stats'] = result_cache.stats()
+        return super().changelist_view(request, extra_context=extra_context)
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match IDs and file names as usual, plus the extracted text through
+        the full-text index instead of a LIKE scan
+        """
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        if search_term and settings.OCR_SEARCH_ENABLED:
+            _, hits = search_jobs(search_term, limit=settings.OCR_SEARCH_ADMIN_LIMIT)
+            if hits:
+                results |= queryset.filter(id__in=[job_id for job_id, _ in hits])
+        return results, may_have_duplicates
     
     def status_badge(self, obj):
         """Display status as colored badge"""
@@ -116,9 +280,30 @@ class OCRJobAdmin(admin.ModelAdmin):
         return f"{obj.processing_time:.2f}s"
     processing_time_display.short_description = 'Processing Time'
     
+    def dedup_hit(self, obj):
+        """Whether the result was reused from an earlier upload"""
+        return obj.is_duplicate
+    dedup_hit.boolean = True
+    dedup_hit.short_description = 'Cache Hit'
+    
+    @staticmethod
+    def thumbnail_url(obj, size):
+        """Cached preview of the upload, or None where there is none"""
+        if not thumbnail_cache.enabled or not obj.content_hash:
+            return None
+        return reverse('ocr:thumbnail', args=[obj.content_hash, size])
+    
     def view_image_link(self, obj):
-        """Link to view the image"""
+        """Link to view the image, shown as a thumbnail when there is one"""
         if obj.image:
+            thumbnail = self.thumbnail_url(obj, 'thumb')
+            if thumbnail:
+                return format_html(
+                    '<a href="{}" target="_blank"><img src="{}" alt="View Image" '
+                    'loading="lazy" style="max-width: 64px; max-height: 64px;" /></a>',
+                    obj.image.url,
+                    thumbnail
+                )
             return format_html(
                 '<a href="{}" target="_blank">View Image</a>',
                 obj.image.url
@@ -127,11 +312,13 @@ class OCRJobAdmin(admin.ModelAdmin):
     view_image_link.short_description = 'Image'
     
     def image_preview(self, obj):
-        """Display image preview in admin"""
+        """Display image preview in admin, linked to the original"""
         if obj.image:
-            return mark_safe(
-                f'<img src="{obj.image.url}" '
-                f'style="max-width: 300px; max-height: 300px;" />'
+            return format_html(
+                '<a href="{}" target="_blank"><img src="{}" '
+                'style="max-width: 300px; max-height: 300px;" /></a>',
+                obj.image.url,
+                self.thumbnail_url(obj, 'preview') or obj.image.url
             )
         return '-'
     image_preview.short_description = 'Preview'
@@ -1,9 +1,21 @@
 # ocr/apps.py
 
 from django.apps import AppConfig
+from django.core.signals import request_started
+
+
+def start_recovery_loop(**kwargs):
+    """Start stale job recovery once this process serves its first request"""
+    from .services.recovery import recovery_loop
+    recovery_loop.start()
 
 
 class OcrConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ocr'
-    verbose_name = 'OCR Application'
\ No newline at end of file
+    verbose_name = 'OCR Application'
+    
+    def ready(self):
+        # Not at import: management commands such as migrate must not
+        # touch the job tables
+        request_started.connect(start_recovery_loop, dispatch_uid='ocr-recovery-loop')
\ No newline at end of file
@@ -0,0 +1,348 @@
+# ocr/dispatch.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from .services.executor import ExecutorQueueFull, OCRExecutor
+
+logger = logging.getLogger('ocr')
+
+
+def _release_share(job_id):
+    """Let the fair-share scheduler dispatch the client's next held job"""
+    from .scheduler import scheduler
+    try:
+        scheduler.release(job_id)
+    except Exception:
+        logger.exception(f"Failed to release next job after {job_id}")
+
+
+def _release_batch_share(batch_id):
+    """As _release_share, once every job of a batch has finished"""
+    from .scheduler import scheduler
+    try:
+        scheduler.release_batch(batch_id)
+    except Exception:
+        logger.exception(f"Failed to release next job after batch {batch_id}")
+
+
+def _run_locally(func, *args, release=None):
+    """
+    Run a job function in a local worker thread and release its DB connection
+
+    ``release`` is called with the first argument afterwards, to free
+    the client's fair share.
+    """
+    try:
+        close_old_connections()
+        return func(*args)
+    except Exception:
+        # The job function already recorded the failure on the job
+        logger.exception(f"Local OCR execution failed for {args}")
+    finally:
+        if release is not None:
+            release(args[0])
+        connection.close()
+
+
+def _publish_final_status(job_id):
+    """
+    Republish a job's status from this process
+
+    Worker processes publish to their own in-process notifier, which
+    waiters in the web process never see.
+    """
+    from .models import OCRJob
+    try:
+        job = OCRJob.objects.filter(id=job_id).first()
+        if job is not None:
+            job.publish_status()
+    except Exception:
+        logger.exception(f"Failed to publish final status of job {job_id}")
+
+
+def _observe_worker_metrics(future):
+    """
+    Record what a worker process observed in this process's /metrics
+    registry (see tasks.run_in_worker)
+    """
+    from .services.metrics import metrics
+    try:
+        for status, spans in future.result():
+            metrics.observe_job(status, spans)
+    except Exception:
+        logger.exception("Failed to record metrics of an OCR worker process")
+
+
+def _release_after(job_id):
+    """Future callback releasing the fair share once a worker process is done"""
+    def callback(future):
+        try:
+            _observe_worker_metrics(future)
+            if settings.OCR_NOTIFY_BACKEND == 'local':
+                _publish_final_status(job_id)
+            _release_share(job_id)
+        finally:
+            connection.close()
+    return callback
+
+
+def _publish_batch_after(batch_id):
+    """
+    Future callback republishing the statuses of a finished batch and
+    releasing its fair share
+    """
+    def callback(future):
+        from .models import OCRJob
+        try:
+            _observe_worker_metrics(future)
+            if settings.OCR_NOTIFY_BACKEND == 'local':
+                job_ids = OCRJob.objects.filter(batch_id=batch_id).values_list('id', flat=True)
+                for job_id in job_ids:
+                    _publish_final_status(job_id)
+            _release_batch_share(batch_id)
+        finally:
+            connection.close()
+    return callback
+
+
+class BaseDispatcher:
+    """
+    Hands OCR work to an execution backend
+
+    ``submit_job``/``submit_batch`` must return quickly; only the eager
+    dispatcher runs OCR inside the calling request. ``priority`` is one of
+    OCRJob.PRIORITY_CHOICES and selects the queue or pool.
+    """
+
+    mode = None
+
+    def has_capacity(self, priority='interactive'):
+        """Whether new work would be accepted right now"""
+        return True
+
+    def submit_job(self, job_id, priority='interactive'):
+        raise NotImplementedError
+
+    def submit_batch(self, batch_id, priority='bulk'):
+        raise NotImplementedError
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class EagerDispatcher(BaseDispatcher):
+    """Runs OCR synchronously in the calling thread (development only)"""
+
+    mode = 'eager'
+
+    def submit_job(self, job_id, priority='interactive'):
+        from .tasks import run_ocr_job
+        try:
+            run_ocr_job(job_id)
+        except Exception:
+            logger.exception(f"Eager OCR failed for job {job_id}")
+
+    def submit_batch(self, batch_id, priority='bulk'):
+        from .tasks import run_ocr_batch
+        try:
+            run_ocr_batch(batch_id)
+        except Exception:
+            logger.exception(f"Eager OCR failed for batch {batch_id}")
+
+
+class ThreadPoolDispatcher(BaseDispatcher):
+    """
+    Runs OCR on thread pools inside the web process, one per priority
+
+    Needs no broker, which also makes it the in-process stand-in for the
+    Celery path in development and tests.
+    """
+
+    mode = 'thread'
+
+    def __init__(self):
+        self.executors = {
+            priority: ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix=f'ocr-{priority}'
+            )
+            for priority, workers in settings.OCR_EXECUTOR_WORKERS_BY_PRIORITY.items()
+        }
+
+    def submit_job(self, job_id, priority='interactive'):
+        from .tasks import run_ocr_job
+        return self.executors[priority].submit(
+            _run_locally, run_ocr_job, job_id, release=_release_share
+        )
+
+    def submit_batch(self, batch_id, priority='bulk'):
+        from .tasks import run_ocr_batch
+        return self.executors[priority].submit(
+            _run_locally, run_ocr_batch, batch_id, release=_release_batch_share
+        )
+
+    def shutdown(self, wait=True):
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait)
+
+
+class ProcessPoolDispatcher(BaseDispatcher):
+    """
+    Runs OCR in OCRExecutor worker processes, one pool per priority
+
+    Raises ExecutorQueueFull when a pool's bounded queue is full. Uploads
+    ingested in memory are pickled to the worker along with the call.
+    """
+
+    mode = 'process'
+
+    def __init__(self):
+        self.executors = {
+            priority: OCRExecutor(max_workers=workers)
+            for priority, workers in settings.OCR_EXECUTOR_WORKERS_BY_PRIORITY.items()
+        }
+
+    def has_capacity(self, priority='interactive'):
+        return self.executors[priority].has_capacity()
+
+    def submit_job(self, job_id, priority='interactive'):
+        from .services.ingest import upload_buffers
+        from .tasks import run_in_worker, run_ocr_job
+        # Upload bytes held in memory travel with the call
+        data = upload_buffers.pop(job_id)
+        try:
+            future = self.executors[priority].submit(run_in_worker, run_ocr_job, job_id, data)
+        except Exception:
+            if data is not None:
+                upload_buffers.put(job_id, data)
+            raise
+        future.add_done_callback(_release_after(job_id))
+        return future
+
+    def submit_batch(self, batch_id, priority='bulk'):
+        from .tasks import run_in_worker, run_ocr_batch
+        future = self.executors[priority].submit(run_in_worker, run_ocr_batch, batch_id)
+        future.add_done_callback(_publish_batch_after(batch_id))
+        return future
+
+    def shutdown(self, wait=True):
+        for executor in self.executors.values():
+            executor.shutdown(wait=wait)
+
+
+class CeleryDispatcher(BaseDispatcher):
+    """Publishes OCR tasks to the Celery queue of their priority class"""
+
+    mode = 'celery'
+
+    def _route(self, priority):
+        return {
+            'queue': settings.OCR_CELERY_QUEUES[priority],
+            'priority': settings.OCR_CELERY_PRIORITIES[priority],
+        }
+
+    def submit_job(self, job_id, priority='interactive'):
+        from .tasks import process_ocr
+        return process_ocr.apply_async(args=[job_id], **self._route(priority))
+
+    def submit_batch(self, batch_id, priority='bulk'):
+        from .tasks import process_ocr_batch
+        return process_ocr_batch.apply_async(args=[batch_id], **self._route(priority))
+
+
+DISPATCHERS = {
+    dispatcher.mode: dispatcher
+    for dispatcher in (
+        EagerDispatcher,
+        ThreadPoolDispatcher,
+        ProcessPoolDispatcher,
+        CeleryDispatcher,
+    )
+}
+
+_dispatchers = {}
+_lock = threading.Lock()
+
+
+def get_dispatcher(mode=None):
+    """Return the process-wide dispatcher for the configured execution mode"""
+    mode = mode or settings.OCR_EXECUTION_MODE
+    dispatcher = _dispatchers.get(mode)
+    if dispatcher is None:
+        with _lock:
+            dispatcher = _dispatchers.get(mode)
+            if dispatcher is None:
+                try:
+                    dispatcher_class = DISPATCHERS[mode]
+                except KeyError:
+                    raise ValueError(
+                        f"Unknown OCR_EXECUTION_MODE '{mode}'. "
+                        f"Choose one of: {', '.join(DISPATCHERS)}"
+                    )
+                dispatcher = dispatcher_class()
+                _dispatchers[mode] = dispatcher
+    return dispatcher
+
+
+def check_capacity(priority='interactive'):
+    """Raise ExecutorQueueFull before accepting an upload the executor cannot take"""
+    dispatcher = get_dispatcher()
+    if not dispatcher.has_capacity(priority):
+        raise ExecutorQueueFull(settings.OCR_EXECUTOR_RETRY_AFTER)
+
+
+def _reject_undispatched(jobs, error):
+    """Reject jobs whose work could not be handed to an executor"""
+    for job in jobs:
+        job.mark_as_rejected(f"Could not queue OCR job: {error}")
+
+
+def dispatch_job(job_id, priority='interactive', discard_on_full=True):
+    """
+    Queue OCR for a job once the surrounding transaction commits
+
+    When the executor is full the job is deleted (the uploading client
+    got a 429 and will retry) unless ``discard_on_full`` is False.
+    """
+    from .models import OCRJob
+    dispatcher = get_dispatcher()
+
+    def submit():
+        try:
+            dispatcher.submit_job(str(job_id), priority=priority)
+        except ExecutorQueueFull:
+            if discard_on_full:
+                # Lost a race for the last slot; the client will retry
+                for job in OCRJob.objects.filter(id=job_id):
+                    job.delete()
+            raise
+        except Exception as e:
+            _reject_undispatched(OCRJob.objects.filter(id=job_id), e)
+            raise
+
+    transaction.on_commit(submit)
+
+
+def dispatch_batch(batch_id, priority='bulk'):
+    """Queue OCR for a batch once the surrounding transaction commits"""
+    from .models import OCRBatch, OCRJob
+    dispatcher = get_dispatcher()
+
+    def submit():
+        try:
+            dispatcher.submit_batch(str(batch_id), priority=priority)
+        except ExecutorQueueFull:
+            for job in OCRJob.objects.filter(batch_id=batch_id):
+                job.delete()
+            OCRBatch.objects.filter(id=batch_id).delete()
+            raise
+        except Exception as e:
+            _reject_undispatched(
+                OCRJob.objects.filter(batch_id=batch_id, status='pending'), e
+            )
+            raise
+
+    transaction.on_commit(submit)
@@ -0,0 +1,462 @@
+# ocr/management/commands/bench_ocr.py
+
+import io
+import json
+import os
+import platform
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ocr.services.engines import EasyOCREngine, get_engine
+from ocr.services.ocr_service import OCRService, TextCleaner
+from ocr.services.reader_pool import (
+    get_peak_resident_memory, get_resident_memory, reader_pool
+)
+from ocr.services.scaling import rescale_for_ocr
+
+# Words the synthetic pages are made of; fixed so runs are comparable
+WORDS = (
+    'invoice total amount due date customer account number payment '
+    'received balance order quantity price tax shipping address street '
+    'city postal code phone email reference description item unit subtotal '
+    'discount signature approved department report summary page section'
+).split()
+
+# (name, width, height) of the synthetic page sizes
+SIZES = [
+    ('small', 800, 600),
+    ('letter', 1275, 1650),
+    ('large', 2480, 3508),
+]
+
+# (name, font file or None for Pillow's bundled font, size in pixels)
+FONTS = [
+    ('default', None, 28),
+    ('sans', 'DejaVuSans.ttf', 24),
+    ('serif', 'DejaVuSerif.ttf', 26),
+    ('mono', 'DejaVuSansMono.ttf', 22),
+]
+
+# (name, Gaussian noise sigma, blur radius)
+NOISE_LEVELS = [
+    ('clean', 0, 0),
+    ('scan', 8, 0.6),
+    ('noisy', 20, 1.0),
+]
+
+STAGES = ('decode', 'preprocess', 'detect', 'recognize')
+
+
+def _load_font(path, size):
+    try:
+        if path is None:
+            return ImageFont.load_default(size=size)
+        return ImageFont.truetype(path, size)
+    except (OSError, TypeError):
+        return None
+
+
+def render_page(width, height, font, sigma, blur, rng):
+    """Render one synthetic page; returns (PNG bytes, ground-truth text)"""
+    page = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(page)
+
+    line_height = int(font.size * 1.6)
+    margin = max(20, width // 20)
+    lines = []
+    y = margin
+    while y + line_height < height - margin:
+        words, line = [], ''
+        while True:
+            candidate = (line + ' ' + rng.choice(WORDS)).strip()
+            if draw.textlength(candidate, font=font) > width - 2 * margin:
+                break
+            line = candidate
+            words.append(candidate.rsplit(' ', 1)[-1])
+        if words:
+            draw.text((margin, y), line, fill=0, font=font)
+            lines.append(line)
+        y += line_height
+
+    if blur:
+        page = page.filter(ImageFilter.GaussianBlur(blur))
+    if sigma:
+        noise = np.random.default_rng(rng.randrange(2 ** 32)).normal(0, sigma, (height, width))
+        page = Image.fromarray(
+            np.clip(np.asarray(page, dtype=np.float32) + noise, 0, 255).astype(np.uint8)
+        )
+
+    buffer = io.BytesIO()
+    page.save(buffer, 'PNG')
+    return buffer.getvalue(), '\n'.join(lines)
+
+
+def missing_fonts():
+    """Names of the FONTS that cannot be loaded on this machine"""
+    return [
+        name for name, path, size in FONTS if _load_font(path, size) is None
+    ]
+
+
+def build_corpus(sizes, seed=0):
+    """
+    Synthetic pages for every size x font x noise level
+
+    Fonts that cannot be loaded are left out (see missing_fonts), which
+    changes the corpus; reports therefore record the item names.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for size_name, width, height in SIZES:
+        if size_name not in sizes:
+            continue
+        for font_name, font_path, font_size in FONTS:
+            font = _load_font(font_path, font_size)
+            if font is None:
+                continue
+            for noise_name, sigma, blur in NOISE_LEVELS:
+                data, text = render_page(width, height, font, sigma, blur, rng)
+                corpus.append({
+                    'name': f'{size_name}-{font_name}-{noise_name}',
+                    'data': data,
+                    'text': text,
+                })
+    return corpus
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark OCR latency, throughput and memory on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='small,letter',
+            help=f"Comma separated page sizes: {', '.join(name for name, _, _ in SIZES)}"
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Per-stage timing runs per corpus image'
+        )
+        parser.add_argument(
+            '--workers',
+            type=str,
+            default='1,2,4',
+            help='Comma separated worker counts for the throughput runs'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Corpus random seed'
+        )
+        parser.add_argument(
+            '--save-corpus',
+            type=str,
+            help='Also write the corpus images and texts to this directory'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the JSON report to this file instead of stdout'
+        )
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            help='Compare against a previous JSON report and fail on regressions'
+        )
+        parser.add_argument(
+            '--max-latency-regression',
+            type=float,
+            default=0.15,
+            help='Allowed relative increase of stage latency and cold start (default 0.15)'
+        )
+        parser.add_argument(
+            '--max-throughput-regression',
+            type=float,
+            default=0.15,
+            help='Allowed relative drop of throughput (default 0.15)'
+        )
+        parser.add_argument(
+            '--max-memory-regression',
+            type=float,
+            default=0.20,
+            help='Allowed relative increase of peak RSS (default 0.20)'
+        )
+        parser.add_argument(
+            '--max-accuracy-drop',
+            type=float,
+            default=0.02,
+            help='Allowed absolute drop of mean word accuracy (default 0.02)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = {size.strip() for size in options['sizes'].split(',') if size.strip()}
+        unknown = sizes - {name for name, _, _ in SIZES}
+        if unknown:
+            raise CommandError(f"Unknown page size(s): {', '.join(sorted(unknown))}")
+        try:
+            workers = [int(value) for value in options['workers'].split(',') if value.strip()]
+        except ValueError:
+            raise CommandError('--workers must be comma separated integers')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Could not read baseline: {e}')
+
+        missing = missing_fonts()
+        if missing:
+            self.stderr.write(self.style.WARNING(
+                f"Fonts not available, left out of the corpus: {', '.join(missing)}"
+            ))
+        corpus = build_corpus(sizes, seed=options['seed'])
+        if not corpus:
+            raise CommandError('The synthetic corpus is empty')
+        if options['save_corpus']:
+            self._save_corpus(corpus, options['save_corpus'])
+
+        report = {
+            'environment': {
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'cpus': os.cpu_count(),
+                'engine': settings.OCR_ENGINE,
+                'gpu': settings.OCR_USE_GPU,
+            },
+            'corpus': {
+                'images': len(corpus),
+                'sizes': sorted(sizes),
+                'seed': options['seed'],
+                'items': [item['name'] for item in corpus],
+            },
+            'cold_start': self._cold_start(corpus[0]['data']),
+        }
+        report['stages'], report['accuracy'] = self._stages(corpus, options['repeat'])
+        report['throughput'] = {
+            str(count): self._throughput(corpus, count) for count in workers
+        }
+        report['memory'] = {
+            'peak_rss': get_peak_resident_memory(),
+            'rss': get_resident_memory(),
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            regressions = self._compare(report, baseline, options)
+            if regressions:
+                for message in regressions:
+                    self.stderr.write(self.style.ERROR(f'  - {message}'))
+                raise CommandError(f'{len(regressions)} performance regression(s) against baseline')
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def _save_corpus(self, corpus, directory):
+        os.makedirs(directory, exist_ok=True)
+        for item in corpus:
+            with open(os.path.join(directory, f"{item['name']}.png"), 'wb') as f:
+                f.write(item['data'])
+            with open(os.path.join(directory, f"{item['name']}.txt"), 'w', encoding='utf-8') as f:
+                f.write(item['text'])
+
+    def _cold_start(self, data):
+        """Model load time and first-image latency in this process"""
+        reader_pool.clear()
+        rss_before = get_resident_memory()
+
+        start_time = time.perf_counter()
+        reader_pool.get()
+        load_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        OCRService.process_image(data)
+        first_image = time.perf_counter() - start_time
+
+        rss_after = get_resident_memory()
+        return {
+            'reader_load': load_time,
+            'first_image': first_image,
+            'rss_delta': (
+                rss_after - rss_before
+                if rss_before is not None and rss_after is not None
+                else None
+            ),
+        }
+
+    def _stages(self, corpus, repeat):
+        """
+        Per-stage latency percentiles and mean word accuracy
+
+        Detection and recognition are timed separately with EasyOCR's
+        detect/recognize; other engines report both as 'recognize'.
+        """
+        engine = get_engine()
+        split = isinstance(engine, EasyOCREngine)
+        reader = reader_pool.get() if split else None
+        samples = {stage: [] for stage in STAGES}
+        accuracy = []
+
+        for item in corpus:
+            for run in range(max(1, repeat)):
+                start_time = time.perf_counter()
+                img = OCRService.load_image(item['data'])
+                samples['decode'].append(time.perf_counter() - start_time)
+
+                start_time = time.perf_counter()
+                img, _ = rescale_for_ocr(img)
+                img = OCRService.preprocess_image(img)
+                samples['preprocess'].append(time.perf_counter() - start_time)
+
+                if split:
+                    start_time = time.perf_counter()
+                    horizontal_list, free_list = reader.detect(img)
+                    samples['detect'].append(time.perf_counter() - start_time)
+
+                    start_time = time.perf_counter()
+                    lines = reader.recognize(img, horizontal_list[0], free_list[0], detail=0)
+                    samples['recognize'].append(time.perf_counter() - start_time)
+                else:
+                    start_time = time.perf_counter()
+                    lines = [text for _, text, _ in engine.readtext(img)]
+                    samples['recognize'].append(time.perf_counter() - start_time)
+
+                if run == 0:
+                    accuracy.append(self._similarity('\n'.join(lines), item['text']))
+
+        stages = {
+            stage: {
+                'p50': percentile(values, 0.5),
+                'p95': percentile(values, 0.95),
+                'mean': sum(values) / len(values),
+                'samples': len(values),
+            }
+            for stage, values in samples.items()
+            if values
+        }
+        return stages, {
+            'mean': sum(accuracy) / len(accuracy),
+            'min': min(accuracy),
+        }
+
+    def _throughput(self, corpus, workers):
+        """Images per second through process_image with N concurrent workers"""
+        jobs = [item['data'] for item in corpus] * max(1, workers)
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(OCRService.process_image, jobs))
+        elapsed = time.perf_counter() - start_time
+        return {
+            'images': len(jobs),
+            'seconds': elapsed,
+            'images_per_second': len(jobs) / elapsed if elapsed else None,
+        }
+
+    @staticmethod
+    def _similarity(text, reference):
+        """Word-level similarity ratio between OCR output and ground truth"""
+        words = TextCleaner.clean(text).lower().split()
+        expected = TextCleaner.clean(reference).lower().split()
+        if not words and not expected:
+            return 1.0
+        return SequenceMatcher(None, words, expected).ratio()
+
+    def _compare(self, report, baseline, options):
+        """
+        Human-readable regressions of report against baseline
+
+        Raises CommandError if the two runs measured different corpora,
+        as their numbers are then not comparable.
+        """
+        corpus = report['corpus']
+        previous_corpus = baseline.get('corpus', {})
+        if previous_corpus.get('items') is None:
+            raise CommandError(
+                'The baseline does not list its corpus items; regenerate it with this version'
+            )
+        if (previous_corpus['items'], previous_corpus.get('seed')) != (corpus['items'], corpus['seed']):
+            only_baseline = sorted(set(previous_corpus['items']) - set(corpus['items']))
+            only_report = sorted(set(corpus['items']) - set(previous_corpus['items']))
+            raise CommandError(
+                f"The corpus differs from the baseline (seed {corpus['seed']} vs "
+                f"{previous_corpus.get('seed')}; only in baseline: "
+                f"{', '.join(only_baseline) or '-'}; only in this run: "
+                f"{', '.join(only_report) or '-'}). Use the same --sizes and --seed "
+                f"on a machine with the same fonts, or regenerate the baseline"
+            )
+
+        regressions = []
+
+        def relative(current, previous):
+            if current is None or not previous:
+                return None
+            return (current - previous) / previous
+
+        latency_limit = options['max_latency_regression']
+        for stage, values in report['stages'].items():
+            previous = baseline.get('stages', {}).get(stage, {}).get('p50')
+            change = relative(values['p50'], previous)
+            if change is not None and change > latency_limit:
+                regressions.append(
+                    f"{stage} p50 {values['p50'] * 1000:.1f}ms vs "
+                    f"{previous * 1000:.1f}ms (+{change:.0%})"
+                )
+
+        for key in ('reader_load', 'first_image'):
+            previous = baseline.get('cold_start', {}).get(key)
+            change = relative(report['cold_start'][key], previous)
+            if change is not None and change > latency_limit:
+                regressions.append(
+                    f"cold start {key} {report['cold_start'][key]:.2f}s vs "
+                    f"{previous:.2f}s (+{change:.0%})"
+                )
+
+        throughput_limit = options['max_throughput_regression']
+        for workers, values in report['throughput'].items():
+            previous = baseline.get('throughput', {}).get(workers, {}).get('images_per_second')
+            change = relative(values['images_per_second'], previous)
+            if change is not None and -change > throughput_limit:
+                regressions.append(
+                    f"throughput at {workers} workers {values['images_per_second']:.2f}/s vs "
+                    f"{previous:.2f}/s ({change:.0%})"
+                )
+
+        previous = baseline.get('memory', {}).get('peak_rss')
+        change = relative(report['memory']['peak_rss'], previous)
+        if change is not None and change > options['max_memory_regression']:
+            regressions.append(
+                f"peak RSS {report['memory']['peak_rss'] / 2 ** 20:.0f}MB vs "
+                f"{previous / 2 ** 20:.0f}MB (+{change:.0%})"
+            )
+
+        previous = baseline.get('accuracy', {}).get('mean')
+        if previous is not None:
+            drop = previous - report['accuracy']['mean']
+            if drop > options['max_accuracy_drop']:
+                regressions.append(
+                    f"mean accuracy {report['accuracy']['mean']:.3f} vs {previous:.3f}"
+                )
+
+        return regressions
@@ -0,0 +1,134 @@
+# ocr/management/commands/bench_scaling.py
+
+import json
+import time
+from difflib import SequenceMatcher
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from ocr.services.ocr_service import OCRService, TextCleaner
+from ocr.services.reader_pool import reader_pool
+
+
+class Command(BaseCommand):
+    help = 'Benchmark accuracy vs latency of downscaling and tiling settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'image_paths',
+            nargs='+',
+            type=str,
+            help='Images to benchmark'
+        )
+        parser.add_argument(
+            '--target-heights',
+            type=str,
+            default='none,48,32,24',
+            help='Comma separated OCR_TARGET_TEXT_HEIGHT values to try '
+                 '("none" = full resolution)'
+        )
+        parser.add_argument(
+            '--tiling',
+            action='store_true',
+            help='Also run every target height with tiling enabled'
+        )
+        parser.add_argument(
+            '--reference',
+            type=str,
+            help='Ground-truth text file (default: full resolution output)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per image and variant; the median latency is reported'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Emit results as JSON'
+        )
+
+    def handle(self, *args, **options):
+        variants = []
+        for value in options['target_heights'].split(','):
+            value = value.strip().lower()
+            height = None if value in ('', 'none') else int(value)
+            variants.append({'target_height': height, 'tiling': False})
+            if options['tiling']:
+                variants.append({'target_height': height, 'tiling': True})
+
+        reference = None
+        if options['reference']:
+            try:
+                with open(options['reference'], encoding='utf-8') as f:
+                    reference = f.read()
+            except OSError as e:
+                raise CommandError(f'Could not read reference: {e}')
+
+        # Keep model load time out of the measurements
+        reader_pool.warm_up()
+
+        # Decode each image once; decode cost is not under test here
+        images = {path: OCRService.load_image(path) for path in options['image_paths']}
+
+        results = []
+        for path, img in images.items():
+            baseline_text = reference
+            for variant in variants:
+                latency, text = self._run(img, variant, options['repeat'])
+                if baseline_text is None:
+                    # First variant is the accuracy reference
+                    baseline_text = text
+                results.append({
+                    'image': path,
+                    'pixels': int(img.shape[0] * img.shape[1]),
+                    'target_height': variant['target_height'],
+                    'tiling': variant['tiling'],
+                    'latency': latency,
+                    'accuracy': self._similarity(text, baseline_text),
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'image':<30} {'height':>6} {'tiling':>6} "
+            f"{'latency':>9} {'accuracy':>8}"
+        )
+        for row in results:
+            self.stdout.write(
+                f"{row['image'][-30:]:<30} "
+                f"{str(row['target_height'] or 'full'):>6} "
+                f"{'yes' if row['tiling'] else 'no':>6} "
+                f"{row['latency']:>8.2f}s {row['accuracy']:>8.3f}"
+            )
+
+    def _run(self, img, variant, repeat):
+        """Median latency and output text for one variant"""
+        overrides = {
+            'OCR_TARGET_TEXT_HEIGHT': variant['target_height'],
+            'OCR_TILING_ENABLED': variant['tiling'],
+        }
+        if variant['target_height'] is None and not variant['tiling']:
+            overrides['OCR_MAX_PIXELS'] = None
+
+        timings = []
+        text = ''
+        with override_settings(**overrides):
+            for _ in range(max(1, repeat)):
+                start_time = time.perf_counter()
+                text = OCRService.process_image(img.copy())
+                timings.append(time.perf_counter() - start_time)
+
+        timings.sort()
+        return timings[len(timings) // 2], text
+
+    @staticmethod
+    def _similarity(text, reference):
+        """Word-level similarity ratio between two OCR outputs"""
+        words = TextCleaner.clean(text).split()
+        expected = TextCleaner.clean(reference).split()
+        if not words and not expected:
+            return 1.0
+        return SequenceMatcher(None, words, expected).ratio()
@@ -1,62 +1,99 @@
 # ocr/management/commands/cleanup_jobs.py
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-from ocr.models import OCRJob
+from ocr.services.cleanup import (
+    CleanupReport, cleanup_jobs, expired_jobs, sweep_orphans
+)
 
 
 class Command(BaseCommand):
-    help = 'Clean up old OCR jobs'
+    help = 'Clean up old OCR jobs and their image files'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--days',
             type=int,
-            default=7,
-            help='Delete jobs older than this many days (default: 7)'
+            default=settings.OCR_CLEANUP_DAYS,
+            help=f'Delete jobs older than this many days (default: {settings.OCR_CLEANUP_DAYS})'
         )
         parser.add_argument(
             '--dry-run',
             action='store_true',
             help='Show what would be deleted without actually deleting'
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.OCR_CLEANUP_CHUNK_SIZE,
+            help='Jobs deleted per transaction'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.OCR_CLEANUP_FILE_WORKERS,
+            help='Threads deleting image files'
+        )
+        parser.add_argument(
+            '--orphans',
+            action='store_true',
+            help='Also delete upload files no job references'
+        )
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.OCR_CLEANUP_ORPHAN_GRACE,
+            help='Only sweep orphan files older than this many seconds'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
-        dry_run = options['dry_run']
-        
-        cutoff_date = timezone.now() - timedelta(days=days)
-        
-        old_jobs = OCRJob.objects.filter(
-            created_at__lt=cutoff_date,
-            status__in=['done', 'rejected']
-        )
-        
-        count = old_jobs.count()
-        
-        if count == 0:
-            self.stdout.write(
-                self.style.SUCCESS('No old jobs to clean up')
-            )
-            return
-        
-        if dry_run:
+
+        if options['dry_run']:
+            old_jobs = expired_jobs(days)
+            count = old_jobs.count()
             self.stdout.write(
                 self.style.WARNING(
                     f'Would delete {count} jobs older than {days} days'
                 )
             )
-            for job in old_jobs[:10]:  # Show first 10
+            for job in old_jobs.order_by('created_at').only('id', 'status', 'created_at')[:10]:
                 self.stdout.write(
                     f'  - Job {job.id}: {job.status} (created: {job.created_at})'
                 )
             if count > 10:
                 self.stdout.write(f'  ... and {count - 10} more')
-        else:
-            old_jobs.delete()
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Successfully deleted {count} old jobs'
+            if options['orphans']:
+                report = sweep_orphans(grace=options['grace'], dry_run=True)
+                self.stdout.write(
+                    self.style.WARNING(f'Would delete {report.orphans} orphan files')
                 )
-            )
\ No newline at end of file
+            return
+
+        report = cleanup_jobs(
+            days=days,
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            report=CleanupReport()
+        )
+        if options['orphans']:
+            sweep_orphans(
+                grace=options['grace'],
+                chunk_size=options['chunk_size'],
+                workers=options['workers'],
+                report=report
+            )
+        stats = report.finish().as_dict()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {stats['jobs']} jobs in {stats['chunks']} chunks, "
+                f"{stats['files']} files ({stats['shared_files']} kept, still shared) "
+                f"and {stats['orphans']} orphan files in {stats['seconds']}s "
+                f"({stats['jobs_per_second']} jobs/s, {stats['files_per_second']} files/s)"
+            )
+        )
+        if stats['errors']:
+            self.stdout.write(
+                self.style.ERROR(f"{stats['errors']} files could not be deleted")
+            )
@@ -0,0 +1,53 @@
+# ocr/management/commands/rebuild_search_index.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ocr.models import OCRJob
+from ocr.services.search import get_search_backend, index_text
+
+
+class Command(BaseCommand):
+    help = 'Index the extracted text of finished jobs for full-text search'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Jobs indexed per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        backend = get_search_backend()
+        self.stdout.write(f"Indexing with the '{backend.name}' backend")
+
+        start_time = time.perf_counter()
+        indexed = 0
+        last_id = None
+        while True:
+            # Duplicates share their source's result and are not indexed
+            jobs = (
+                OCRJob.objects
+                .filter(status='done', duplicate_of__isnull=True)
+                .select_related('result')
+                .order_by('id')
+            )
+            if last_id is not None:
+                jobs = jobs.filter(id__gt=last_id)
+            chunk = list(jobs[:chunk_size])
+            if not chunk:
+                break
+
+            with transaction.atomic():
+                for job in chunk:
+                    index_text(job, job.extracted_text)
+            indexed += len(chunk)
+            last_id = chunk[-1].id
+            self.stdout.write(f'  {indexed} jobs indexed')
+
+        elapsed = time.perf_counter() - start_time
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} jobs in {elapsed:.1f}s')
+        )
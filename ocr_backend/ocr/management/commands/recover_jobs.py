@@ -0,0 +1,34 @@
+# ocr/management/commands/recover_jobs.py
+
+from django.core.management.base import BaseCommand
+from ocr.services.recovery import recover_stale_jobs, stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Re-dispatch or reject OCR jobs whose worker was lost'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many jobs are stale without touching them'
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            pending, processing = stale_jobs()
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{pending.count()} stale pending and '
+                    f'{processing.count()} stale processing jobs'
+                )
+            )
+            return
+
+        report = recover_stale_jobs()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-dispatched {report['redispatched']} and "
+                f"rejected {report['rejected']} stale jobs"
+            )
+        )
@@ -30,14 +30,15 @@ class Command(BaseCommand):
         try:
             service = OCRService()
             
-            # Validate image first
-            service.validate_image(image_path)
+            # Decode once, then validate and process the same array
+            img = service.load_image(image_path)
+            service.validate_image(img)
             self.stdout.write(
                 self.style.SUCCESS('✓ Image validation passed')
             )
             
             # Process OCR
-            extracted_text = service.process_image(image_path)
+            extracted_text = service.process_image(img)
             
             self.stdout.write('\n' + '='*50)
             self.stdout.write(self.style.SUCCESS('EXTRACTED TEXT:'))
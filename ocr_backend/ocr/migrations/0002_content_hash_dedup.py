@@ -0,0 +1,24 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the uploaded file', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Job whose OCR result was reused for this upload', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='ocr.ocrjob'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:21
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0002_content_hash_dedup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'OCR Batch',
+                'verbose_name_plural': 'OCR Batches',
+                'db_table': 'ocr_batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='ocr.ocrbatch'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:24
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0003_ocr_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='pages_done',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='pages_total',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='ocrjob',
+            name='image',
+            field=models.ImageField(max_length=500, upload_to='uploads/images/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'gif', 'pdf'])]),
+        ),
+        migrations.CreateModel(
+            name='OCRPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('done', 'Done'), ('rejected', 'Rejected')], default='done', max_length=20)),
+                ('extracted_text', models.TextField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('processing_time', models.FloatField(blank=True, help_text='Processing time in seconds', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='ocr.ocrjob')),
+            ],
+            options={
+                'verbose_name': 'OCR Page',
+                'verbose_name_plural': 'OCR Pages',
+                'db_table': 'ocr_pages',
+                'ordering': ['job', 'page_number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ocrpage',
+            constraint=models.UniqueConstraint(fields=('job', 'page_number'), name='ocr_pages_job_page_unique'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0004_ocr_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='client_id',
+            field=models.CharField(blank=True, help_text='Submitting client, used for fair-share scheduling', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, help_text='When the job was handed to an executor', null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='priority',
+            field=models.CharField(choices=[('interactive', 'Interactive'), ('bulk', 'Bulk')], default='interactive', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='When a worker started processing the job', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ocrjob',
+            index=models.Index(fields=['client_id', 'priority', 'status', 'created_at'], name='ocr_jobs_client__0e9d6a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocrjob',
+            index=models.Index(fields=['priority', 'started_at'], name='ocr_jobs_priorit_a11edf_idx'),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:33
+
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# The codec is frozen here rather than imported from
+# ocr.services.compression, so later changes to it or to the settings
+# cannot change what this migration writes
+COMPRESSION_MIN_SIZE = 512
+
+
+def compress_text(text):
+    data = text.encode('utf-8')
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return data, 'none'
+    return zlib.compress(data, 6), 'zlib'
+
+
+def decompress_text(text_data, codec):
+    data = bytes(text_data)
+    if codec == 'zlib':
+        data = zlib.decompress(data)
+    elif codec == 'zstd':
+        # Only written after this migration, by OCR_RESULT_COMPRESSION='zstd'
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec != 'none':
+        raise ValueError(f"Unknown compression codec '{codec}'")
+    return data.decode('utf-8')
+
+
+def copy_text_to_results(apps, schema_editor):
+    """Move ocr_jobs.extracted_text into ocr_results, one chunk at a time"""
+    OCRJob = apps.get_model('ocr', 'OCRJob')
+    OCRResult = apps.get_model('ocr', 'OCRResult')
+
+    last_id = None
+    while True:
+        jobs = OCRJob.objects.filter(extracted_text__isnull=False).order_by('id')
+        if last_id is not None:
+            jobs = jobs.filter(id__gt=last_id)
+        chunk = list(jobs.values_list('id', 'extracted_text')[:BACKFILL_CHUNK_SIZE])
+        if not chunk:
+            break
+
+        results = []
+        for job_id, text in chunk:
+            text_data, codec = compress_text(text)
+            results.append(OCRResult(
+                job_id=job_id,
+                text_data=text_data,
+                codec=codec,
+                text_length=len(text)
+            ))
+        OCRResult.objects.bulk_create(results, ignore_conflicts=True)
+        last_id = chunk[-1][0]
+
+
+def copy_results_to_text(apps, schema_editor):
+    """Reverse of copy_text_to_results"""
+    OCRJob = apps.get_model('ocr', 'OCRJob')
+    OCRResult = apps.get_model('ocr', 'OCRResult')
+
+    last_id = None
+    while True:
+        results = OCRResult.objects.order_by('job_id')
+        if last_id is not None:
+            results = results.filter(job_id__gt=last_id)
+        chunk = list(results.values_list('job_id', 'text_data', 'codec')[:BACKFILL_CHUNK_SIZE])
+        if not chunk:
+            break
+
+        OCRJob.objects.bulk_update(
+            [
+                OCRJob(id=job_id, extracted_text=decompress_text(text_data, codec))
+                for job_id, text_data, codec in chunk
+            ],
+            ['extracted_text']
+        )
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # Commit each backfill chunk on its own instead of one huge transaction
+    atomic = False
+
+    dependencies = [
+        ('ocr', '0005_job_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRResult',
+            fields=[
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='result', serialize=False, to='ocr.ocrjob')),
+                ('codec', models.CharField(choices=[('none', 'Uncompressed'), ('zlib', 'zlib'), ('zstd', 'Zstandard')], default='none', max_length=10)),
+                ('text_data', models.BinaryField(help_text='Extracted text, UTF-8 encoded and compressed with codec')),
+                ('text_length', models.PositiveIntegerField(default=0, help_text='Length of the extracted text in characters')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'OCR Result',
+                'verbose_name_plural': 'OCR Results',
+                'db_table': 'ocr_results',
+            },
+        ),
+        migrations.RunPython(copy_text_to_results, copy_results_to_text),
+        migrations.RemoveField(
+            model_name='ocrjob',
+            name='extracted_text',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0006_ocr_result_side_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='detail',
+            field=models.BooleanField(default=False, help_text='Keep boxes and confidences of every recognized line'),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='detail_codec',
+            field=models.CharField(blank=True, choices=[('none', 'Uncompressed'), ('zlib', 'zlib'), ('zstd', 'Zstandard')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='ocrresult',
+            name='detail_data',
+            field=models.BinaryField(blank=True, help_text='Per-line boxes, texts and confidences (see ocr.services.detail)', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0007_detail_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='engine_stats',
+            field=models.JSONField(blank=True, help_text='Per-engine timings and cascade escalation counts', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0008_engine_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='preprocess',
+            field=models.CharField(blank=True, help_text="Comma-separated preprocessing stages, 'none', or empty for the default", max_length=100),
+        ),
+    ]
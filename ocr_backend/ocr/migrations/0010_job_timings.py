@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0009_preprocess_stages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='timings',
+            field=models.JSONField(blank=True, help_text='Seconds per processing stage: queue wait, read, decode, preprocess, recognize, save', null=True),
+        ),
+    ]
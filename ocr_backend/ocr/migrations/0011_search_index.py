@@ -0,0 +1,91 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:48
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+FTS_STATEMENTS = [
+    "CREATE VIRTUAL TABLE ocr_search_fts USING fts5("
+    "content, content='ocr_search_documents', content_rowid='id')",
+    "CREATE TRIGGER ocr_search_documents_ai AFTER INSERT ON ocr_search_documents BEGIN "
+    "INSERT INTO ocr_search_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER ocr_search_documents_ad AFTER DELETE ON ocr_search_documents BEGIN "
+    "INSERT INTO ocr_search_fts(ocr_search_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER ocr_search_documents_au AFTER UPDATE ON ocr_search_documents BEGIN "
+    "INSERT INTO ocr_search_fts(ocr_search_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); "
+    "INSERT INTO ocr_search_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+
+def create_text_index(apps, schema_editor):
+    """MySQL FULLTEXT index, or an FTS5 table on SQLite builds that have it"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE ocr_search_documents '
+            'ADD FULLTEXT INDEX ocr_search_content_ft (content)'
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(FTS_STATEMENTS[0])
+        except OperationalError:
+            # No FTS5 module; the 'terms' search backend is used instead
+            return
+        for statement in FTS_STATEMENTS[1:]:
+            schema_editor.execute(statement)
+
+
+def drop_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE ocr_search_documents DROP INDEX ocr_search_content_ft'
+        )
+    elif vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS ocr_search_documents_{trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS ocr_search_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0010_job_timings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content', models.TextField()),
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='ocr.ocrjob')),
+            ],
+            options={
+                'verbose_name': 'OCR Search Document',
+                'verbose_name_plural': 'OCR Search Documents',
+                'db_table': 'ocr_search_documents',
+            },
+        ),
+        migrations.CreateModel(
+            name='OCRSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('count', models.PositiveIntegerField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='ocr.ocrjob')),
+            ],
+            options={
+                'verbose_name': 'OCR Search Term',
+                'verbose_name_plural': 'OCR Search Terms',
+                'db_table': 'ocr_search_terms',
+                'indexes': [models.Index(fields=['term'], name='ocr_search__term_84d2fd_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ocrsearchterm',
+            constraint=models.UniqueConstraint(fields=('job', 'term'), name='ocr_search_term_unique'),
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
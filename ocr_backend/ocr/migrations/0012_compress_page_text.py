@@ -0,0 +1,102 @@
+# Generated by Django 5.0.1 on 2026-10-17 09:12
+
+import zlib
+
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# Frozen like the codec in 0006_ocr_result_side_table
+COMPRESSION_MIN_SIZE = 512
+
+
+def compress_text(text):
+    data = text.encode('utf-8')
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return data, 'none'
+    return zlib.compress(data, 6), 'zlib'
+
+
+def decompress_text(text_data, codec):
+    data = bytes(text_data)
+    if codec == 'zlib':
+        data = zlib.decompress(data)
+    elif codec == 'zstd':
+        # Only written after this migration, by OCR_RESULT_COMPRESSION='zstd'
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec != 'none':
+        raise ValueError(f"Unknown compression codec '{codec}'")
+    return data.decode('utf-8')
+
+
+def compress_page_text(apps, schema_editor):
+    """Move ocr_pages.extracted_text into text_data, one chunk at a time"""
+    OCRPage = apps.get_model('ocr', 'OCRPage')
+
+    last_id = None
+    while True:
+        pages = OCRPage.objects.filter(extracted_text__isnull=False).order_by('id')
+        if last_id is not None:
+            pages = pages.filter(id__gt=last_id)
+        chunk = list(pages.values_list('id', 'extracted_text')[:BACKFILL_CHUNK_SIZE])
+        if not chunk:
+            break
+
+        updated = []
+        for page_id, text in chunk:
+            text_data, codec = compress_text(text)
+            updated.append(OCRPage(id=page_id, text_data=text_data, codec=codec))
+        OCRPage.objects.bulk_update(updated, ['text_data', 'codec'])
+        last_id = chunk[-1][0]
+
+
+def decompress_page_text(apps, schema_editor):
+    """Reverse of compress_page_text"""
+    OCRPage = apps.get_model('ocr', 'OCRPage')
+
+    last_id = None
+    while True:
+        pages = OCRPage.objects.filter(text_data__isnull=False).order_by('id')
+        if last_id is not None:
+            pages = pages.filter(id__gt=last_id)
+        chunk = list(pages.values_list('id', 'text_data', 'codec')[:BACKFILL_CHUNK_SIZE])
+        if not chunk:
+            break
+
+        OCRPage.objects.bulk_update(
+            [
+                OCRPage(id=page_id, extracted_text=decompress_text(text_data, codec))
+                for page_id, text_data, codec in chunk
+            ],
+            ['extracted_text']
+        )
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # Commit each backfill chunk on its own instead of one huge transaction
+    atomic = False
+
+    dependencies = [
+        ('ocr', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrpage',
+            name='codec',
+            field=models.CharField(choices=[('none', 'Uncompressed'), ('zlib', 'zlib'), ('zstd', 'Zstandard')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='ocrpage',
+            name='text_data',
+            field=models.BinaryField(blank=True, help_text='Page text, UTF-8 encoded and compressed with codec', null=True),
+        ),
+        migrations.RunPython(compress_page_text, decompress_page_text),
+        migrations.RemoveField(
+            model_name='ocrpage',
+            name='extracted_text',
+        ),
+    ]
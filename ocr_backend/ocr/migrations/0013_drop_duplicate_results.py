@@ -0,0 +1,78 @@
+# Generated by Django 5.0.1 on 2026-10-17 09:40
+
+from django.db import migrations
+
+CHUNK_SIZE = 1000
+
+
+def drop_duplicate_copies(apps, schema_editor):
+    """
+    Delete the results and search rows copied onto duplicate jobs
+
+    Duplicates now read their source's result. Copies are only deleted
+    while the source still has its result.
+    """
+    OCRResult = apps.get_model('ocr', 'OCRResult')
+    OCRSearchDocument = apps.get_model('ocr', 'OCRSearchDocument')
+    OCRSearchTerm = apps.get_model('ocr', 'OCRSearchTerm')
+
+    for model, key in (
+        (OCRResult, 'job_id'),
+        (OCRSearchDocument, 'id'),
+        (OCRSearchTerm, 'id'),
+    ):
+        copies = model.objects.filter(job__duplicate_of__result__isnull=False)
+        while True:
+            chunk = list(copies.values_list(key, flat=True)[:CHUNK_SIZE])
+            if not chunk:
+                break
+            model.objects.filter(**{f'{key}__in': chunk}).delete()
+
+
+def restore_duplicate_copies(apps, schema_editor):
+    """
+    Reverse of drop_duplicate_copies for the results
+
+    Search rows of duplicates are not restored.
+    """
+    OCRJob = apps.get_model('ocr', 'OCRJob')
+    OCRResult = apps.get_model('ocr', 'OCRResult')
+
+    last_id = None
+    while True:
+        jobs = OCRJob.objects.filter(
+            status='done', duplicate_of__result__isnull=False, result__isnull=True
+        ).order_by('id')
+        if last_id is not None:
+            jobs = jobs.filter(id__gt=last_id)
+        chunk = list(jobs.values_list('id', 'duplicate_of_id')[:CHUNK_SIZE])
+        if not chunk:
+            break
+
+        sources = OCRResult.objects.in_bulk([source_id for _, source_id in chunk])
+        OCRResult.objects.bulk_create([
+            OCRResult(
+                job_id=job_id,
+                codec=sources[source_id].codec,
+                text_data=sources[source_id].text_data,
+                text_length=sources[source_id].text_length,
+                detail_codec=sources[source_id].detail_codec,
+                detail_data=sources[source_id].detail_data,
+            )
+            for job_id, source_id in chunk
+        ])
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # Commit each chunk on its own instead of one huge transaction
+    atomic = False
+
+    dependencies = [
+        ('ocr', '0012_compress_page_text'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_copies, restore_duplicate_copies),
+    ]
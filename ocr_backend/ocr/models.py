@@ -1,10 +1,65 @@
 # ocr/models.py
 
+import time
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 from django.conf import settings
+from .services.compression import (
+    CODEC_CHOICES, compress_text, decompress_text, iter_decompress
+)
+from .services.dedup import hand_over_results
+from .services.detail import iter_detail_lines, pack_detail, unpack_detail
+from .services.ingest import upload_buffers
+from .services.notifier import publish_status
+from .services.search import index_text
+from .services.status_cache import status_cache
+
+
+class OCRBatch(models.Model):
+    """
+    Group of OCR jobs uploaded and processed together
+    """
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True
+    )
+    
+    class Meta:
+        db_table = 'ocr_batches'
+        ordering = ['-created_at']
+        verbose_name = 'OCR Batch'
+        verbose_name_plural = 'OCR Batches'
+    
+    def __str__(self):
+        return f"OCR Batch {self.id}"
+    
+    def status_counts(self):
+        """Number of jobs in each status"""
+        counts = {key: 0 for key, _ in OCRJob.STATUS_CHOICES}
+        rows = self.jobs.values('status').annotate(count=models.Count('id'))
+        for row in rows:
+            counts[row['status']] = row['count']
+        return counts
+    
+    @staticmethod
+    def aggregate_status(counts):
+        """Overall batch status derived from per-job counts"""
+        total = sum(counts.values())
+        finished = counts['done'] + counts['rejected']
+        if total and finished == total:
+            return 'done'
+        if counts['processing'] or finished:
+            return 'processing'
+        return 'pending'
 
 
 class OCRJob(models.Model):
@@ -19,6 +74,14 @@ class OCRJob(models.Model):
         ('rejected', 'Rejected'),
     ]
     
+    # Statuses a job can still leave; done and rejected are final
+    ACTIVE_STATUSES = ('pending', 'processing')
+    
+    PRIORITY_CHOICES = [
+        ('interactive', 'Interactive'),
+        ('bulk', 'Bulk'),
+    ]
+    
     id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
@@ -43,11 +106,6 @@ class OCRJob(models.Model):
         db_index=True
     )
     
-    extracted_text = models.TextField(
-        blank=True,
-        null=True
-    )
-    
     error_message = models.TextField(
         blank=True,
         null=True
@@ -85,12 +143,97 @@ class OCRJob(models.Model):
         null=True
     )
     
+    # Deduplication
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="SHA-256 of the uploaded file"
+    )
+    
+    duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        related_name='duplicates',
+        blank=True,
+        null=True,
+        help_text="Job whose OCR result was reused for this upload"
+    )
+    
+    batch = models.ForeignKey(
+        OCRBatch,
+        on_delete=models.SET_NULL,
+        related_name='jobs',
+        blank=True,
+        null=True
+    )
+    
+    # Multi-page progress
+    pages_total = models.PositiveIntegerField(
+        blank=True,
+        null=True
+    )
+    
+    pages_done = models.PositiveIntegerField(
+        default=0
+    )
+    
+    # Scheduling
+    priority = models.CharField(
+        max_length=20,
+        choices=PRIORITY_CHOICES,
+        default='interactive'
+    )
+    
+    detail = models.BooleanField(
+        default=False,
+        help_text="Keep boxes and confidences of every recognized line"
+    )
+    
+    preprocess = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Comma-separated preprocessing stages, 'none', or empty for the default"
+    )
+    
+    engine_stats = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Per-engine timings and cascade escalation counts"
+    )
+    
+    timings = models.JSONField(
+        blank=True,
+        null=True,
+        help_text="Seconds per processing stage: queue wait, read, decode, preprocess, recognize, save"
+    )
+    
+    client_id = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Submitting client, used for fair-share scheduling"
+    )
+    
+    dispatched_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the job was handed to an executor"
+    )
+    
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When a worker started processing the job"
+    )
+    
     class Meta:
         db_table = 'ocr_jobs'
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['client_id', 'priority', 'status', 'created_at']),
+            models.Index(fields=['priority', 'started_at']),
         ]
         verbose_name = 'OCR Job'
         verbose_name_plural = 'OCR Jobs'
@@ -99,30 +242,224 @@ class OCRJob(models.Model):
         return f"OCR Job {self.id} - {self.status}"
     
     def mark_as_processing(self):
-        """Mark job as processing"""
+        """
+        Claim a pending job for processing
+        
+        A conditional update, so when the same job reaches several
+        workers (e.g. re-dispatched by recovery) only one gets True.
+        """
+        now = timezone.now()
+        claimed = OCRJob.objects.filter(id=self.id, status='pending').update(
+            status='processing', started_at=now, updated_at=now
+        )
+        if not claimed:
+            return False
         self.status = 'processing'
-        self.save(update_fields=['status', 'updated_at'])
-    
-    def mark_as_done(self, extracted_text, processing_time=None):
-        """Mark job as completed with extracted text"""
-        self.status = 'done'
-        self.extracted_text = extracted_text
-        self.completed_at = timezone.now()
-        if processing_time:
-            self.processing_time = processing_time
-        self.save(update_fields=[
-            'status', 'extracted_text', 'completed_at', 
-            'processing_time', 'updated_at'
-        ])
+        self.started_at = self.updated_at = now
+        self.publish_status()
+        return True
+    
+    @property
+    def queue_wait(self):
+        """Seconds between upload and the start of processing"""
+        if self.started_at is None:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+    
+    def mark_as_done(self, extracted_text, processing_time=None, detail=None,
+                     engine_stats=None, timings=None):
+        """
+        Mark job as completed with extracted text
+        
+        ``detail`` optionally holds the (page_number, box, text, confidence)
+        lines of a detail-mode job, ``engine_stats`` the
+        EngineStats.as_dict() of the run and ``timings`` its stage spans,
+        to which the time taken to store and index the result is added as
+        'save'.
+        
+        Duplicates pass ``extracted_text=None``: they store nothing and
+        read their source's result instead (see get_result).
+        
+        Returns False without storing anything when the job is no longer
+        active, e.g. rejected by recovery while it ran.
+        """
+        with transaction.atomic():
+            # Locked, so a concurrent rejection cannot slip in between
+            active = OCRJob.objects.select_for_update().filter(
+                id=self.id, status__in=self.ACTIVE_STATUSES
+            )
+            if not active.exists():
+                self.refresh_from_db(fields=['status', 'completed_at'])
+                return False
+            self.status = 'done'
+            self.completed_at = timezone.now()
+            if processing_time:
+                self.processing_time = processing_time
+            if engine_stats is not None:
+                self.engine_stats = engine_stats
+            if self.pages_total is None:
+                # Single-page job
+                self.pages_total = self.pages_done = 1
+            start_time = time.perf_counter()
+            if extracted_text is not None:
+                self.result = OCRResult.store(self, extracted_text, detail=detail)
+                index_text(self, extracted_text)
+            if timings is not None:
+                timings['save'] = round(time.perf_counter() - start_time, 4)
+                self.timings = timings
+            self.save(update_fields=[
+                'status', 'completed_at', 'processing_time',
+                'engine_stats', 'timings', 'pages_total', 'pages_done', 'updated_at'
+            ])
+        self.publish_status()
+        return True
+    
+    def start_pages(self, pages_total):
+        """Record the page count of a multi-page document"""
+        self.pages_total = pages_total
+        self.pages_done = 0
+        self.save(update_fields=['pages_total', 'pages_done', 'updated_at'])
+        self.publish_status()
+    
+    def record_page(self, page_number, text=None, error_message=None,
+                    processing_time=None):
+        """Store one finished page, compressed like results, and advance progress"""
+        text_data, codec = compress_text(text) if text is not None else (None, 'none')
+        OCRPage.objects.update_or_create(
+            job=self,
+            page_number=page_number,
+            defaults={
+                'status': 'rejected' if error_message else 'done',
+                'text_data': text_data,
+                'codec': codec,
+                'error_message': error_message,
+                'processing_time': processing_time,
+            }
+        )
+        self.pages_done += 1
+        self.save(update_fields=['pages_done', 'updated_at'])
+        self.publish_status()
     
     def mark_as_rejected(self, error_message):
-        """Mark job as rejected with error message"""
+        """
+        Mark job as rejected with error message
+        
+        Returns False and leaves the job alone when it already finished.
+        """
+        now = timezone.now()
+        rejected = OCRJob.objects.filter(
+            id=self.id, status__in=self.ACTIVE_STATUSES
+        ).update(
+            status='rejected', error_message=error_message,
+            completed_at=now, updated_at=now
+        )
+        if not rejected:
+            self.refresh_from_db(fields=['status', 'error_message', 'completed_at'])
+            return False
         self.status = 'rejected'
         self.error_message = error_message
-        self.completed_at = timezone.now()
-        self.save(update_fields=[
-            'status', 'error_message', 'completed_at', 'updated_at'
-        ])
+        self.completed_at = self.updated_at = now
+        self.publish_status()
+        return True
+    
+    def status_payload(self):
+        """Public status representation, as returned by the status endpoint"""
+        data = {'status': self.status}
+        
+        if self.status == 'rejected' and self.error_message:
+            data['error'] = self.error_message
+        
+        if self.pages_total is not None:
+            data['pages_done'] = self.pages_done
+            data['pages_total'] = self.pages_total
+        
+        return data
+    
+    # Fields status_payload() reads, for narrow .only() queries
+    STATUS_FIELDS = ('status', 'error_message', 'pages_done', 'pages_total')
+    
+    @classmethod
+    def get_status_payload(cls, job_id):
+        """
+        Status payload of a job, from the status cache when possible
+        
+        Misses load only STATUS_FIELDS, never the extracted text. Raises
+        DoesNotExist for unknown jobs.
+        """
+        payload = status_cache.get(job_id)
+        if payload is None:
+            job = cls.objects.only(*cls.STATUS_FIELDS).get(id=job_id)
+            payload = job.status_payload()
+            status_cache.set(job_id, payload)
+        return payload
+    
+    @classmethod
+    def get_status_payloads(cls, job_ids):
+        """
+        {job_id: status payload} for many jobs
+        
+        Cache hits cost nothing; the misses are loaded with one id__in
+        query. Unknown IDs are left out.
+        """
+        payloads = status_cache.get_many(job_ids)
+        missing = [job_id for job_id in job_ids if job_id not in payloads]
+        if missing:
+            loaded = {
+                job.id: job.status_payload()
+                for job in cls.objects.only(*cls.STATUS_FIELDS).filter(id__in=missing)
+            }
+            status_cache.set_payloads(loaded)
+            payloads.update(loaded)
+        return payloads
+    
+    def publish_status(self):
+        """
+        Write the current status through to the status cache and notify
+        waiting long-poll and SSE clients
+        """
+        payload = self.status_payload()
+        status_cache.set(self.id, payload)
+        publish_status(self.id, payload)
+    
+    @property
+    def result_job_id(self):
+        """ID of the job whose OCRResult holds this job's output"""
+        return self.duplicate_of_id or self.id
+    
+    def get_result(self):
+        """
+        OCRResult of this job, or of its source for a duplicate
+        
+        Duplicates share their source's result rather than storing a
+        copy. Costs a query unless fetched with
+        select_related('result', 'duplicate_of__result'). Raises
+        OCRResult.DoesNotExist when there is no result (yet).
+        """
+        if self.duplicate_of_id is None:
+            return self.result
+        return self.duplicate_of.result
+    
+    @property
+    def extracted_text(self):
+        """OCR text, loaded from the OCRResult side table"""
+        try:
+            return self.get_result().text
+        except (OCRResult.DoesNotExist, OCRJob.DoesNotExist):
+            return None
+    
+    @property
+    def detail_lines(self):
+        """
+        (page_number, box, text, confidence) lines of a detail-mode job,
+        or None when the job has no detail output
+        """
+        if not self.detail:
+            # A duplicate may share the result of a detail-mode source
+            return None
+        try:
+            return self.get_result().detail_lines
+        except (OCRResult.DoesNotExist, OCRJob.DoesNotExist):
+            return None
     
     @property
     def is_completed(self):
@@ -136,10 +473,22 @@ class OCRJob(models.Model):
             return self.image.url
         return None
     
+    @property
+    def is_duplicate(self):
+        """Check if this job reuses another job's OCR result"""
+        return self.duplicate_of_id is not None
+    
     def clean_image_path(self):
         """Delete the associated image file"""
         if self.image:
             try:
+                # Deduplicated jobs share the original upload
+                if self.content_hash and OCRJob.objects.filter(
+                    content_hash=self.content_hash,
+                    image=self.image.name
+                ).exclude(id=self.id).exists():
+                    return
+                
                 if self.image.storage.exists(self.image.name):
                     self.image.storage.delete(self.image.name)
             except Exception as e:
@@ -151,4 +500,243 @@ class OCRJob(models.Model):
     def delete(self, *args, **kwargs):
         """Override delete to clean up image file"""
         self.clean_image_path()
-        super().delete(*args, **kwargs)
\ No newline at end of file
+        upload_buffers.pop(self.id)
+        status_cache.delete(self.id)
+        with transaction.atomic():
+            hand_over_results([self.id])
+            super().delete(*args, **kwargs)
+
+
+class OCRPage(models.Model):
+    """
+    OCR result for a single page of a multi-page job
+    """
+    
+    STATUS_CHOICES = [
+        ('done', 'Done'),
+        ('rejected', 'Rejected'),
+    ]
+    
+    job = models.ForeignKey(
+        OCRJob,
+        on_delete=models.CASCADE,
+        related_name='pages'
+    )
+    
+    page_number = models.PositiveIntegerField()
+    
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='done'
+    )
+    
+    codec = models.CharField(
+        max_length=10,
+        choices=CODEC_CHOICES,
+        default='none'
+    )
+    
+    text_data = models.BinaryField(
+        blank=True,
+        null=True,
+        help_text="Page text, UTF-8 encoded and compressed with codec"
+    )
+    
+    error_message = models.TextField(
+        blank=True,
+        null=True
+    )
+    
+    processing_time = models.FloatField(
+        help_text="Processing time in seconds",
+        blank=True,
+        null=True
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+    
+    class Meta:
+        db_table = 'ocr_pages'
+        ordering = ['job', 'page_number']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['job', 'page_number'],
+                name='ocr_pages_job_page_unique'
+            ),
+        ]
+        verbose_name = 'OCR Page'
+        verbose_name_plural = 'OCR Pages'
+    
+    def __str__(self):
+        return f"OCR Page {self.page_number} of job {self.job_id}"
+    
+    @property
+    def text(self):
+        """Page text, or None for a failed page"""
+        if self.text_data is None:
+            return None
+        return decompress_text(self.text_data, self.codec)
+
+
+class OCRResult(models.Model):
+    """
+    OCR output of a finished job, kept off the hot ocr_jobs row
+    
+    Status polls, list pages and cleanup scans read ocr_jobs only; the
+    (optionally compressed) text is loaded by the result and detail
+    views alone.
+    """
+    
+    job = models.OneToOneField(
+        OCRJob,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='result'
+    )
+    
+    codec = models.CharField(
+        max_length=10,
+        choices=CODEC_CHOICES,
+        default='none'
+    )
+    
+    text_data = models.BinaryField(
+        help_text="Extracted text, UTF-8 encoded and compressed with codec"
+    )
+    
+    text_length = models.PositiveIntegerField(
+        default=0,
+        help_text="Length of the extracted text in characters"
+    )
+    
+    detail_codec = models.CharField(
+        max_length=10,
+        choices=CODEC_CHOICES,
+        blank=True
+    )
+    
+    detail_data = models.BinaryField(
+        blank=True,
+        null=True,
+        help_text="Per-line boxes, texts and confidences (see ocr.services.detail)"
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True
+    )
+    
+    class Meta:
+        db_table = 'ocr_results'
+        verbose_name = 'OCR Result'
+        verbose_name_plural = 'OCR Results'
+    
+    def __str__(self):
+        return f"OCR Result of job {self.job_id}"
+    
+    @staticmethod
+    def encode(text, detail=None):
+        """Model field values storing the given text and detail lines"""
+        text = text or ''
+        text_data, codec = compress_text(text)
+        values = {
+            'text_data': text_data,
+            'codec': codec,
+            'text_length': len(text),
+            'detail_data': None,
+            'detail_codec': '',
+        }
+        if detail is not None:
+            values['detail_data'], values['detail_codec'] = pack_detail(detail)
+        return values
+    
+    @classmethod
+    def store(cls, job, text, detail=None):
+        """Create or replace the result of a job"""
+        result, _ = cls.objects.update_or_create(
+            job=job,
+            defaults=cls.encode(text, detail=detail)
+        )
+        return result
+    
+    @property
+    def text(self):
+        return decompress_text(self.text_data, self.codec)
+    
+    @property
+    def has_detail(self):
+        return self.detail_data is not None
+    
+    @property
+    def detail_lines(self):
+        if not self.has_detail:
+            return None
+        return list(iter_detail_lines(unpack_detail(self.detail_data, self.detail_codec)))
+    
+    def iter_text_bytes(self, chunk_size=64 * 1024):
+        """UTF-8 text in chunks, decompressed as it is consumed"""
+        return iter_decompress(self.text_data, self.codec, chunk_size)
+
+
+class OCRSearchDocument(models.Model):
+    """
+    Normalized tokens of a job's text for the database's full-text index
+
+    OCRResult keeps the text compressed, which no database can index.
+    Rows hold the text's lowercased word tokens only and are written by
+    the 'fulltext' (MySQL FULLTEXT index) and 'fts5' (SQLite FTS5 table
+    kept in sync by triggers) search backends; see ocr.services.search.
+    Duplicates share their source's row. The integer primary key doubles
+    as the stable FTS5 rowid.
+    """
+    
+    job = models.OneToOneField(
+        OCRJob,
+        on_delete=models.CASCADE,
+        related_name='search_document'
+    )
+    
+    content = models.TextField()
+    
+    class Meta:
+        db_table = 'ocr_search_documents'
+        verbose_name = 'OCR Search Document'
+        verbose_name_plural = 'OCR Search Documents'
+    
+    def __str__(self):
+        return f"Search document of job {self.job_id}"
+
+
+class OCRSearchTerm(models.Model):
+    """
+    Inverted index entry: how often a term occurs in a job's text
+
+    Used by the portable 'terms' search backend on databases without a
+    usable full-text index.
+    """
+    
+    job = models.ForeignKey(
+        OCRJob,
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    
+    term = models.CharField(max_length=64)
+    
+    count = models.PositiveIntegerField()
+    
+    class Meta:
+        db_table = 'ocr_search_terms'
+        verbose_name = 'OCR Search Term'
+        verbose_name_plural = 'OCR Search Terms'
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'term'], name='ocr_search_term_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['term']),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} x{self.count} in job {self.job_id}"
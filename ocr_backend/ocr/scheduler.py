@@ -0,0 +1,243 @@
+# ocr/scheduler.py
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+from .dispatch import dispatch_batch, dispatch_job
+from .models import OCRJob
+from .services.executor import ExecutorQueueFull
+
+logger = logging.getLogger('ocr')
+
+ACTIVE_STATUSES = ['pending', 'processing']
+
+
+def resolve_client_id(request):
+    """Identify the submitting client for fair-share scheduling"""
+    client_id = request.headers.get(settings.OCR_CLIENT_ID_HEADER, '').strip()
+    if client_id:
+        return client_id[:100]
+
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def held_jobs():
+    """Pending jobs waiting for a fair share (not duplicates)"""
+    return OCRJob.objects.filter(
+        status='pending',
+        dispatched_at__isnull=True,
+        duplicate_of__isnull=True
+    )
+
+
+class FairScheduler:
+    """
+    Per-client fair-share admission in front of the executors
+
+    Each client may have at most OCR_FAIR_SHARE_LIMITS[priority] jobs of a
+    priority class dispatched at once. Further jobs stay pending with no
+    dispatched_at and are released one by one, oldest first, as that
+    client's earlier jobs finish. A backfill of thousands of scans thus
+    occupies a bounded share of the queue and other clients interleave.
+
+    A batch is admitted as one unit when its client has a free bulk
+    share; its jobs then count against that share until they finish.
+    """
+
+    @property
+    def enabled(self):
+        # Eager execution runs inline; holding jobs back would never release
+        return (
+            settings.OCR_FAIR_SHARE_ENABLED
+            and settings.OCR_EXECUTION_MODE != 'eager'
+        )
+
+    def limit(self, priority):
+        return settings.OCR_FAIR_SHARE_LIMITS.get(priority)
+
+    def in_flight(self, client_id, priority):
+        """Dispatched, unfinished jobs of a client in a priority class"""
+        return OCRJob.objects.filter(
+            client_id=client_id,
+            priority=priority,
+            status__in=ACTIVE_STATUSES,
+            dispatched_at__isnull=False
+        ).count()
+
+    def _has_share(self, client_id, priority):
+        limit = self.limit(priority)
+        return (
+            not self.enabled
+            or not client_id
+            or limit is None
+            or self.in_flight(client_id, priority) < limit
+        )
+
+    def _dispatch(self, job, discard_on_full=True):
+        """Claim and dispatch a job; False if it was not dispatched"""
+        claimed = OCRJob.objects.filter(
+            id=job.id,
+            dispatched_at__isnull=True
+        ).update(dispatched_at=timezone.now())
+        if not claimed:
+            # Someone else dispatched it first
+            return False
+
+        try:
+            dispatch_job(job.id, priority=job.priority, discard_on_full=discard_on_full)
+        except ExecutorQueueFull:
+            if discard_on_full:
+                raise
+            # Keep holding it; the next release will try again
+            OCRJob.objects.filter(id=job.id).update(dispatched_at=None)
+            return False
+        return True
+
+    def _dispatch_batch(self, batch_id, priority, discard_on_full=True):
+        """Claim and dispatch a held batch; False if it was not dispatched"""
+        claimed_at = timezone.now()
+        claimed = held_jobs().filter(batch_id=batch_id).update(dispatched_at=claimed_at)
+        if not claimed:
+            return False
+
+        try:
+            dispatch_batch(batch_id, priority=priority)
+        except ExecutorQueueFull:
+            if discard_on_full:
+                raise
+            OCRJob.objects.filter(
+                batch_id=batch_id, dispatched_at=claimed_at
+            ).update(dispatched_at=None)
+            return False
+        return True
+
+    def schedule(self, job):
+        """Dispatch a new job now, or hold it until the client has a free share"""
+        if self._has_share(job.client_id, job.priority):
+            return self._dispatch(job)
+
+        logger.info(
+            f"Holding {job.priority} job {job.id} for client {job.client_id}"
+        )
+        return False
+
+    def schedule_batch(self, batch, client_id, priority='bulk'):
+        """Dispatch a new batch now, or hold it until the client has a free share"""
+        if self._has_share(client_id, priority):
+            return self._dispatch_batch(batch.id, priority)
+
+        logger.info(f"Holding batch {batch.id} for client {client_id}")
+        return False
+
+    def redispatch(self, job):
+        """
+        Dispatch a job taken back from a lost worker (see
+        ocr.services.recovery); if the executor is full it stays held
+        """
+        return self._dispatch(job, discard_on_full=False)
+
+    def release(self, job_id):
+        """Dispatch the next held job of the client whose job just finished"""
+        if not self.enabled:
+            return
+
+        job = OCRJob.objects.only('client_id', 'priority').filter(id=job_id).first()
+        if job is None or not job.client_id:
+            return
+
+        self._release_client(job.client_id, job.priority)
+
+    def release_batch(self, batch_id):
+        """Dispatch the next held work of the client whose batch just finished"""
+        if not self.enabled:
+            return
+
+        job = OCRJob.objects.only('client_id', 'priority').filter(batch_id=batch_id).first()
+        if job is None or not job.client_id:
+            return
+
+        self._release_client(job.client_id, job.priority)
+
+    def _release_client(self, client_id, priority):
+        held = held_jobs().filter(
+            client_id=client_id,
+            priority=priority
+        ).only('id', 'priority', 'batch').order_by('created_at')
+
+        released_batches = set()
+        for job in held[:self.limit(priority) or 1]:
+            if job.batch_id in released_batches:
+                continue
+            if not self._has_share(client_id, priority):
+                break
+            if job.batch_id is not None:
+                dispatched = self._dispatch_batch(
+                    job.batch_id, priority, discard_on_full=False
+                )
+                released_batches.add(job.batch_id)
+            else:
+                dispatched = self._dispatch(job, discard_on_full=False)
+            if not dispatched:
+                break
+
+    def release_held(self):
+        """Safety net: release held jobs for every client with a free share"""
+        held = (
+            held_jobs()
+            .exclude(client_id='')
+            .values_list('client_id', 'priority')
+            .distinct()
+        )
+        for client_id, priority in held:
+            self._release_client(client_id, priority)
+
+
+def queue_stats():
+    """
+    Queue depth and wait time per priority class
+
+    Wait time is created_at to started_at for jobs started within the
+    last OCR_QUEUE_STATS_WINDOW seconds.
+    """
+    since = timezone.now() - timedelta(seconds=settings.OCR_QUEUE_STATS_WINDOW)
+    stats = {}
+
+    for priority, _ in OCRJob.PRIORITY_CHOICES:
+        depth = dict(
+            OCRJob.objects
+            .filter(priority=priority, status__in=ACTIVE_STATUSES)
+            .values_list('status')
+            .annotate(count=Count('id'))
+        )
+        held = held_jobs().filter(priority=priority).count()
+
+        waits = sorted(
+            (started_at - created_at).total_seconds()
+            for created_at, started_at in (
+                OCRJob.objects
+                .filter(priority=priority, started_at__gte=since)
+                .order_by('-started_at')
+                .values_list('created_at', 'started_at')[:settings.OCR_QUEUE_STATS_SAMPLE]
+            )
+        )
+
+        stats[priority] = {
+            'pending': depth.get('pending', 0),
+            'held': held,
+            'processing': depth.get('processing', 0),
+            'wait_samples': len(waits),
+            'wait_avg': sum(waits) / len(waits) if waits else None,
+            'wait_p50': waits[len(waits) // 2] if waits else None,
+            'wait_p95': waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+        }
+
+    return stats
+
+
+scheduler = FairScheduler()
@@ -2,14 +2,34 @@
 
 from rest_framework import serializers
 from django.conf import settings
-from .models import OCRJob
+from django.db import transaction
+from .models import OCRBatch, OCRJob, OCRPage
+from .services.dedup import compute_content_hash, propagate_to_duplicates, result_cache
+from .services.ingest import upload_buffers
+from .services.preflight import PreflightError, preflight
+from .services.preprocessing import parse_stages
+
+
+class DocumentField(serializers.ImageField):
+    """
+    Image field that also accepts PDF documents
+    
+    Pillow cannot open PDFs, so they skip the image check and are only
+    validated as regular files.
+    """
+    
+    def to_internal_value(self, data):
+        name = getattr(data, 'name', '') or ''
+        if name.lower().endswith('.pdf'):
+            return serializers.FileField.to_internal_value(self, data)
+        return super().to_internal_value(data)
 
 
 class OCRJobUploadSerializer(serializers.ModelSerializer):
     """
     Serializer for uploading images and creating OCR jobs
     """
-    image = serializers.ImageField(
+    image = DocumentField(
         required=True,
         allow_empty_file=False,
         error_messages={
@@ -21,7 +41,7 @@ class OCRJobUploadSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = OCRJob
-        fields = ['image']
+        fields = ['image', 'priority', 'detail', 'preprocess']
     
     def validate_image(self, value):
         """
@@ -42,24 +62,185 @@ class OCRJobUploadSerializer(serializers.ModelSerializer):
                 f"Allowed extensions: {', '.join(settings.OCR_ALLOWED_EXTENSIONS)}"
             )
         
+        # Reject corrupt, oversized and blank images before they are
+        # stored and queued
+        try:
+            preflight(value)
+        except PreflightError as e:
+            raise serializers.ValidationError(str(e))
+        
         return value
     
+    def validate_preprocess(self, value):
+        """
+        Normalize the requested preprocessing stages
+        """
+        if not value:
+            return ''
+        try:
+            stages = parse_stages(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return ','.join(stages) or 'none'
+    
     def create(self, validated_data):
         """
         Create OCR job with additional metadata
+        
+        Uploads whose content hash matches a recent job reuse that job's
+        result instead of being queued for OCR again.
         """
         image = validated_data['image']
+        detail = validated_data.get('detail', False)
+        preprocess = validated_data.get('preprocess', '')
+        scheduling = {
+            'priority': validated_data.get('priority', 'interactive'),
+            'client_id': validated_data.get('client_id', ''),
+        }
+        content_hash = compute_content_hash(image)
+        
+        source = result_cache.lookup(content_hash, detail=detail, preprocess=preprocess)
+        if source is not None:
+            result_cache.record_hit()
+            return result_cache.attach(
+                source,
+                file_size=image.size,
+                file_name=image.name,
+                detail=detail,
+                preprocess=preprocess,
+                **scheduling
+            )
+        
+        if result_cache.enabled:
+            result_cache.record_miss()
+        
+        # Local workers can take the bytes straight from memory; the file
+        # is then written in the background, or not at all
+        data = upload_buffers.read(image)
         
         ocr_job = OCRJob.objects.create(
-            image=image,
+            image=image if data is None else '',
             file_size=image.size,
             file_name=image.name,
-            status='pending'
+            content_hash=content_hash,
+            detail=detail,
+            preprocess=preprocess,
+            status='pending',
+            **scheduling
         )
         
+        if data is not None:
+            upload_buffers.put(ocr_job.id, data)
+            transaction.on_commit(
+                lambda: upload_buffers.persist(ocr_job.id, image.name, data)
+            )
+        
         return ocr_job
 
 
+class OCRBatchUploadSerializer(serializers.Serializer):
+    """
+    Serializer for uploading several images as one OCR batch
+    """
+    images = serializers.ListField(
+        child=serializers.ImageField(allow_empty_file=False),
+        allow_empty=False,
+        max_length=settings.OCR_BATCH_MAX_SIZE,
+        error_messages={
+            'required': 'No image files provided',
+            'empty': 'No image files provided',
+            'max_length': (
+                f'A batch may contain at most '
+                f'{settings.OCR_BATCH_MAX_SIZE} images'
+            )
+        }
+    )
+    
+    def validate_images(self, value):
+        """
+        Apply the single-upload checks to every image
+        """
+        validator = OCRJobUploadSerializer()
+        return [validator.validate_image(image) for image in value]
+    
+    def create(self, validated_data):
+        """
+        Create the batch and all of its jobs with a single INSERT
+        
+        Batches run as one bulk-priority task. Their jobs are created
+        held, without dispatched_at, and are dispatched together once
+        the fair-share scheduler admits the batch. Images whose content
+        hash matches a recent job, or an earlier image of the same batch,
+        reuse that job's result as single uploads do and are left out of
+        the batch's OCR pass.
+        """
+        batch = OCRBatch.objects.create()
+        client_id = validated_data.get('client_id', '')
+        
+        jobs = []
+        sources = {}
+        for image in validated_data['images']:
+            content_hash = compute_content_hash(image)
+            source = sources.get(content_hash) or result_cache.lookup(content_hash)
+            if source is not None:
+                result_cache.record_hit()
+            elif result_cache.enabled:
+                result_cache.record_miss()
+            
+            job = OCRJob(
+                # Duplicates get their source's file once it is stored
+                image=image if source is None else '',
+                file_size=image.size,
+                file_name=image.name,
+                content_hash=content_hash,
+                duplicate_of=source,
+                batch=batch,
+                status='pending',
+                priority='bulk',
+                client_id=client_id
+            )
+            if result_cache.enabled:
+                sources.setdefault(content_hash, source or job)
+            jobs.append(job)
+        OCRJob.objects.bulk_create(jobs)
+        
+        # Sources in this batch were only stored by the INSERT, and the
+        # others may have finished since the lookup
+        reused = {job.duplicate_of_id: job.duplicate_of for job in jobs if job.duplicate_of}
+        for source in reused.values():
+            source.refresh_from_db(fields=['status', 'error_message', 'image'])
+            if source.image:
+                batch.jobs.filter(duplicate_of=source, image='').update(
+                    image=source.image.name
+                )
+            if source.is_completed:
+                propagate_to_duplicates(source)
+        
+        return batch
+
+
+class OCRBatchStatusSerializer(serializers.ModelSerializer):
+    """
+    Serializer for OCR batch aggregate status
+    """
+    batchId = serializers.UUIDField(source='id', read_only=True)
+    
+    class Meta:
+        model = OCRBatch
+        fields = ['batchId']
+    
+    def to_representation(self, instance):
+        """
+        Aggregate status plus per-status job counts
+        """
+        counts = instance.status_counts()
+        data = super().to_representation(instance)
+        data['status'] = OCRBatch.aggregate_status(counts)
+        data['total'] = sum(counts.values())
+        data['counts'] = counts
+        return data
+
+
 class OCRJobStatusSerializer(serializers.ModelSerializer):
     """
     Serializer for OCR job status response
@@ -72,12 +253,7 @@ class OCRJobStatusSerializer(serializers.ModelSerializer):
         """
         Custom representation based on status
         """
-        data = {'status': instance.status}
-        
-        if instance.status == 'rejected' and instance.error_message:
-            data['error'] = instance.error_message
-        
-        return data
+        return instance.status_payload()
 
 
 class OCRJobResultSerializer(serializers.ModelSerializer):
@@ -101,6 +277,113 @@ class OCRJobResultSerializer(serializers.ModelSerializer):
         return super().to_representation(instance)
 
 
+class OCRJobDetailResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the line-level result of a detail-mode job
+    
+    Reads the lines from an already loaded OCRResult when the context
+    has one under 'result'.
+    """
+    jobId = serializers.UUIDField(source='id', read_only=True)
+    lines = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = OCRJob
+        fields = ['jobId', 'lines']
+    
+    def detail_lines(self, obj):
+        result = self.context.get('result')
+        return obj.detail_lines if result is None else result.detail_lines
+    
+    def get_lines(self, obj):
+        return [
+            {'page': page, 'box': box, 'text': text, 'confidence': round(confidence, 4)}
+            for page, box, text, confidence in self.detail_lines(obj) or []
+        ]
+
+
+class OCRJobListSerializer(serializers.ModelSerializer):
+    """
+    Serializer for job listings with sparse fieldsets
+    
+    ``fields`` selects a subset of Meta.fields. Without it every field
+    but the extracted text is returned, since the text has to be loaded
+    from the result table and decompressed.
+    """
+    
+    class Meta:
+        model = OCRJob
+        fields = [
+            'id', 'status', 'file_name', 'file_size', 'priority', 'client_id',
+            'detail', 'preprocess', 'content_hash', 'duplicate_of', 'batch',
+            'pages_done', 'pages_total', 'error_message', 'processing_time',
+            'created_at', 'updated_at', 'started_at', 'completed_at',
+            'extracted_text'
+        ]
+        read_only_fields = fields
+    
+    DEFAULT_FIELDS = [name for name in Meta.fields if name != 'extracted_text']
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = set(fields or self.DEFAULT_FIELDS)
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+    
+    @classmethod
+    def parse_fields(cls, value):
+        """
+        Field names from a comma-separated ``fields`` parameter
+        
+        Raises ValidationError for unknown names.
+        """
+        if not value:
+            return list(cls.DEFAULT_FIELDS)
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in cls.Meta.fields]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown field(s): {', '.join(unknown)}. "
+                f"Choose from: {', '.join(cls.Meta.fields)}"
+            )
+        return names
+
+
+class OCRJobSearchResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer for one full-text search hit
+    
+    Expects {job_id: score} and {job_id: snippet} maps in the context.
+    """
+    jobId = serializers.UUIDField(source='id', read_only=True)
+    score = serializers.SerializerMethodField()
+    snippet = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = OCRJob
+        fields = ['jobId', 'score', 'file_name', 'created_at', 'snippet']
+    
+    def get_score(self, obj):
+        return round(self.context['scores'][obj.id], 6)
+    
+    def get_snippet(self, obj):
+        return self.context['snippets'].get(obj.id, '')
+
+
+class OCRPageSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a single page of a multi-page job
+    """
+    page = serializers.IntegerField(source='page_number', read_only=True)
+    text = serializers.CharField(read_only=True)
+    error = serializers.CharField(source='error_message', read_only=True)
+    
+    class Meta:
+        model = OCRPage
+        fields = ['page', 'status', 'text', 'error']
+
+
 class OCRJobDetailSerializer(serializers.ModelSerializer):
     """
     Detailed serializer for OCR job (for admin/debugging)
@@ -113,7 +396,8 @@ class OCRJobDetailSerializer(serializers.ModelSerializer):
             'id', 'status', 'extracted_text', 'error_message',
             'file_name', 'file_size', 'image_url',
             'created_at', 'updated_at', 'completed_at',
-            'processing_time'
+            'processing_time', 'pages_done', 'pages_total', 'engine_stats',
+            'timings'
         ]
         read_only_fields = fields
     
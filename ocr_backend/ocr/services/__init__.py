@@ -1,5 +1,10 @@
 # ocr/services/__init__.py
 
 from .ocr_service import OCRService, TextCleaner
+from .engines import OCREngine, EasyOCREngine, TesseractEngine, CascadeEngine, get_engine
+from .reader_pool import ReaderPool, reader_pool, get_reader
 
-__all__ = ['OCRService', 'TextCleaner']
\ No newline at end of file
+__all__ = [
+    'OCRService', 'TextCleaner', 'ReaderPool', 'reader_pool', 'get_reader',
+    'OCREngine', 'EasyOCREngine', 'TesseractEngine', 'CascadeEngine', 'get_engine',
+]
\ No newline at end of file
@@ -0,0 +1,200 @@
+# ocr/services/cleanup.py
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .status_cache import TERMINAL_STATUSES, status_cache
+
+logger = logging.getLogger('ocr')
+
+
+class CleanupReport:
+    """Counts and throughput of a cleanup run"""
+
+    def __init__(self):
+        self.jobs = 0
+        self.chunks = 0
+        self.files = 0
+        self.shared_files = 0
+        self.orphans = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self):
+        seconds = self.seconds or time.perf_counter() - self.started
+        return {
+            'jobs': self.jobs,
+            'chunks': self.chunks,
+            'files': self.files,
+            'shared_files': self.shared_files,
+            'orphans': self.orphans,
+            'errors': self.errors,
+            'seconds': round(seconds, 3),
+            'jobs_per_second': round(self.jobs / seconds, 1) if seconds else None,
+            'files_per_second': (
+                round((self.files + self.orphans) / seconds, 1) if seconds else None
+            ),
+        }
+
+
+def expired_jobs(days):
+    """Finished jobs created more than ``days`` days ago"""
+    from ..models import OCRJob
+
+    cutoff = timezone.now() - timedelta(days=days)
+    return OCRJob.objects.filter(created_at__lt=cutoff, status__in=TERMINAL_STATUSES)
+
+
+def iter_chunks(queryset, chunk_size):
+    """
+    Yield lists of (id, created_at, image) rows in (created_at, id) order
+
+    Each chunk is one indexed range query starting after the last row of
+    the previous chunk, so the walk never uses OFFSET and never holds
+    more than ``chunk_size`` rows.
+    """
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            chunk = chunk.filter(
+                Q(created_at__gt=last[1]) | Q(created_at=last[1], id__gt=last[0])
+            )
+        rows = list(
+            chunk.order_by('created_at', 'id')
+            .values_list('id', 'created_at', 'image')[:chunk_size]
+        )
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+
+
+def delete_files(names, workers):
+    """Delete storage files in a thread pool; returns the number of failures"""
+    def delete(name):
+        try:
+            default_storage.delete(name)
+            return True
+        except Exception as e:
+            logger.error(f"Could not delete {name}: {str(e)}")
+            return False
+
+    if not names:
+        return 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(names)))) as pool:
+        return sum(not deleted for deleted in pool.map(delete, names))
+
+
+def delete_chunk(rows, workers, report):
+    """
+    Delete one chunk of jobs and then their image files
+
+    Rows go in a single short transaction (pages and results cascade,
+    except results still read by surviving duplicates, which are handed
+    over to one of them). Deduplicated jobs share their source's upload,
+    so a file is only deleted once no remaining job references it. Files
+    are removed after the commit; a failure there leaves an orphan for
+    sweep_orphans().
+    """
+    from ..models import OCRJob
+    from .dedup import hand_over_results
+
+    ids = [job_id for job_id, _, _ in rows]
+    names = {image for _, _, image in rows if image}
+
+    with transaction.atomic():
+        hand_over_results(ids)
+        OCRJob.objects.filter(id__in=ids).delete()
+        shared = set(
+            OCRJob.objects.filter(image__in=names).values_list('image', flat=True)
+        )
+
+    for job_id in ids:
+        status_cache.delete(job_id)
+
+    names -= shared
+    report.chunks += 1
+    report.jobs += len(ids)
+    report.shared_files += len(shared)
+    failed = delete_files(sorted(names), workers)
+    report.files += len(names) - failed
+    report.errors += failed
+
+
+def cleanup_jobs(days=None, chunk_size=None, workers=None, report=None):
+    """Delete expired jobs and their files chunk by chunk"""
+    days = settings.OCR_CLEANUP_DAYS if days is None else days
+    chunk_size = chunk_size or settings.OCR_CLEANUP_CHUNK_SIZE
+    workers = workers or settings.OCR_CLEANUP_FILE_WORKERS
+    report = report or CleanupReport()
+
+    for rows in iter_chunks(expired_jobs(days), chunk_size):
+        delete_chunk(rows, workers, report)
+        logger.debug(f"Cleanup deleted {report.jobs} jobs so far")
+
+    return report
+
+
+def iter_upload_files(grace):
+    """
+    Storage names of upload files last modified more than ``grace``
+    seconds ago; younger files may belong to a job not yet committed
+    """
+    directory = os.path.join(settings.MEDIA_ROOT, settings.OCR_UPLOAD_PATH)
+    cutoff = time.time() - grace
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                yield os.path.join(settings.OCR_UPLOAD_PATH, entry.name).replace(os.sep, '/')
+
+
+def sweep_orphans(grace=None, chunk_size=None, workers=None, report=None, dry_run=False):
+    """
+    Delete files in the upload directory that no job references
+
+    The directory is streamed and checked against the table
+    ``chunk_size`` names at a time.
+    """
+    from ..models import OCRJob
+
+    grace = settings.OCR_CLEANUP_ORPHAN_GRACE if grace is None else grace
+    chunk_size = chunk_size or settings.OCR_CLEANUP_CHUNK_SIZE
+    workers = workers or settings.OCR_CLEANUP_FILE_WORKERS
+    report = report or CleanupReport()
+
+    def sweep(names):
+        referenced = set(
+            OCRJob.objects.filter(image__in=names).values_list('image', flat=True)
+        )
+        orphans = [name for name in names if name not in referenced]
+        failed = 0 if dry_run else delete_files(orphans, workers)
+        report.orphans += len(orphans) - failed
+        report.errors += failed
+
+    names = []
+    for name in iter_upload_files(grace):
+        names.append(name)
+        if len(names) >= chunk_size:
+            sweep(names)
+            names = []
+    if names:
+        sweep(names)
+
+    return report
@@ -0,0 +1,106 @@
+# ocr/services/compression.py
+
+import zlib
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+CODEC_NONE = 'none'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+CODEC_CHOICES = [
+    (CODEC_NONE, 'Uncompressed'),
+    (CODEC_ZLIB, 'zlib'),
+    (CODEC_ZSTD, 'Zstandard'),
+]
+
+
+def _resolve_codec(codec):
+    codec = codec or CODEC_NONE
+    if codec == CODEC_ZSTD and zstandard is None:
+        # Fall back rather than fail; stored rows record their codec
+        return CODEC_ZLIB
+    if codec not in dict(CODEC_CHOICES):
+        raise ValueError(f"Unknown OCR_RESULT_COMPRESSION '{codec}'")
+    return codec
+
+
+def compress(data, codec=None):
+    """
+    Compress bytes with the configured codec
+
+    Returns (payload, codec). Payloads smaller than
+    OCR_RESULT_COMPRESSION_MIN_SIZE are stored as is.
+    """
+    if codec is None:
+        codec = settings.OCR_RESULT_COMPRESSION
+    codec = _resolve_codec(codec)
+
+    if codec == CODEC_NONE or len(data) < settings.OCR_RESULT_COMPRESSION_MIN_SIZE:
+        return bytes(data), CODEC_NONE
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data), CODEC_ZSTD
+    return zlib.compress(data, 6), CODEC_ZLIB
+
+
+def decompress(payload, codec):
+    """Inverse of compress()"""
+    payload = bytes(payload)
+    if codec == CODEC_NONE:
+        return payload
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Reading zstd results requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown compression codec '{codec}'")
+
+
+def compress_text(text, codec=None):
+    """Compress a string; returns (payload, codec)"""
+    return compress(text.encode('utf-8'), codec)
+
+
+def decompress_text(payload, codec):
+    return decompress(payload, codec).decode('utf-8')
+
+
+def iter_decompress(payload, codec, chunk_size=64 * 1024):
+    """
+    Decompress in pieces of at most about chunk_size bytes
+
+    Lets large results be streamed without building the whole
+    decompressed payload in memory.
+    """
+    view = memoryview(payload)
+    if codec == CODEC_NONE:
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+        return
+
+    if codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj()
+        for start in range(0, len(view), chunk_size):
+            data = decompressor.decompress(view[start:start + chunk_size], chunk_size)
+            while data:
+                yield data
+                data = decompressor.decompress(decompressor.unconsumed_tail, chunk_size)
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+        return
+
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Reading zstd results requires the 'zstandard' package")
+        yield from zstandard.ZstdDecompressor().read_to_iter(
+            bytes(view), read_size=chunk_size, write_size=chunk_size
+        )
+        return
+
+    raise ValueError(f"Unknown compression codec '{codec}'")
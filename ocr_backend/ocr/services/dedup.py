@@ -0,0 +1,179 @@
+# ocr/services/dedup.py
+
+import hashlib
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+logger = logging.getLogger('ocr')
+
+
+def compute_content_hash(uploaded_file):
+    """Compute SHA-256 of an uploaded file without reading it into memory"""
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+
+    # Rewind so the file can still be saved to storage
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-hash cache over OCRJob rows.
+
+    A new upload whose hash matches a recent pending, processing or done job
+    reuses that job's result instead of running OCR again. Entries expire
+    after OCR_DEDUP_TTL seconds; hit/miss counters live in the
+    OCR_DEDUP_STATS_CACHE alias, next to the /metrics counters.
+    """
+
+    HITS_KEY = 'ocr:dedup:hits'
+    MISSES_KEY = 'ocr:dedup:misses'
+
+    @property
+    def enabled(self):
+        return settings.OCR_DEDUP_ENABLED
+
+    @property
+    def counters(self):
+        return caches[settings.OCR_DEDUP_STATS_CACHE]
+
+    def lookup(self, content_hash, detail=False, preprocess=''):
+        """
+        Find a reusable job for the given hash, or None
+
+        Only jobs with the same preprocessing stages qualify, and jobs
+        asking for detail output only reuse detail-mode jobs.
+        """
+        from ..models import OCRJob
+
+        if not self.enabled or not content_hash:
+            return None
+
+        queryset = OCRJob.objects.filter(
+            content_hash=content_hash,
+            duplicate_of__isnull=True,
+            preprocess=preprocess,
+            status__in=['pending', 'processing', 'done']
+        )
+        if detail:
+            queryset = queryset.filter(detail=True)
+
+        ttl = settings.OCR_DEDUP_TTL
+        if ttl is not None:
+            queryset = queryset.filter(
+                created_at__gte=timezone.now() - timedelta(seconds=ttl)
+            )
+
+        return queryset.order_by('-created_at').first()
+
+    def attach(self, source, **fields):
+        """Create a job that reuses the result of the given source job"""
+        from ..models import OCRJob
+
+        job = OCRJob.objects.create(
+            image=source.image.name,
+            content_hash=source.content_hash,
+            duplicate_of=source,
+            status='pending',
+            **fields
+        )
+
+        # The source may have finished, or had an upload held in memory
+        # stored, between lookup and attach
+        source.refresh_from_db(fields=['status', 'error_message', 'image'])
+        if not job.image and source.image:
+            job.image = source.image.name
+            OCRJob.objects.filter(id=job.id, image='').update(image=job.image.name)
+        if source.is_completed:
+            copy_result(source, job)
+
+        logger.info(f"OCR job {job.id} reuses result of job {source.id}")
+        return job
+
+    def _incr(self, key):
+        try:
+            self.counters.incr(key)
+        except ValueError:
+            self.counters.add(key, 0, timeout=None)
+            self.counters.incr(key)
+
+    def record_hit(self):
+        self._incr(self.HITS_KEY)
+
+    def record_miss(self):
+        self._incr(self.MISSES_KEY)
+
+    def stats(self):
+        """Hit/miss counters and hit rate"""
+        hits = self.counters.get(self.HITS_KEY, 0)
+        misses = self.counters.get(self.MISSES_KEY, 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+    def reset(self):
+        self.counters.delete_many([self.HITS_KEY, self.MISSES_KEY])
+
+
+def copy_result(source, job):
+    """
+    Settle a duplicate job with its terminal source's outcome
+
+    A done duplicate stores no text of its own; it reads the source's
+    OCRResult (see OCRJob.get_result).
+    """
+    if source.status == 'done':
+        job.mark_as_done(None)
+    elif source.status == 'rejected':
+        job.mark_as_rejected(source.error_message)
+
+
+def propagate_to_duplicates(source):
+    """Resolve jobs that were attached to the source while it was in flight"""
+    for job in source.duplicates.filter(status__in=['pending', 'processing']):
+        copy_result(source, job)
+
+
+def hand_over_results(job_ids):
+    """
+    Pass the results of jobs about to be deleted on to their duplicates
+
+    For each of the jobs with duplicates that are not deleted along with
+    it, the oldest of those duplicates takes over its result and search
+    index rows and becomes the source of the others. Call it in the
+    transaction that deletes the jobs. Returns the number of results
+    handed over.
+    """
+    from ..models import OCRJob, OCRResult, OCRSearchDocument, OCRSearchTerm
+
+    heirs = {}
+    survivors = (
+        OCRJob.objects
+        .filter(duplicate_of__in=job_ids)
+        .exclude(id__in=job_ids)
+        .order_by('created_at')
+        .values_list('duplicate_of', 'id')
+    )
+    for source_id, job_id in survivors:
+        heirs.setdefault(source_id, job_id)
+
+    for source_id, heir_id in heirs.items():
+        OCRJob.objects.filter(duplicate_of=source_id).exclude(id=heir_id).update(
+            duplicate_of=heir_id
+        )
+        OCRJob.objects.filter(id=heir_id).update(duplicate_of=None)
+        OCRResult.objects.filter(job_id=source_id).update(job_id=heir_id)
+        OCRSearchDocument.objects.filter(job_id=source_id).update(job_id=heir_id)
+        OCRSearchTerm.objects.filter(job_id=source_id).update(job_id=heir_id)
+    return len(heirs)
+
+
+result_cache = ResultCache()
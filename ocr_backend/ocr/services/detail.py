@@ -0,0 +1,59 @@
+# ocr/services/detail.py
+
+import io
+import numpy as np
+from .compression import compress, decompress
+
+# Arrays of a packed detail blob, one row per recognized line
+DETAIL_ARRAYS = ('pages', 'boxes', 'confidence', 'text_offsets', 'text')
+
+
+def pack_detail(lines):
+    """
+    Pack recognized lines into a compact columnar blob
+
+    ``lines`` holds (page_number, box, text, confidence) tuples, where box
+    is four [x, y] corner points. Each column becomes one NumPy array:
+    page numbers (uint32), boxes rounded to whole pixels (int32, N x 4 x 2),
+    confidences (float32) and all texts as one UTF-8 buffer with N + 1
+    offsets. The arrays are written with np.savez and compressed like the
+    text result. Returns (payload, codec).
+    """
+    lines = list(lines)
+    encoded = [text.encode('utf-8') for _, _, text, _ in lines]
+
+    offsets = np.zeros(len(lines) + 1, dtype=np.uint32)
+    np.cumsum([len(text) for text in encoded], out=offsets[1:])
+
+    arrays = {
+        'pages': np.array([page for page, _, _, _ in lines], dtype=np.uint32),
+        'boxes': np.rint(
+            np.array([box for _, box, _, _ in lines], dtype=np.float64).reshape(-1, 4, 2)
+        ).astype(np.int32),
+        'confidence': np.array([conf for _, _, _, conf in lines], dtype=np.float32),
+        'text_offsets': offsets,
+        'text': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+    }
+
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return compress(buffer.getvalue())
+
+
+def unpack_detail(payload, codec):
+    """Arrays of a blob written by pack_detail(), keyed by DETAIL_ARRAYS"""
+    with np.load(io.BytesIO(decompress(payload, codec)), allow_pickle=False) as data:
+        return {name: data[name] for name in DETAIL_ARRAYS}
+
+
+def iter_detail_lines(arrays):
+    """Yield (page_number, box, text, confidence) tuples from unpacked arrays"""
+    text = arrays['text'].tobytes()
+    offsets = arrays['text_offsets']
+    for index in range(len(arrays['pages'])):
+        yield (
+            int(arrays['pages'][index]),
+            arrays['boxes'][index].tolist(),
+            text[offsets[index]:offsets[index + 1]].decode('utf-8'),
+            float(arrays['confidence'][index]),
+        )
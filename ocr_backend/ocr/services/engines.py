@@ -0,0 +1,407 @@
+# ocr/services/engines.py
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from .reader_pool import get_reader
+from .scaling import box_bounds, needs_tiling, readtext_tiled
+
+logger = logging.getLogger('ocr')
+
+
+class EngineStats:
+    """
+    Per-job engine metrics: seconds spent in each engine, in each
+    preprocessing stage (and how often a stage was skipped) and, for the
+    cascade, how many lines and pages were escalated
+
+    With ``spans`` it also records wall-clock seconds per pipeline stage
+    (read, decode, preprocess, recognize, ...), summed over pages; without
+    it span() does no timing at all.
+
+    Shared by the page threads of a multi-page job, hence the lock.
+    """
+
+    def __init__(self, engine, spans=False):
+        self.engine = engine
+        self.spans = defaultdict(float) if spans else None
+        self.timings = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.lines = 0
+        self.escalated_lines = 0
+        self.pages = 0
+        self.escalated_pages = 0
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timed(self, engine_name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self._lock:
+                self.timings[engine_name] += elapsed
+                self.calls[engine_name] += 1
+
+    @contextmanager
+    def span(self, name):
+        if self.spans is None:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start_time)
+
+    def add_span(self, name, seconds):
+        if self.spans is None or seconds is None:
+            return
+        with self._lock:
+            self.spans[name] += seconds
+
+    def spans_dict(self):
+        """Compact {stage: seconds} breakdown, or None when spans are off"""
+        if self.spans is None:
+            return None
+        with self._lock:
+            return {name: round(seconds, 4) for name, seconds in self.spans.items()}
+
+    def add_page(self, lines, escalated_lines=0, escalated=False):
+        with self._lock:
+            self.pages += 1
+            self.lines += lines
+            self.escalated_lines += escalated_lines
+            self.escalated_pages += int(escalated)
+
+    def add_stage(self, name, seconds, skipped=False):
+        with self._lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'runs': 0, 'skipped': 0})
+            if skipped:
+                stage['skipped'] += 1
+            else:
+                stage['seconds'] += seconds
+                stage['runs'] += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'engine': self.engine,
+                'timings': {name: round(seconds, 4) for name, seconds in self.timings.items()},
+                'calls': dict(self.calls),
+                'preprocess': {
+                    name: dict(stage, seconds=round(stage['seconds'], 4))
+                    for name, stage in self.stages.items()
+                },
+                'pages': self.pages,
+                'lines': self.lines,
+                'escalated_lines': self.escalated_lines,
+                'escalated_pages': self.escalated_pages,
+                'escalation_rate': (
+                    round(self.escalated_lines / self.lines, 4) if self.lines else None
+                ),
+            }
+
+
+@contextmanager
+def _timed(stats, engine_name):
+    if stats is None:
+        yield
+    else:
+        with stats.timed(engine_name):
+            yield
+
+
+@contextmanager
+def span(stats, name):
+    """stats.span(name), or nothing when there are no stats"""
+    if stats is None or stats.spans is None:
+        yield
+    else:
+        with stats.span(name):
+            yield
+
+
+class OCREngine:
+    """
+    Recognizes text lines in a preprocessed grayscale page
+
+    ``readtext`` returns (box, text, confidence) tuples like EasyOCR's
+    readtext with detail=1: box is four [x, y] corners in page pixels and
+    confidence lies in 0..1.
+    """
+
+    name = None
+
+    def readtext(self, img, languages=None, stats=None):
+        raise NotImplementedError
+
+    def read_page(self, img, languages=None, stats=None):
+        """readtext() for a whole page, counted in the job's stats"""
+        lines = self.readtext(img, languages=languages, stats=stats)
+        if stats is not None:
+            stats.add_page(len(lines))
+        return lines
+
+    def recognize_region(self, img, box, languages=None, stats=None):
+        """
+        Re-read one region of a page; returns (text, confidence)
+
+        The default crops the region and runs full recognition on it.
+        """
+        crop = _crop(img, box)
+        if crop is None:
+            return '', 0.0
+        lines = self.readtext(crop, languages=languages, stats=stats)
+        if not lines:
+            return '', 0.0
+        text = ' '.join(text for _, text, _ in lines)
+        confidence = sum(conf for _, _, conf in lines) / len(lines)
+        return text, confidence
+
+
+def _crop(img, box, padding=4):
+    left, top, right, bottom = box_bounds(box)
+    height, width = img.shape[:2]
+    x0, y0 = max(0, int(left) - padding), max(0, int(top) - padding)
+    x1, y1 = min(width, int(right) + padding + 1), min(height, int(bottom) + padding + 1)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return img[y0:y1, x0:x1]
+
+
+class EasyOCREngine(OCREngine):
+    """Neural detection and recognition through the per-process reader pool"""
+
+    name = 'easyocr'
+
+    def readtext(self, img, languages=None, stats=None):
+        reader = get_reader(languages)
+        with _timed(stats, self.name):
+            if needs_tiling(img):
+                return readtext_tiled(reader, img)
+            return reader.readtext(img, detail=1)
+
+    def recognize_region(self, img, box, languages=None, stats=None):
+        # The region is already located, so skip the detector
+        crop = _crop(img, box)
+        if crop is None:
+            return '', 0.0
+        height, width = crop.shape[:2]
+        reader = get_reader(languages)
+        with _timed(stats, self.name):
+            lines = reader.recognize(
+                crop,
+                horizontal_list=[[0, width, 0, height]],
+                free_list=[],
+                detail=1
+            )
+        if not lines:
+            return '', 0.0
+        text = ' '.join(text for _, text, _ in lines)
+        return text, sum(conf for _, _, conf in lines) / len(lines)
+
+
+# EasyOCR language codes and their Tesseract traineddata names; codes
+# not listed are passed to Tesseract unchanged
+TESSERACT_LANGUAGES = {
+    'en': 'eng',
+    'fr': 'fra',
+    'de': 'deu',
+    'es': 'spa',
+    'it': 'ita',
+    'pt': 'por',
+    'nl': 'nld',
+    'pl': 'pol',
+    'ru': 'rus',
+    'uk': 'ukr',
+    'tr': 'tur',
+    'ar': 'ara',
+    'hi': 'hin',
+    'ja': 'jpn',
+    'ko': 'kor',
+    'ch_sim': 'chi_sim',
+    'ch_tra': 'chi_tra',
+}
+
+
+def tesseract_lang(languages=None):
+    """
+    Tesseract ``lang`` argument for EasyOCR-style language codes
+
+    Without languages it is OCR_TESSERACT_LANG; the traineddata of every
+    requested language must be installed.
+    """
+    if not languages:
+        return settings.OCR_TESSERACT_LANG
+    if isinstance(languages, str):
+        languages = [languages]
+    codes = [TESSERACT_LANGUAGES.get(code, code) for code in languages]
+    return '+'.join(dict.fromkeys(codes))
+
+
+class TesseractEngine(OCREngine):
+    """
+    Tesseract through pytesseract, the cheap path for clean printed pages
+
+    Word results are grouped into lines by Tesseract's block, paragraph
+    and line numbers; a line's confidence is the mean of its words.
+    Requested languages are mapped with tesseract_lang.
+    """
+
+    name = 'tesseract'
+
+    def __init__(self):
+        import pytesseract
+        if settings.OCR_TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = settings.OCR_TESSERACT_CMD
+        self.pytesseract = pytesseract
+
+    def readtext(self, img, languages=None, stats=None):
+        with _timed(stats, self.name):
+            data = self.pytesseract.image_to_data(
+                img,
+                lang=tesseract_lang(languages),
+                config=settings.OCR_TESSERACT_CONFIG,
+                output_type=self.pytesseract.Output.DICT
+            )
+
+        lines = {}
+        for i, word in enumerate(data['text']):
+            confidence = float(data['conf'][i])
+            if confidence < 0 or not word.strip():
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            left, top = data['left'][i], data['top'][i]
+            right, bottom = left + data['width'][i], top + data['height'][i]
+            line = lines.setdefault(key, {'words': [], 'confs': [], 'bounds': [left, top, right, bottom]})
+            line['words'].append(word)
+            line['confs'].append(confidence / 100.0)
+            bounds = line['bounds']
+            line['bounds'] = [
+                min(bounds[0], left), min(bounds[1], top),
+                max(bounds[2], right), max(bounds[3], bottom)
+            ]
+
+        results = []
+        for key in sorted(lines):
+            line = lines[key]
+            left, top, right, bottom = line['bounds']
+            box = [[left, top], [right, top], [right, bottom], [left, bottom]]
+            results.append((box, ' '.join(line['words']), sum(line['confs']) / len(line['confs'])))
+        return results
+
+
+class CascadeEngine(OCREngine):
+    """
+    Cheap engine first, expensive engine only where it is unsure
+
+    Lines the primary engine reads with confidence below
+    OCR_CASCADE_CONFIDENCE are re-read by the fallback engine, which
+    wins if it is more confident. When nothing is found, or at least
+    OCR_CASCADE_PAGE_ESCALATION of the lines are unsure, the whole page
+    goes to the fallback instead.
+    """
+
+    name = 'cascade'
+
+    def __init__(self, primary, fallback, threshold=None, page_escalation=None):
+        self.primary = primary
+        self.fallback = fallback
+        self._threshold = threshold
+        self._page_escalation = page_escalation
+
+    @property
+    def threshold(self):
+        if self._threshold is None:
+            return settings.OCR_CASCADE_CONFIDENCE
+        return self._threshold
+
+    @property
+    def page_escalation(self):
+        if self._page_escalation is None:
+            return settings.OCR_CASCADE_PAGE_ESCALATION
+        return self._page_escalation
+
+    def readtext(self, img, languages=None, stats=None):
+        return self.read_page(img, languages=languages, stats=stats)
+
+    def read_page(self, img, languages=None, stats=None):
+        lines = self.primary.readtext(img, languages=languages, stats=stats)
+        unsure = [i for i, (_, _, conf) in enumerate(lines) if conf < self.threshold]
+
+        if not lines or len(unsure) >= self.page_escalation * len(lines):
+            logger.info(
+                f"{self.primary.name} unsure on {len(unsure)}/{len(lines)} lines, "
+                f"escalating page to {self.fallback.name}"
+            )
+            lines = self.fallback.readtext(img, languages=languages, stats=stats)
+            if stats is not None:
+                stats.add_page(len(lines), escalated_lines=len(lines), escalated=True)
+            return lines
+
+        lines = list(lines)
+        for i in unsure:
+            box, text, conf = lines[i]
+            new_text, new_conf = self.fallback.recognize_region(
+                img, box, languages=languages, stats=stats
+            )
+            if new_text and new_conf > conf:
+                lines[i] = (box, new_text, new_conf)
+
+        if stats is not None:
+            stats.add_page(len(lines), escalated_lines=len(unsure))
+        return lines
+
+
+ENGINES = {
+    EasyOCREngine.name: EasyOCREngine,
+    TesseractEngine.name: TesseractEngine,
+}
+
+_engines = {}
+# Re-entrant: building a cascade looks up its two engines
+_lock = threading.RLock()
+
+
+def _build_engine(name):
+    if name == CascadeEngine.name:
+        return CascadeEngine(
+            get_engine(settings.OCR_CASCADE_PRIMARY),
+            get_engine(settings.OCR_CASCADE_FALLBACK)
+        )
+    try:
+        return ENGINES[name]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown OCR_ENGINE '{name}'. "
+            f"Choose one of: {', '.join([*ENGINES, CascadeEngine.name])}"
+        )
+
+
+def uses_easyocr(name=None):
+    """Whether OCR_ENGINE (or the given engine) ever runs EasyOCR"""
+    name = name or settings.OCR_ENGINE
+    if name == CascadeEngine.name:
+        return EasyOCREngine.name in (
+            settings.OCR_CASCADE_PRIMARY, settings.OCR_CASCADE_FALLBACK
+        )
+    return name == EasyOCREngine.name
+
+
+def get_engine(name=None):
+    """Return the process-wide engine for OCR_ENGINE (or the given name)"""
+    name = name or settings.OCR_ENGINE
+    engine = _engines.get(name)
+    if engine is None:
+        with _lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = _build_engine(name)
+                _engines[name] = engine
+    return engine
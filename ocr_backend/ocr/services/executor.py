@@ -0,0 +1,131 @@
+# ocr/services/executor.py
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+
+logger = logging.getLogger('ocr')
+
+
+class ExecutorQueueFull(Exception):
+    """Raised when the executor cannot accept more work right now"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(
+            f"OCR queue is full, retry after {retry_after} seconds"
+        )
+
+
+def _init_worker(settings_module, warmup_languages):
+    """
+    Set up Django in a new worker process and, with
+    OCR_WARMUP_ON_WORKER_START, load the EasyOCR readers OCR_ENGINE needs
+    """
+    import os
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+    from .engines import uses_easyocr
+    from .reader_pool import reader_pool
+    # Tesseract alone needs no model, so skip the load and its memory
+    if settings.OCR_WARMUP_ON_WORKER_START and uses_easyocr():
+        reader_pool.warm_up(warmup_languages)
+
+
+class OCRExecutor:
+    """
+    Process pool for OCR work on hosts without a Celery broker
+
+    Every child process sets up Django and keeps its own warmed EasyOCR
+    reader, so preprocessing and inference run on all cores without the
+    GIL. At most ``max_workers + max_queue`` calls are accepted at once;
+    beyond that ``submit`` raises ExecutorQueueFull instead of queueing
+    without bound.
+    """
+
+    def __init__(self, max_workers=None, max_queue=None, retry_after=None):
+        self.max_workers = max_workers or settings.OCR_EXECUTOR_WORKERS
+        self.max_queue = (
+            settings.OCR_EXECUTOR_MAX_QUEUE if max_queue is None else max_queue
+        )
+        self.retry_after = retry_after or settings.OCR_EXECUTOR_RETRY_AFTER
+        self.capacity = self.max_workers + self.max_queue
+
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _create_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(settings.SETTINGS_MODULE, settings.OCR_WARMUP_LANGUAGES)
+        )
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+            return self._pool
+
+    def _reset_pool(self, broken_pool):
+        """Replace a pool whose worker died, unless already replaced"""
+        with self._lock:
+            if self._pool is broken_pool:
+                logger.warning("OCR process pool broken, starting a new one")
+                self._pool = None
+                broken_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"OCR worker process failed: {future.exception()}")
+
+    def has_capacity(self):
+        """Check whether a submit would currently be accepted"""
+        return self.in_flight < self.capacity
+
+    @property
+    def in_flight(self):
+        """Calls running or waiting in the pool"""
+        return self._in_flight
+
+    def submit(self, fn, *args):
+        """Run fn(*args) in a worker process or raise ExecutorQueueFull"""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorQueueFull(self.retry_after)
+
+        with self._lock:
+            self._in_flight += 1
+
+        try:
+            pool = self._get_pool()
+            try:
+                future = pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self._reset_pool(pool)
+                future = self._get_pool().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
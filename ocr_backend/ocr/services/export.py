@@ -0,0 +1,66 @@
+# ocr/services/export.py
+
+import json
+from django.conf import settings
+
+
+def result_etag(job, fmt):
+    """
+    Strong ETag of a finished job's result in one format
+
+    Derived from the job ID and completion time, so it is known without
+    loading the text; re-running a job changes completed_at and the tag.
+    """
+    return f'"{job.id}-{int(job.completed_at.timestamp() * 1_000_000)}-{fmt}"'
+
+
+def iter_txt(result, chunk_size=None):
+    """Plain-text result straight from storage, in byte chunks"""
+    yield from result.iter_text_bytes(chunk_size or settings.OCR_RESULT_STREAM_CHUNK_SIZE)
+
+
+def _iter_lines(chunks):
+    """Split a stream of UTF-8 byte chunks into decoded lines"""
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            yield line.decode('utf-8')
+    if pending:
+        yield pending.decode('utf-8')
+
+
+def _record(data):
+    return (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def iter_ndjson(job, chunk_size=None):
+    """
+    Result as newline-delimited JSON, one record per text line
+
+    Records are {"page": n, "line": n, "text": "..."}; failed pages of a
+    multi-page job yield {"page": n, "error": "..."} instead. Multi-page
+    jobs are read page by page from ocr_pages, others from the stored
+    result, so the full text is never held in memory at once.
+    """
+    chunk_size = chunk_size or settings.OCR_RESULT_STREAM_CHUNK_SIZE
+
+    if job.pages_total and job.pages_total > 1:
+        pages = (
+            job.pages
+            .order_by('page_number')
+            .only('page_number', 'status', 'codec', 'text_data', 'error_message')
+            .iterator(chunk_size=16)
+        )
+        for page in pages:
+            if page.status == 'rejected':
+                yield _record({'page': page.page_number, 'error': page.error_message})
+                continue
+            for number, line in enumerate((page.text or '').split('\n'), 1):
+                yield _record({'page': page.page_number, 'line': number, 'text': line})
+        return
+
+    lines = _iter_lines(job.result.iter_text_bytes(chunk_size))
+    for number, line in enumerate(lines, 1):
+        yield _record({'page': 1, 'line': number, 'text': line})
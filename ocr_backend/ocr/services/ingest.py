@@ -0,0 +1,115 @@
+# ocr/services/ingest.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+
+logger = logging.getLogger('ocr')
+
+# Execution modes whose workers the web process hands uploads to directly:
+# in shared memory, or with the call through the process pool's pipe
+LOCAL_MODES = ('eager', 'thread', 'process')
+
+RETENTION_CHOICES = ('keep', 'none')
+
+
+class UploadBuffers:
+    """
+    In-process handoff of upload bytes to local OCR workers
+
+    With OCR_INGEST_MODE = 'memory' and a local executor, an upload that
+    Django kept in memory is handed to the worker as is instead of being
+    written to MEDIA_ROOT and read back by path; process-pool workers
+    get the bytes with the call (see ProcessPoolDispatcher). The
+    original is then written in the background
+    (OCR_INGEST_RETENTION = 'keep') or never ('none'). At most
+    OCR_INGEST_MAX_BUFFERED_BYTES wait here at once; past that, and for
+    uploads Django spooled to a temporary file, the disk path is used.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._persist_pool = None
+
+    @property
+    def enabled(self):
+        return (
+            settings.OCR_INGEST_MODE == 'memory'
+            and settings.OCR_EXECUTION_MODE in LOCAL_MODES
+        )
+
+    def read(self, upload):
+        """
+        The upload's bytes if it can be handed over in memory, else None
+
+        BytesIO.getvalue() shares the buffer Django already filled, so
+        this does not copy the upload.
+        """
+        if not self.enabled or not hasattr(upload.file, 'getvalue'):
+            return None
+        data = upload.file.getvalue()
+        with self._lock:
+            if self._bytes + len(data) > settings.OCR_INGEST_MAX_BUFFERED_BYTES:
+                logger.info("Upload buffer budget exhausted, storing upload on disk")
+                return None
+        return data
+
+    def put(self, job_id, data):
+        with self._lock:
+            self._buffers[str(job_id)] = data
+            self._bytes += len(data)
+
+    def pop(self, job_id):
+        """Take a job's upload bytes, or None if it has none in this process"""
+        with self._lock:
+            data = self._buffers.pop(str(job_id), None)
+            if data is not None:
+                self._bytes -= len(data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {'jobs': len(self._buffers), 'bytes': self._bytes}
+
+    def persist(self, job_id, name, data):
+        """Write the original upload in the background, per OCR_INGEST_RETENTION"""
+        if settings.OCR_INGEST_RETENTION != 'keep':
+            return
+        with self._lock:
+            if self._persist_pool is None:
+                self._persist_pool = ThreadPoolExecutor(
+                    max_workers=settings.OCR_INGEST_PERSIST_WORKERS,
+                    thread_name_prefix='ocr-persist'
+                )
+        self._persist_pool.submit(_persist_upload, job_id, name, data)
+
+
+def _persist_upload(job_id, name, data):
+    """
+    Store an upload and point its job at the file
+
+    Duplicates attached while the bytes were still in memory copied the
+    empty image of their source, so they are pointed at the file too.
+    """
+    from ..models import OCRJob
+    try:
+        field = OCRJob._meta.get_field('image')
+        stored = default_storage.save(field.generate_filename(None, name), ContentFile(data))
+        if not OCRJob.objects.filter(id=job_id).update(image=stored):
+            # The job was deleted meanwhile
+            default_storage.delete(stored)
+            return
+        OCRJob.objects.filter(duplicate_of_id=job_id, image='').update(image=stored)
+    except Exception:
+        logger.exception(f"Failed to store the upload of job {job_id}")
+    finally:
+        connection.close()
+
+
+upload_buffers = UploadBuffers()
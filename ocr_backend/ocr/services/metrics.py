@@ -0,0 +1,112 @@
+# ocr/services/metrics.py
+
+import logging
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger('ocr')
+
+# Spans recorded per job, in pipeline order. 'total' is the job's
+# processing_time, queue wait excluded.
+SPANS = ('queue_wait', 'read', 'decode', 'preprocess', 'recognize', 'save', 'total')
+
+JOB_STATUSES = ('done', 'rejected')
+
+
+class MetricsRegistry:
+    """
+    Job counters and per-span latency histograms in Django's cache
+
+    Each observation increments one histogram bucket and the span's sum
+    (kept in microseconds, as cache counters are integers). The counters
+    live in their own cache alias, OCR_METRICS_CACHE, so per-job entries
+    of other caches never cull them. Celery workers write to it
+    directly, which is why settings insist on a shared cache in that
+    mode; 'process' mode jobs are counted by the web process when their
+    future completes (see ocr.dispatch). render() produces the
+    Prometheus text exposition format with cumulative buckets.
+    """
+
+    KEY_PREFIX = 'ocr:metrics:'
+
+    @property
+    def cache(self):
+        return caches[settings.OCR_METRICS_CACHE]
+
+    @property
+    def enabled(self):
+        return settings.OCR_METRICS_ENABLED
+
+    def _incr(self, key, delta=1):
+        key = f'{self.KEY_PREFIX}{key}'
+        try:
+            self.cache.incr(key, delta)
+        except ValueError:
+            # First observation; another worker may create it concurrently
+            if not self.cache.add(key, delta, timeout=None):
+                self.cache.incr(key, delta)
+
+    def _bucket(self, seconds):
+        for index, bound in enumerate(settings.OCR_METRICS_BUCKETS):
+            if seconds <= bound:
+                return index
+        return 'inf'
+
+    def observe_job(self, status, spans=None):
+        """Count a finished job and add its {span: seconds} to the histograms"""
+        if not self.enabled:
+            return
+        try:
+            self._incr(f'jobs:{status}')
+            for name, seconds in (spans or {}).items():
+                if name not in SPANS or seconds is None:
+                    continue
+                self._incr(f'span:{name}:{self._bucket(seconds)}')
+                self._incr(f'span:{name}:sum', int(seconds * 1_000_000))
+        except Exception as e:
+            logger.error(f"Metrics update failed: {str(e)}")
+
+    def snapshot(self):
+        """Raw counter values, fetched in one cache round trip"""
+        buckets = [*range(len(settings.OCR_METRICS_BUCKETS)), 'inf']
+        keys = [f'jobs:{status}' for status in JOB_STATUSES]
+        keys += [
+            f'span:{name}:{suffix}'
+            for name in SPANS
+            for suffix in [*buckets, 'sum']
+        ]
+        values = self.cache.get_many([f'{self.KEY_PREFIX}{key}' for key in keys])
+        return {key: values.get(f'{self.KEY_PREFIX}{key}', 0) for key in keys}
+
+    def render(self):
+        """Prometheus text exposition of all counters and histograms"""
+        values = self.snapshot()
+        lines = [
+            '# HELP ocr_jobs_total Finished OCR jobs by final status.',
+            '# TYPE ocr_jobs_total counter',
+        ]
+        for status in JOB_STATUSES:
+            lines.append(f'ocr_jobs_total{{status="{status}"}} {values[f"jobs:{status}"]}')
+
+        lines += [
+            '# HELP ocr_stage_seconds Wall-clock seconds per OCR job stage.',
+            '# TYPE ocr_stage_seconds histogram',
+        ]
+        for name in SPANS:
+            cumulative = 0
+            for index, bound in enumerate(settings.OCR_METRICS_BUCKETS):
+                cumulative += values[f'span:{name}:{index}']
+                lines.append(
+                    f'ocr_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}'
+                )
+            cumulative += values[f'span:{name}:inf']
+            lines.append(f'ocr_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {cumulative}')
+            lines.append(
+                f'ocr_stage_seconds_sum{{stage="{name}"}} '
+                f'{values[f"span:{name}:sum"] / 1_000_000:.6f}'
+            )
+            lines.append(f'ocr_stage_seconds_count{{stage="{name}"}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,249 @@
+# ocr/services/notifier.py
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from django.conf import settings
+
+logger = logging.getLogger('ocr')
+
+TERMINAL_STATUSES = ('done', 'rejected')
+
+
+def is_terminal(payload):
+    return bool(payload) and payload.get('status') in TERMINAL_STATUSES
+
+
+class LocalSubscription:
+    """Receives status payloads published in this process"""
+
+    def __init__(self, notifier, job_id):
+        self.notifier = notifier
+        self.job_id = job_id
+        self.queue = queue.Queue()
+
+    def put(self, payload):
+        self.queue.put(payload)
+
+    def get(self, timeout):
+        """Next payload, or None if nothing arrived within timeout seconds"""
+        try:
+            return self.queue.get(timeout=max(0, timeout))
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.notifier._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncLocalSubscription:
+    """
+    LocalSubscription for async views
+
+    Payloads are handed to the subscriber's event loop and queued on an
+    asyncio.Queue, so waiting holds no thread.
+    """
+
+    def __init__(self, notifier, job_id):
+        self.notifier = notifier
+        self.job_id = job_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, payload):
+        # Publishers run in other threads
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+
+    async def get(self, timeout):
+        """Next payload, or None if nothing arrived within timeout seconds"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), max(0, timeout))
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.notifier._unsubscribe(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class LocalNotifier:
+    """
+    In-process pub/sub for job status changes
+
+    Works when OCR runs in the same process as the waiting request
+    (eager and thread execution modes) and as the stand-in for Redis in
+    development and tests.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def publish(self, job_id, payload):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(str(job_id), ()))
+        for subscription in subscriptions:
+            subscription.put(payload)
+
+    def subscribe(self, job_id):
+        return self._subscribe(LocalSubscription(self, str(job_id)))
+
+    async def subscribe_async(self, job_id):
+        return self._subscribe(AsyncLocalSubscription(self, str(job_id)))
+
+    def _subscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.setdefault(subscription.job_id, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.job_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.job_id]
+
+
+class RedisSubscription:
+    """Receives status payloads from a Redis channel"""
+
+    def __init__(self, client, channel):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(channel)
+
+    def get(self, timeout):
+        deadline = time.monotonic() + max(0, timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = self.pubsub.get_message(timeout=remaining)
+            if message and message.get('type') == 'message':
+                return json.loads(message['data'])
+
+    def close(self):
+        self.pubsub.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncRedisSubscription:
+    """RedisSubscription for async views, over redis.asyncio"""
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        deadline = time.monotonic() + max(0, timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            message = await self.pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=remaining
+            )
+            if message and message.get('type') == 'message':
+                return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class RedisNotifier:
+    """
+    Cross-process pub/sub over Redis (or any server speaking its protocol)
+
+    Needed when OCR runs in Celery workers on other hosts.
+    """
+
+    CHANNEL_PREFIX = 'ocr:job:'
+
+    def __init__(self, url):
+        import redis
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        # redis.asyncio connections belong to the loop that opened them
+        self._async_clients = {}
+
+    def publish(self, job_id, payload):
+        self.client.publish(f'{self.CHANNEL_PREFIX}{job_id}', json.dumps(payload))
+
+    def subscribe(self, job_id):
+        return RedisSubscription(self.client, f'{self.CHANNEL_PREFIX}{job_id}')
+
+    async def subscribe_async(self, job_id):
+        pubsub = self._async_client().pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(f'{self.CHANNEL_PREFIX}{job_id}')
+        return AsyncRedisSubscription(pubsub)
+
+    def _async_client(self):
+        import redis.asyncio
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            # Drop clients of loops that have finished (one per request
+            # under a WSGI server's async adapter)
+            for closed in [l for l in self._async_clients if l.is_closed()]:
+                del self._async_clients[closed]
+            client = self._async_clients[loop] = redis.asyncio.Redis.from_url(self.url)
+        return client
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+def get_notifier():
+    """Process-wide notifier for OCR_NOTIFY_BACKEND"""
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                if settings.OCR_NOTIFY_BACKEND == 'redis':
+                    _notifier = RedisNotifier(settings.OCR_NOTIFY_REDIS_URL)
+                else:
+                    _notifier = LocalNotifier()
+    return _notifier
+
+
+def publish_status(job_id, payload):
+    """Publish a status change; failures are logged, never raised"""
+    try:
+        get_notifier().publish(job_id, payload)
+    except Exception as e:
+        logger.error(f"Failed to publish status of job {job_id}: {str(e)}")
+
+
+def subscribe(job_id):
+    """Subscribe to status changes of one job"""
+    return get_notifier().subscribe(job_id)
+
+
+async def subscribe_async(job_id):
+    """Subscribe to status changes of one job from async code"""
+    return await get_notifier().subscribe_async(job_id)
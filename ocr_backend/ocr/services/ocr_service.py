@@ -1,80 +1,317 @@
 # ocr/services/ocr_service.py
 
-import easyocr
 import cv2
 import numpy as np
 import logging
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from django.conf import settings
+from .pages import iter_pages
+from .reader_pool import get_reader
+from .engines import get_engine, span
+from .preprocessing import PreprocessPipeline
+from .scaling import rescale_for_ocr, unscale_box
 
 logger = logging.getLogger('ocr')
 
-# Initialize EasyOCR reader (global to avoid reloading)
-reader = easyocr.Reader(['en'], gpu=False)
-
 
 class OCRService:
     """Service class for OCR operations"""
     
     @staticmethod
-    def validate_image(image_path):
-        """Validate if image exists and is readable"""
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
+    def describe_source(source):
+        """Short label for an image source, used in logs and errors"""
+        if isinstance(source, (str, os.PathLike)):
+            return str(source)
+        if isinstance(source, np.ndarray):
+            return f"<array {source.shape}>"
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return f"<{len(source)} bytes>"
+        return getattr(source, 'name', None) or repr(source)
+    
+    @staticmethod
+    def read_image_bytes(source):
+        """
+        Return the encoded image as a buffer without extra copies
         
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Could not read image: {image_path}")
+        Accepts a filesystem path, bytes/bytearray/memoryview or a readable
+        file object. Files are read once into a preallocated bytearray.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return source
         
-        return True
+        if hasattr(source, 'read'):
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            return source.read()
+        
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Image file not found: {source}")
+        
+        buffer = bytearray(os.path.getsize(source))
+        with open(source, 'rb') as f:
+            f.readinto(buffer)
+        return buffer
     
     @staticmethod
-    def preprocess_image(image_path):
-        """Preprocess image for better OCR results"""
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    def load_image(source, flags=cv2.IMREAD_GRAYSCALE):
+        """
+        Decode an image source exactly once into an ndarray
+        
+        Already decoded arrays are returned unchanged, so the result can be
+        passed through validation, preprocessing and recognition freely.
+        """
+        if isinstance(source, np.ndarray):
+            return source
         
+        data = OCRService.read_image_bytes(source)
+        # np.frombuffer wraps the bytes without copying them
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
         if img is None:
-            raise ValueError(f"Could not read image: {image_path}")
+            raise ValueError(
+                f"Could not read image: {OCRService.describe_source(source)}"
+            )
         
-        # Improve contrast
-        img = cv2.equalizeHist(img)
+        return img
+    
+    @staticmethod
+    def validate_image(image):
+        """Validate if image exists and is readable"""
+        img = OCRService.load_image(image)
         
-        # Remove noise
-        img = cv2.GaussianBlur(img, (3, 3), 0)
+        if img.size == 0 or img.ndim not in (2, 3):
+            raise ValueError(
+                f"Invalid image data: {OCRService.describe_source(image)}"
+            )
         
-        # Apply threshold
-        _, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return True
+    
+    @staticmethod
+    def preprocess_image(image, stages=None, stats=None):
+        """
+        Preprocess image for better OCR results
         
-        return img
+        Runs the stages named in ``stages`` (default
+        OCR_PREPROCESS_STAGES: equalize, denoise, threshold), skipping
+        those the image statistics say are unnecessary.
+        """
+        img = OCRService.load_image(image)
+        return PreprocessPipeline(stages).run(img, stats=stats)
     
     @staticmethod
-    def process_image(image_path):
-        """Extract text from image using EasyOCR"""
+    def process_image(source, languages=None, detail=False, stats=None,
+                      preprocess=None, on_decoded=None):
+        """
+        Extract text from image using EasyOCR
+        
+        The source may be a path, raw bytes, a memoryview, a file object or
+        an already decoded array; it is decoded a single time.
+        
+        Like EasyOCR's readtext, ``detail=True`` also returns the lines
+        themselves: (text, [(box, line_text, confidence), ...]) with boxes
+        in source image pixels. ``preprocess`` overrides the preprocessing
+        stages. Engine and stage timings, and the read/decode/preprocess/
+        recognize spans, are added to ``stats``, an EngineStats, when given.
+        ``on_decoded`` is called with the decoded image before it is
+        rescaled, e.g. to render previews without decoding it again.
+        """
         try:
-            logger.info(f"Processing image: {image_path}")
+            logger.info(f"Processing image: {OCRService.describe_source(source)}")
+            
+            data = source
+            if not isinstance(source, np.ndarray):
+                with span(stats, 'read'):
+                    data = OCRService.read_image_bytes(source)
+            
+            # Decode once and reuse the array for every step
+            with span(stats, 'decode'):
+                img = OCRService.load_image(data)
+                
+                # Validate image first
+                OCRService.validate_image(img)
             
-            # Validate image first
-            OCRService.validate_image(image_path)
+            if on_decoded is not None:
+                on_decoded(img)
             
-            # Preprocess image
-            img = OCRService.preprocess_image(image_path)
+            with span(stats, 'preprocess'):
+                # Bring text to the target height before the costly steps
+                img, scale = rescale_for_ocr(img)
+                
+                # Preprocess image
+                img = OCRService.preprocess_image(img, stages=preprocess, stats=stats)
             
-            # Extract text
-            results = reader.readtext(img, detail=0)
+            # Extract text with the configured engine (OCR_ENGINE)
+            with span(stats, 'recognize'):
+                detections = get_engine().read_page(img, languages=languages, stats=stats)
             
             # Join results
-            text = "\n".join(results)
+            text = "\n".join(line_text for _, line_text, _ in detections)
             
             if not text.strip():
                 logger.warning("No text extracted from image")
-                return "No text found in image"
+                text = "No text found in image"
+            else:
+                logger.info(f"Extracted {len(text)} characters")
             
-            logger.info(f"Extracted {len(text)} characters")
+            if detail:
+                lines = [
+                    (unscale_box(box, scale), line_text, float(confidence))
+                    for box, line_text, confidence in detections
+                ]
+                return text, lines
             return text
             
         except Exception as e:
             logger.error(f"OCR extraction failed: {str(e)}")
             raise
+    
+    @staticmethod
+    def iter_document(source, languages=None, detail=False, stats=None,
+                      preprocess=None, on_decoded=None):
+        """
+        OCR a multi-page document page by page
+        
+        Pages are decoded lazily and recognized with at most
+        OCR_PAGE_CONCURRENCY pages in flight. Yields
+        (page_number, text_or_exception, seconds) as pages finish, which
+        is not necessarily in page order. With ``detail`` the result is
+        the (text, lines) pair of process_image. ``on_decoded`` only
+        sees the first page.
+        """
+        limit = max(1, settings.OCR_PAGE_CONCURRENCY)
+        
+        def recognize(page_number, img):
+            start_time = time.time()
+            try:
+                result = OCRService.process_image(
+                    img, languages=languages, detail=detail, stats=stats,
+                    preprocess=preprocess,
+                    on_decoded=on_decoded if page_number == 1 else None
+                )
+            except Exception as e:
+                result = e
+            return page_number, result, time.time() - start_time
+        
+        with ThreadPoolExecutor(max_workers=limit) as pool:
+            in_flight = set()
+            for page_number, img in iter_pages(source):
+                if len(in_flight) >= limit:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield future.result()
+                in_flight.add(pool.submit(recognize, page_number, img))
+                # Drop our reference so only in-flight pages stay in memory
+                del img
+            
+            for future in as_completed(in_flight):
+                yield future.result()
+    
+    @staticmethod
+    def _prepare_for_batch(source):
+        """Validate and preprocess one batch member, returning errors as values"""
+        try:
+            img = OCRService.load_image(source)
+            OCRService.validate_image(img)
+            img, _ = rescale_for_ocr(img)
+            return OCRService.preprocess_image(img)
+        except Exception as e:
+            logger.error(
+                f"Preprocessing failed for "
+                f"{OCRService.describe_source(source)}: {str(e)}"
+            )
+            return e
+    
+    @staticmethod
+    def pad_to_common_size(images):
+        """Pad grayscale images with white borders to a shared shape"""
+        height = max(img.shape[0] for img in images)
+        width = max(img.shape[1] for img in images)
+        padded = []
+        for img in images:
+            canvas = np.full((height, width), 255, dtype=img.dtype)
+            canvas[:img.shape[0], :img.shape[1]] = img
+            padded.append(canvas)
+        return padded
+    
+    @staticmethod
+    def size_buckets(images):
+        """
+        Group image indexes by size, each side rounded up to a multiple
+        of OCR_BATCH_BUCKET_STEP
+        
+        Padding a bucket to its largest member then adds less than one
+        step per side, where one shared shape for the whole batch would
+        letterbox every image to the largest of them.
+        """
+        step = settings.OCR_BATCH_BUCKET_STEP
+        buckets = {}
+        for index, img in enumerate(images):
+            key = (-(-img.shape[0] // step), -(-img.shape[1] // step))
+            buckets.setdefault(key, []).append(index)
+        return list(buckets.values())
+    
+    @staticmethod
+    def _read_one(reader, img):
+        """Recognize one prepared batch member, returning errors as values"""
+        try:
+            return reader.readtext(img, detail=0)
+        except Exception as e:
+            logger.error(f"OCR failed for {OCRService.describe_source(img)}: {str(e)}")
+            return e
+    
+    @staticmethod
+    def process_batch(sources, languages=None):
+        """
+        Extract text from several single-page images with batched model
+        passes
+        
+        Preprocessing runs in a thread pool (OpenCV releases the GIL), then
+        images of similar size go through reader.readtext_batched
+        together, one call per size bucket. A bucket whose batched pass
+        fails is retried one image at a time, so only the images at fault
+        fail. This always uses EasyOCR with the default preprocessing;
+        run_ocr_batch sends other jobs through run_ocr_job. Returns a
+        list aligned with sources holding either the extracted text or
+        the exception raised for that image.
+        """
+        logger.info(f"Processing batch of {len(sources)} images")
+        
+        workers = min(settings.OCR_BATCH_PREPROCESS_WORKERS, len(sources)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            prepared = list(pool.map(OCRService._prepare_for_batch, sources))
+        
+        results = list(prepared)
+        ready = [i for i, img in enumerate(prepared) if not isinstance(img, Exception)]
+        if not ready:
+            return results
+        
+        reader = get_reader(languages)
+        for bucket in OCRService.size_buckets([prepared[i] for i in ready]):
+            indexes = [ready[i] for i in bucket]
+            # Images of a bucket are letterboxed rather than resized so
+            # glyph aspect ratios survive the shared detector pass
+            try:
+                images = OCRService.pad_to_common_size([prepared[i] for i in indexes])
+                batched = reader.readtext_batched(
+                    images,
+                    detail=0,
+                    batch_size=settings.OCR_BATCH_RECOGNIZER_SIZE
+                )
+            except Exception as e:
+                logger.error(
+                    f"Batched OCR of {len(indexes)} images failed, retrying "
+                    f"them one at a time: {str(e)}"
+                )
+                batched = [OCRService._read_one(reader, prepared[i]) for i in indexes]
+            for index, lines in zip(indexes, batched):
+                if isinstance(lines, Exception):
+                    results[index] = lines
+                    continue
+                text = "\n".join(lines)
+                results[index] = text if text.strip() else "No text found in image"
+        
+        return results
 
 
 class TextCleaner:
@@ -96,9 +333,13 @@ class TextCleaner:
 
 
 # Legacy function for backward compatibility
-def extract_text(image_path):
+def extract_text(source, languages=None, detail=False, stats=None,
+                 preprocess=None, on_decoded=None):
     """
     Legacy function - Extract text from image
     Uses OCRService internally
     """
-    return OCRService.process_image(image_path)
\ No newline at end of file
+    return OCRService.process_image(
+        source, languages=languages, detail=detail, stats=stats,
+        preprocess=preprocess, on_decoded=on_decoded
+    )
\ No newline at end of file
@@ -0,0 +1,158 @@
+# ocr/services/pages.py
+
+import io
+import os
+import logging
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger('ocr')
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # PDF support is optional
+    pdfium = None
+
+
+def is_pdf(source):
+    """Check whether a path, buffer or file object holds a PDF document"""
+    if isinstance(source, (str, os.PathLike)):
+        return str(source).lower().endswith('.pdf')
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:5]) == b'%PDF-'
+    name = getattr(source, 'name', '') or ''
+    return name.lower().endswith('.pdf')
+
+
+def _require_pdfium():
+    if pdfium is None:
+        raise ValueError("PDF support requires the 'pypdfium2' package")
+
+
+def _open_source(source):
+    """Path or file object suitable for Pillow and pdfium"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def _frame_to_gray(frame):
+    """Convert a Pillow frame to an 8-bit grayscale ndarray"""
+    if frame.mode in ('I;16', 'I;16B', 'I;16L', 'I', 'F'):
+        # High bit-depth scans would be clipped by convert('L')
+        arr = np.asarray(frame, dtype=np.float32)
+        low, high = float(arr.min()), float(arr.max())
+        if high <= low:
+            return np.zeros(arr.shape, dtype=np.uint8)
+        return ((arr - low) * (255.0 / (high - low))).astype(np.uint8)
+    return np.asarray(frame.convert('L'))
+
+
+def check_page_bounds(page_number, width, height):
+    """
+    Refuse a page whose pixels would exceed the upload bounds
+
+    The same OCR_UPLOAD_MAX_PIXELS / OCR_UPLOAD_MAX_SIDE limits the
+    upload pre-flight applies, checked before the page is decoded or
+    rendered so a small file cannot expand into gigabytes.
+    """
+    if (
+        width * height > settings.OCR_UPLOAD_MAX_PIXELS
+        or max(width, height) > settings.OCR_UPLOAD_MAX_SIDE
+    ):
+        raise ValueError(
+            f"Page {page_number} is {width}x{height} pixels; at most "
+            f"{settings.OCR_UPLOAD_MAX_PIXELS:,} pixels and "
+            f"{settings.OCR_UPLOAD_MAX_SIDE} pixels a side are allowed"
+        )
+
+
+def check_page_count(pages):
+    if pages > settings.OCR_MAX_PAGES:
+        raise ValueError(
+            f"Document has {pages} pages; at most {settings.OCR_MAX_PAGES} are allowed"
+        )
+
+
+def _rendered_size(page, scale):
+    """Pixel size of a PDF page at the render scale, without rendering it"""
+    width, height = page.get_size()
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def iter_page_sizes(source):
+    """
+    Yield (page_number, (width, height)) as iter_pages would decode them
+
+    Reads PDF page boxes and image frame headers only; no pixels are
+    rendered or decoded.
+    """
+    if is_pdf(source):
+        _require_pdfium()
+        pdf = pdfium.PdfDocument(_open_source(source))
+        scale = settings.OCR_PDF_RENDER_DPI / 72
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                try:
+                    yield index + 1, _rendered_size(page, scale)
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+        return
+
+    from PIL import Image, ImageSequence
+    with Image.open(_open_source(source)) as img:
+        for index, frame in enumerate(ImageSequence.Iterator(img)):
+            yield index + 1, frame.size
+
+
+def count_pages(source):
+    """Number of pages or frames in a document, without decoding pixels"""
+    if is_pdf(source):
+        _require_pdfium()
+        pdf = pdfium.PdfDocument(_open_source(source))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    from PIL import Image
+    with Image.open(_open_source(source)) as img:
+        return getattr(img, 'n_frames', 1)
+
+
+def iter_pages(source):
+    """
+    Lazily yield (page_number, grayscale ndarray) for every page
+
+    Only the page being yielded is decoded, so arbitrarily long documents
+    never have more than one page in memory here. Page numbers start at 1.
+    Raises ValueError for documents over OCR_MAX_PAGES pages and, before
+    decoding it, for any page over the upload pixel bounds.
+    """
+    if is_pdf(source):
+        _require_pdfium()
+        pdf = pdfium.PdfDocument(_open_source(source))
+        scale = settings.OCR_PDF_RENDER_DPI / 72
+        try:
+            check_page_count(len(pdf))
+            for index in range(len(pdf)):
+                page = pdf[index]
+                try:
+                    check_page_bounds(index + 1, *_rendered_size(page, scale))
+                    bitmap = page.render(scale=scale, grayscale=True)
+                    yield index + 1, np.array(bitmap.to_pil().convert('L'))
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+        return
+
+    from PIL import Image, ImageSequence
+    with Image.open(_open_source(source)) as img:
+        for index, frame in enumerate(ImageSequence.Iterator(img)):
+            check_page_count(index + 1)
+            check_page_bounds(index + 1, *frame.size)
+            yield index + 1, _frame_to_gray(frame)
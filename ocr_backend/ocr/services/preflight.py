@@ -0,0 +1,176 @@
+# ocr/services/preflight.py
+
+import logging
+import numpy as np
+from django.conf import settings
+from PIL import Image
+from .pages import check_page_count, iter_page_sizes
+
+logger = logging.getLogger('ocr')
+
+# Neighbouring pixels differing by more than this count as an edge
+EDGE_STEP = 48
+
+
+class PreflightError(ValueError):
+    """An upload that can be rejected before it is stored or queued"""
+
+
+def open_header(upload):
+    """
+    Pillow image for an upload, with only its header parsed
+
+    Django's ImageField has already opened and verified the file and
+    left the result on ``upload.image``; other files are opened here,
+    which reads the header but decodes no pixels.
+    """
+    image = getattr(upload, 'image', None)
+    if image is None:
+        try:
+            image = Image.open(upload)
+            image.verify()
+        except Exception:
+            raise PreflightError("Invalid image file")
+        finally:
+            upload.seek(0)
+    return image
+
+
+def check_dimensions(width, height, label='Image'):
+    """Reject images too large to decode safely or too small to hold text"""
+    if width * height > settings.OCR_UPLOAD_MAX_PIXELS:
+        raise PreflightError(
+            f"{label} is {width}x{height} pixels; at most "
+            f"{settings.OCR_UPLOAD_MAX_PIXELS:,} pixels are allowed"
+        )
+    if max(width, height) > settings.OCR_UPLOAD_MAX_SIDE:
+        raise PreflightError(
+            f"{label} is {width}x{height} pixels; neither side may exceed "
+            f"{settings.OCR_UPLOAD_MAX_SIDE} pixels"
+        )
+    if min(width, height) < settings.OCR_UPLOAD_MIN_SIDE:
+        raise PreflightError(
+            f"{label} is {width}x{height} pixels; both sides must be at least "
+            f"{settings.OCR_UPLOAD_MIN_SIDE} pixels"
+        )
+
+
+def check_pages(source):
+    """
+    Apply the page-count cap and the dimension bounds to every page of a
+    document, as rendered at OCR_PDF_RENDER_DPI, without rendering any
+    """
+    pages = 0
+    for page_number, (width, height) in iter_page_sizes(source):
+        pages = page_number
+        try:
+            check_page_count(pages)
+        except ValueError as e:
+            raise PreflightError(str(e))
+        check_dimensions(width, height, label=f'Page {page_number}')
+    return pages
+
+
+def check_pdf(upload):
+    """
+    Reject files that are not PDFs pdfium can open
+
+    Opening parses the cross-reference table and page tree only; no
+    page is rendered. Each page's size at OCR_PDF_RENDER_DPI must be
+    within the image bounds and there may be at most OCR_MAX_PAGES.
+    """
+    signature = upload.read(5)
+    upload.seek(0)
+    if signature != b'%PDF-':
+        raise PreflightError("File is not a PDF document")
+    try:
+        pages = check_pages(upload)
+    except PreflightError:
+        raise
+    except ValueError as e:
+        # pypdfium2 is not installed; no worker could read it either
+        raise PreflightError(str(e))
+    except Exception:
+        raise PreflightError("PDF document is corrupt or encrypted")
+    finally:
+        upload.seek(0)
+    if not pages:
+        raise PreflightError("PDF document has no pages")
+
+
+def load_sample(upload):
+    """
+    Grayscale copy of an upload at most OCR_UPLOAD_TEXT_CHECK_SIDE pixels
+    on its longest side
+
+    JPEGs are decoded at reduced scale by libjpeg itself (Pillow's draft
+    mode), so only the sample is ever decoded; other formats are decoded
+    once and reduced.
+    """
+    side = settings.OCR_UPLOAD_TEXT_CHECK_SIDE
+    try:
+        with Image.open(upload) as image:
+            image.draft('L', (side, side))
+            image.thumbnail((side, side), reducing_gap=2.0)
+            return np.asarray(image.convert('L'))
+    finally:
+        upload.seek(0)
+
+
+def looks_textless(sample):
+    """
+    Whether a downscaled page plainly holds no text
+
+    Text leaves both contrast and many sharp intensity steps; a blank,
+    uniform or smoothly shaded page has neither. Thresholds are kept
+    low so only clearly empty pages are caught.
+    """
+    histogram = np.bincount(sample.ravel(), minlength=256)
+    cumulative = np.cumsum(histogram) / sample.size
+    # Same measure as ImageStats.contrast, without the noise estimate
+    contrast = int(np.searchsorted(cumulative, 0.99)) - int(np.searchsorted(cumulative, 0.01))
+    if contrast < settings.OCR_UPLOAD_MIN_CONTRAST:
+        return True
+    x = sample.astype(np.int16)
+    edges = (
+        np.count_nonzero(np.abs(x[:, 1:] - x[:, :-1]) > EDGE_STEP)
+        + np.count_nonzero(np.abs(x[1:, :] - x[:-1, :]) > EDGE_STEP)
+    )
+    return edges / sample.size < settings.OCR_UPLOAD_MIN_EDGE_DENSITY
+
+
+def preflight(upload):
+    """
+    Cheap checks on an upload before any job is created
+
+    Reads headers only: the format must be valid and the pixel
+    dimensions of every page within the configured bounds (a
+    decompression-bomb guard). With OCR_UPLOAD_TEXT_CHECK on, a small grayscale sample is
+    also checked for any sign of text. PDFs are checked by check_pdf.
+    Raises PreflightError.
+    """
+    name = getattr(upload, 'name', '') or ''
+    if name.lower().endswith('.pdf'):
+        check_pdf(upload)
+        return
+
+    image = open_header(upload)
+    check_dimensions(*image.size)
+    # Multi-page TIFF/GIF frames can each differ in size
+    try:
+        check_pages(upload)
+    except PreflightError:
+        raise
+    except Exception:
+        raise PreflightError("Invalid image file")
+    finally:
+        upload.seek(0)
+
+    if settings.OCR_UPLOAD_TEXT_CHECK:
+        try:
+            sample = load_sample(upload)
+        except Exception as e:
+            logger.info(f"Upload {name} failed to decode: {str(e)}")
+            raise PreflightError("Image data is corrupt or truncated")
+        if looks_textless(sample):
+            raise PreflightError("Image appears to contain no text")
@@ -0,0 +1,192 @@
+# ocr/services/preprocessing.py
+
+import logging
+import time
+import cv2
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger('ocr')
+
+# Longest side used for the statistics; larger pages are subsampled
+STATS_MAX_SIDE = 1024
+
+
+class ImageStats:
+    """
+    Cheap statistics of a grayscale page, computed once with NumPy
+
+    - contrast: spread between the 1st and 99th intensity percentiles
+    - noise: Gaussian noise sigma, from Immerkaer's noise kernel
+    - bilevel: share of pixels that are already near black or white
+    """
+
+    def __init__(self, img):
+        step = max(1, -(-max(img.shape) // STATS_MAX_SIDE))
+        sample = img[::step, ::step]
+
+        histogram = np.bincount(sample.ravel(), minlength=256)
+        cumulative = np.cumsum(histogram) / sample.size
+        low = int(np.searchsorted(cumulative, 0.01))
+        high = int(np.searchsorted(cumulative, 0.99))
+        self.contrast = high - low
+        self.bilevel = float(histogram[:32].sum() + histogram[224:].sum()) / sample.size
+        self.noise = self._estimate_noise(sample)
+
+    @staticmethod
+    def _estimate_noise(img):
+        height, width = img.shape
+        if height < 3 or width < 3:
+            return 0.0
+        # Response to the kernel [[1,-2,1],[-2,4,-2],[1,-2,1]], which
+        # cancels smooth image content and leaves the noise
+        x = img.astype(np.int32)
+        response = (
+            x[:-2, :-2] + x[:-2, 2:] + x[2:, :-2] + x[2:, 2:]
+            - 2 * (x[:-2, 1:-1] + x[2:, 1:-1] + x[1:-1, :-2] + x[1:-1, 2:])
+            + 4 * x[1:-1, 1:-1]
+        )
+        # Median absolute response so text edges do not count as noise;
+        # the kernel scales Gaussian noise by 6
+        return float(np.median(np.abs(response))) / (0.6745 * 6)
+
+    def as_dict(self):
+        return {
+            'contrast': self.contrast,
+            'noise': round(self.noise, 3),
+            'bilevel': round(self.bilevel, 3),
+        }
+
+
+class Stage:
+    """
+    One preprocessing step
+
+    ``apply`` reads ``src`` and writes into ``dst``, a preallocated buffer
+    of the same shape that may be ``src`` itself. ``skip`` decides from
+    the page's ImageStats whether the step is worth running.
+    """
+
+    name = None
+
+    def skip(self, stats):
+        return False
+
+    def apply(self, src, dst):
+        raise NotImplementedError
+
+
+class EqualizeStage(Stage):
+    """Histogram equalization, skipped when contrast is already good"""
+
+    name = 'equalize'
+
+    def skip(self, stats):
+        return stats.contrast >= settings.OCR_PREPROCESS_MIN_CONTRAST
+
+    def apply(self, src, dst):
+        cv2.equalizeHist(src, dst)
+
+
+class DenoiseStage(Stage):
+    """3x3 Gaussian blur, skipped on clean (e.g. born-digital) pages"""
+
+    name = 'denoise'
+
+    def skip(self, stats):
+        return stats.noise < settings.OCR_PREPROCESS_NOISE_THRESHOLD
+
+    def apply(self, src, dst):
+        cv2.GaussianBlur(src, (3, 3), 0, dst=dst)
+
+
+class ThresholdStage(Stage):
+    """Otsu binarization, skipped when the page is already black and white"""
+
+    name = 'threshold'
+
+    def skip(self, stats):
+        return stats.bilevel >= settings.OCR_PREPROCESS_BILEVEL_FRACTION
+
+    def apply(self, src, dst):
+        cv2.threshold(src, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=dst)
+
+
+STAGES = {
+    stage.name: stage
+    for stage in (EqualizeStage(), DenoiseStage(), ThresholdStage())
+}
+
+
+def parse_stages(value):
+    """
+    Stage names from a list or comma-separated string
+
+    Raises ValueError for unknown names; 'none' means no stages.
+    """
+    if isinstance(value, str):
+        value = [name.strip() for name in value.split(',') if name.strip()]
+    names = list(value or [])
+    if names == ['none']:
+        return []
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise ValueError(
+            f"Unknown preprocessing stage(s): {', '.join(unknown)}. "
+            f"Choose from: {', '.join(STAGES)}"
+        )
+    return names
+
+
+class PreprocessPipeline:
+    """
+    Ordered preprocessing stages with statistics-based skipping
+
+    Statistics are computed once on the grayscale input. Stages run into
+    a single buffer allocated by the first stage that runs (it writes
+    from the input, the rest work in place), so the input is never
+    modified and no array is allocated per step. ``run`` reports each stage's seconds
+    and whether it was skipped to the optional ``stats`` (EngineStats).
+    """
+
+    def __init__(self, stages=None, auto_skip=None):
+        self.stages = [
+            STAGES[name]
+            for name in parse_stages(
+                settings.OCR_PREPROCESS_STAGES if stages is None else stages
+            )
+        ]
+        self.auto_skip = (
+            settings.OCR_PREPROCESS_AUTO_SKIP if auto_skip is None else auto_skip
+        )
+
+    def run(self, img, stats=None):
+        """Preprocess a grayscale or BGR page"""
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        if not self.stages:
+            return img
+
+        start_time = time.perf_counter()
+        image_stats = ImageStats(img) if self.auto_skip else None
+        if stats is not None:
+            stats.add_stage('analyze', time.perf_counter() - start_time)
+
+        src = img
+        for stage in self.stages:
+            if image_stats is not None and stage.skip(image_stats):
+                logger.debug(f"Skipping preprocessing stage '{stage.name}': {image_stats.as_dict()}")
+                if stats is not None:
+                    stats.add_stage(stage.name, 0.0, skipped=True)
+                continue
+
+            if src is img:
+                out = np.empty_like(img)
+            start_time = time.perf_counter()
+            stage.apply(src, out)
+            if stats is not None:
+                stats.add_stage(stage.name, time.perf_counter() - start_time)
+            src = out
+
+        return src
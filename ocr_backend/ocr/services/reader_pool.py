@@ -0,0 +1,144 @@
+# ocr/services/reader_pool.py
+
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+
+logger = logging.getLogger('ocr')
+
+
+def get_resident_memory():
+    """Return resident set size of the current process in bytes (or None)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+        import sys
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+        return usage if sys.platform == 'darwin' else usage * 1024
+    except (ImportError, ValueError):
+        return None
+
+
+def get_peak_resident_memory():
+    """Return the peak resident set size of this process in bytes (or None)"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+        import sys
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+    except (ImportError, ValueError):
+        return None
+
+
+class ReaderPool:
+    """
+    Per-process registry of EasyOCR readers.
+
+    Readers are created lazily on first use and cached by language set, so
+    processes that never run OCR (web workers, management commands) never
+    import easyocr or load model weights.
+    """
+
+    def __init__(self):
+        self._readers = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(languages):
+        """Normalize a language list into a hashable cache key"""
+        if not languages:
+            languages = settings.OCR_LANGUAGES
+        if isinstance(languages, str):
+            languages = [languages]
+        return tuple(sorted(set(languages)))
+
+    def get(self, languages=None):
+        """Return a reader for the given languages, loading it if needed"""
+        key = self._key(languages)
+        reader = self._readers.get(key)
+        if reader is not None:
+            return reader
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            reader = self._readers.get(key)
+            if reader is None:
+                reader = self._load(key)
+                self._readers[key] = reader
+        return reader
+
+    def _load(self, key):
+        """Import easyocr and build a reader for the given key"""
+        import easyocr
+
+        logger.info(f"Loading EasyOCR reader for languages: {', '.join(key)}")
+        rss_before = get_resident_memory()
+        start_time = time.time()
+
+        reader = easyocr.Reader(list(key), gpu=settings.OCR_USE_GPU)
+
+        load_time = time.time() - start_time
+        rss_after = get_resident_memory()
+        self._stats[key] = {
+            'languages': list(key),
+            'load_time': load_time,
+            'rss_delta': (
+                rss_after - rss_before
+                if rss_before is not None and rss_after is not None
+                else None
+            ),
+        }
+        logger.info(f"EasyOCR reader loaded in {load_time:.2f}s")
+        return reader
+
+    def is_loaded(self, languages=None):
+        """Check whether a reader is already resident in this process"""
+        return self._key(languages) in self._readers
+
+    def warm_up(self, language_sets=None):
+        """Preload readers, e.g. from a worker process init hook"""
+        for languages in language_sets or [settings.OCR_LANGUAGES]:
+            try:
+                self.get(languages)
+            except Exception as e:
+                logger.error(f"Reader warm-up failed for {languages}: {str(e)}")
+
+    def clear(self):
+        """Drop all cached readers"""
+        with self._lock:
+            self._readers.clear()
+            self._stats.clear()
+
+    def stats(self):
+        """Load time and memory statistics for sizing worker pools"""
+        return {
+            'readers': list(self._stats.values()),
+            'resident_memory': get_resident_memory(),
+        }
+
+
+# Process-wide reader registry
+reader_pool = ReaderPool()
+
+
+def get_reader(languages=None):
+    """Shortcut for reader_pool.get()"""
+    return reader_pool.get(languages)
@@ -0,0 +1,181 @@
+# ocr/services/recovery.py
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger('ocr')
+
+
+def stale_jobs(now=None, orphaned_before=None):
+    """
+    (pending, processing) querysets of jobs whose worker was lost
+
+    Pending jobs were dispatched more than OCR_RECOVERY_PENDING_AFTER
+    seconds ago and never started, as happens when the web process
+    holding a thread/process pool restarts or a worker dies. Duplicates
+    follow their source and are left out.
+
+    Only Celery enforces a time limit, so only in celery mode is a job
+    processing for more than OCR_RECOVERY_PROCESSING_AFTER seconds known
+    to be lost. The local pools may run a job for as long as it takes;
+    there a processing job is only stale when it started before
+    ``orphaned_before``, the start of the one web process whose pools
+    ran it.
+    """
+    from ..models import OCRJob
+
+    now = now or timezone.now()
+    jobs = OCRJob.objects.filter(duplicate_of__isnull=True)
+    pending = jobs.filter(
+        status='pending',
+        dispatched_at__lt=now - timedelta(seconds=settings.OCR_RECOVERY_PENDING_AFTER)
+    )
+    if settings.OCR_EXECUTION_MODE == 'celery':
+        processing_cutoff = now - timedelta(seconds=settings.OCR_RECOVERY_PROCESSING_AFTER)
+    else:
+        processing_cutoff = orphaned_before
+    processing = jobs.filter(status='processing')
+    if processing_cutoff is None:
+        processing = processing.none()
+    else:
+        processing = processing.filter(started_at__lt=processing_cutoff)
+    return pending, processing
+
+
+def reject(job, reason):
+    """Reject a lost job, settle its duplicates and free its fair share"""
+    from ..scheduler import scheduler
+    from .dedup import propagate_to_duplicates
+    from .metrics import metrics
+
+    if not job.mark_as_rejected(reason):
+        # It finished after all
+        return False
+    metrics.observe_job('rejected')
+    propagate_to_duplicates(job)
+    scheduler.release(job.id)
+    return True
+
+
+def recover_stale_jobs(now=None, orphaned_before=None):
+    """
+    Re-dispatch or reject jobs lost by a restarted process
+
+    Stale pending jobs whose upload is stored are dispatched again,
+    unless they are older than OCR_RECOVERY_MAX_AGE; the others, and
+    every stale processing job (see stale_jobs for ``orphaned_before``),
+    are rejected. Every step is a conditional update, and a re-dispatched
+    job that was only slow is claimed by one worker alone, so several
+    processes may run this at once. Held jobs of clients with a free
+    share are released afterwards.
+    """
+    from ..dispatch import dispatch_batch
+    from ..models import OCRJob
+    from ..scheduler import scheduler
+
+    now = now or timezone.now()
+    too_old = now - timedelta(seconds=settings.OCR_RECOVERY_MAX_AGE)
+    pending, processing = stale_jobs(now, orphaned_before=orphaned_before)
+    report = {'redispatched': 0, 'rejected': 0}
+
+    for job in processing.only(*OCRJob.STATUS_FIELDS, 'started_at', 'client_id', 'priority'):
+        claimed = OCRJob.objects.filter(
+            id=job.id, status='processing', started_at=job.started_at
+        ).update(started_at=now)
+        if claimed and reject(job, "The OCR worker stopped before finishing the job"):
+            report['rejected'] += 1
+
+    batches = set()
+    for job in pending.only('id', 'image', 'batch', 'priority', 'client_id',
+                            'created_at', 'dispatched_at', 'status'):
+        # Take it back from whoever dispatched it
+        claimed = OCRJob.objects.filter(
+            id=job.id, status='pending', dispatched_at=job.dispatched_at
+        ).update(dispatched_at=None if job.batch_id is None else now)
+        if not claimed:
+            continue
+
+        if job.created_at < too_old:
+            if reject(job, "The OCR job timed out before it could run"):
+                report['rejected'] += 1
+        elif not job.image:
+            # Upload bytes handed over in memory died with the process
+            if reject(job, "The uploaded image was lost before OCR ran; please upload it again"):
+                report['rejected'] += 1
+        elif job.batch_id is not None:
+            batches.add((job.batch_id, job.priority))
+            report['redispatched'] += 1
+        else:
+            scheduler.redispatch(job)
+            report['redispatched'] += 1
+
+    for batch_id, priority in batches:
+        try:
+            dispatch_batch(batch_id, priority=priority)
+        except Exception:
+            logger.exception(f"Could not re-dispatch batch {batch_id}")
+
+    if scheduler.enabled:
+        scheduler.release_held()
+
+    if report['redispatched'] or report['rejected']:
+        logger.warning(
+            f"Recovered stale OCR jobs: {report['redispatched']} re-dispatched, "
+            f"{report['rejected']} rejected"
+        )
+    return report
+
+
+class RecoveryLoop:
+    """
+    Runs recover_stale_jobs every OCR_RECOVERY_INTERVAL seconds in a
+    daemon thread, first right after the process starts serving, so
+    recovery does not depend on Celery beat
+
+    With the local pools and a single web process, this process owns
+    every pool, so jobs left processing from before it started are
+    orphaned.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self.started_at = None
+
+    def orphaned_before(self):
+        if (
+            settings.OCR_EXECUTION_MODE in ('thread', 'process')
+            and settings.OCR_WEB_PROCESSES == 1
+        ):
+            return self.started_at
+        return None
+
+    def start(self):
+        if not settings.OCR_RECOVERY_INTERVAL:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started_at = timezone.now()
+            self._thread = threading.Thread(
+                target=self._run, name='ocr-recovery', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                recover_stale_jobs(orphaned_before=self.orphaned_before())
+            except Exception:
+                logger.exception("Stale job recovery failed")
+            finally:
+                connection.close()
+            time.sleep(settings.OCR_RECOVERY_INTERVAL)
+
+
+recovery_loop = RecoveryLoop()
@@ -0,0 +1,208 @@
+# ocr/services/scaling.py
+
+import cv2
+import numpy as np
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+logger = logging.getLogger('ocr')
+
+
+def estimate_text_height(img):
+    """
+    Estimate the typical glyph height of a grayscale page in pixels
+
+    Uses connected components of an Otsu-binarized copy; returns None when
+    there are too few glyph-like components to trust the estimate.
+    """
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    # Text should be the foreground (non-zero) class
+    if np.count_nonzero(binary) > binary.size // 2:
+        binary = cv2.bitwise_not(binary)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+
+    # Drop specks and page-sized blobs (borders, pictures)
+    glyphs = heights[
+        (heights >= 4) & (heights <= img.shape[0] // 4) & (areas >= 8)
+    ]
+    if len(glyphs) < settings.OCR_TEXT_HEIGHT_MIN_COMPONENTS:
+        return None
+
+    return float(np.median(glyphs))
+
+
+def compute_scale(img):
+    """Scale factor that brings text to OCR_TARGET_TEXT_HEIGHT (never upscales)"""
+    scale = 1.0
+
+    if settings.OCR_TARGET_TEXT_HEIGHT:
+        text_height = estimate_text_height(img)
+        if text_height:
+            scale = settings.OCR_TARGET_TEXT_HEIGHT / text_height
+
+    # Without tiling, the pixel budget is enforced by downscaling instead
+    if not settings.OCR_TILING_ENABLED and settings.OCR_MAX_PIXELS:
+        pixels = img.shape[0] * img.shape[1]
+        scale = min(scale, (settings.OCR_MAX_PIXELS / pixels) ** 0.5)
+
+    return min(1.0, max(scale, settings.OCR_MIN_SCALE))
+
+
+def rescale_for_ocr(img):
+    """Downscale an image for recognition; returns (image, scale)"""
+    scale = compute_scale(img)
+    if scale >= 0.99:
+        return img, 1.0
+
+    height, width = img.shape[:2]
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    logger.info(
+        f"Downscaling image from {width}x{height} to {size[0]}x{size[1]}"
+    )
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA), scale
+
+
+def unscale_box(box, scale):
+    """Map a box detected on a rescaled image back to source pixels"""
+    return [[float(x) / scale, float(y) / scale] for x, y in box]
+
+
+def needs_tiling(img):
+    """Check whether a page is large enough to be split into tiles"""
+    return (
+        settings.OCR_TILING_ENABLED
+        and img.shape[0] * img.shape[1] > settings.OCR_TILING_MIN_PIXELS
+    )
+
+
+def _tile_starts(length, tile, step):
+    """Start offsets covering [0, length) with tiles of the given size"""
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, step))
+    starts.append(length - tile)
+    return starts
+
+
+def iter_tiles(shape, tile_size, overlap):
+    """
+    Yield (x0, y0, x1, y1, core) for overlapping tiles over an image
+
+    ``core`` is the (x0, y0, x1, y1) region the tile owns: tiles overlap,
+    but every pixel belongs to exactly one core, which is how boundary
+    boxes detected twice are attributed to a single tile.
+    """
+    height, width = shape[:2]
+    step = max(1, tile_size - overlap)
+    xs = _tile_starts(width, tile_size, step)
+    ys = _tile_starts(height, tile_size, step)
+
+    def core_bounds(starts, index, length):
+        start = starts[index]
+        end = min(start + tile_size, length)
+        lo = 0 if index == 0 else (start + min(starts[index - 1] + tile_size, length)) // 2
+        hi = length if index == len(starts) - 1 else (end + starts[index + 1]) // 2
+        return lo, hi
+
+    for yi, y0 in enumerate(ys):
+        cy0, cy1 = core_bounds(ys, yi, height)
+        for xi, x0 in enumerate(xs):
+            cx0, cx1 = core_bounds(xs, xi, width)
+            yield (
+                x0, y0,
+                min(x0 + tile_size, width), min(y0 + tile_size, height),
+                (cx0, cy0, cx1, cy1)
+            )
+
+
+def box_bounds(box):
+    """(left, top, right, bottom) of a detection's corner points"""
+    points = np.asarray(box, dtype=np.float32)
+    return (
+        float(points[:, 0].min()), float(points[:, 1].min()),
+        float(points[:, 0].max()), float(points[:, 1].max())
+    )
+
+
+def _overlap_ratio(a, b):
+    """Intersection over the smaller box area"""
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return (ix * iy) / smaller if smaller > 0 else 0.0
+
+
+def merge_detections(detections, threshold=0.7):
+    """
+    Drop duplicate boxes from overlapping tiles and sort in reading order
+
+    ``detections`` are EasyOCR (box, text, confidence) tuples in page
+    coordinates. When two boxes overlap by more than ``threshold`` of the
+    smaller one, the more confident box wins.
+    """
+    kept = []
+    for det in sorted(detections, key=lambda d: d[2], reverse=True):
+        bounds = box_bounds(det[0])
+        if all(_overlap_ratio(bounds, k[1]) < threshold for k in kept):
+            kept.append((det, bounds))
+
+    if not kept:
+        return []
+
+    # Group boxes into lines by vertical centre, then order left to right
+    line_height = float(np.median([b[3] - b[1] for _, b in kept])) or 1.0
+    kept.sort(key=lambda k: ((k[1][1] + k[1][3]) / 2, k[1][0]))
+    lines, current, current_y = [], [], None
+    for det, bounds in kept:
+        centre = (bounds[1] + bounds[3]) / 2
+        if current and abs(centre - current_y) > line_height / 2:
+            lines.append(current)
+            current = []
+        if not current:
+            current_y = centre
+        current.append((det, bounds))
+    lines.append(current)
+
+    return [
+        det
+        for line in lines
+        for det, _ in sorted(line, key=lambda k: k[1][0])
+    ]
+
+
+def readtext_tiled(reader, img, **kwargs):
+    """
+    Run reader.readtext over overlapping tiles in parallel
+
+    Returns merged (box, text, confidence) detections in page coordinates.
+    """
+    tiles = list(iter_tiles(
+        img.shape, settings.OCR_TILE_SIZE, settings.OCR_TILE_OVERLAP
+    ))
+    logger.info(f"Recognizing {img.shape[1]}x{img.shape[0]} page in {len(tiles)} tiles")
+
+    def recognize(tile):
+        x0, y0, x1, y1, core = tile
+        detections = []
+        for box, text, confidence in reader.readtext(img[y0:y1, x0:x1], detail=1, **kwargs):
+            box = [[float(x) + x0, float(y) + y0] for x, y in box]
+            left, top, right, bottom = box_bounds(box)
+            cx, cy = (left + right) / 2, (top + bottom) / 2
+            # Keep only boxes centred in this tile's own region
+            if core[0] <= cx < core[2] and core[1] <= cy < core[3]:
+                detections.append((box, text, confidence))
+        return detections
+
+    workers = min(settings.OCR_TILE_WORKERS, len(tiles)) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        per_tile = list(pool.map(recognize, tiles))
+
+    return merge_detections([det for dets in per_tile for det in dets])
@@ -0,0 +1,282 @@
+# ocr/services/search.py
+
+import codecs
+import logging
+import re
+import threading
+import uuid
+from collections import Counter
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+
+logger = logging.getLogger('ocr')
+
+# FTS5 virtual table over ocr_search_documents (see migration 0011)
+FTS_TABLE = 'ocr_search_fts'
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+_TOKEN_RE = re.compile(r'\w+')
+
+# Bytes decompressed at a time while looking for a snippet
+SNIPPET_CHUNK_SIZE = 16 * 1024
+
+
+def tokenize(text):
+    """Lowercased word tokens, as indexed and searched by every backend"""
+    return [
+        token for token in _TOKEN_RE.findall((text or '').lower())
+        if MIN_TERM_LENGTH <= len(token) <= MAX_TERM_LENGTH
+    ]
+
+
+def _job_id(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+class SearchBackend:
+    """
+    Full-text index over extracted text
+
+    ``search`` matches any of the query's terms and returns
+    (total_matches, [(job_id, score), ...]) best first; scores are only
+    comparable within one backend.
+    """
+
+    name = None
+
+    def index(self, job, text):
+        raise NotImplementedError
+
+    def search(self, query, limit, offset=0):
+        raise NotImplementedError
+
+    def store_document(self, job, text):
+        """
+        Keep the text's tokens for the database's full-text index
+
+        Only the lowercased tokens that tokenize() keeps are stored, the
+        original text stays compressed in OCRResult alone.
+        """
+        from ..models import OCRSearchDocument
+        OCRSearchDocument.objects.update_or_create(
+            job=job, defaults={'content': ' '.join(tokenize(text))}
+        )
+
+
+class FullTextBackend(SearchBackend):
+    """MySQL FULLTEXT index on ocr_search_documents.content"""
+
+    name = 'fulltext'
+
+    MATCH = 'MATCH(content) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+
+    def index(self, job, text):
+        self.store_document(job, text)
+
+    def search(self, query, limit, offset=0):
+        terms = ' '.join(tokenize(query))
+        if not terms:
+            return 0, []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM ocr_search_documents WHERE {self.MATCH}',
+                [terms]
+            )
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f'SELECT job_id, {self.MATCH} AS score FROM ocr_search_documents '
+                f'WHERE {self.MATCH} ORDER BY score DESC LIMIT %s OFFSET %s',
+                [terms, terms, limit, offset]
+            )
+            rows = cursor.fetchall()
+        return total, [(_job_id(job_id), float(score)) for job_id, score in rows]
+
+
+class FTS5Backend(SearchBackend):
+    """
+    SQLite FTS5 table indexing ocr_search_documents
+
+    The FTS table uses the documents as external content and triggers
+    keep it in sync, so writes and deletes only touch the documents.
+    Ranked by BM25.
+    """
+
+    name = 'fts5'
+
+    def index(self, job, text):
+        self.store_document(job, text)
+
+    def search(self, query, limit, offset=0):
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        # Tokens are word characters only, so quoting cannot be escaped
+        match = ' OR '.join(f'"{term}"' for term in dict.fromkeys(terms))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [match]
+            )
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f'SELECT d.job_id, -bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} '
+                f'JOIN ocr_search_documents d ON d.id = {FTS_TABLE}.rowid '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY score DESC LIMIT %s OFFSET %s',
+                [match, limit, offset]
+            )
+            rows = cursor.fetchall()
+        return total, [(_job_id(job_id), float(score)) for job_id, score in rows]
+
+
+class TermsBackend(SearchBackend):
+    """
+    Portable inverted index in ocr_search_terms
+
+    Jobs rank by how many distinct query terms they contain, then by
+    how often those occur; the score is the number of matched terms plus
+    a fraction that grows with the occurrences.
+    """
+
+    name = 'terms'
+
+    def index(self, job, text):
+        from ..models import OCRSearchDocument, OCRSearchTerm
+        # Documents are only for the full-text backends
+        OCRSearchDocument.objects.filter(job=job).delete()
+        OCRSearchTerm.objects.filter(job=job).delete()
+        OCRSearchTerm.objects.bulk_create(
+            [
+                OCRSearchTerm(job=job, term=term, count=count)
+                for term, count in Counter(tokenize(text)).items()
+            ],
+            batch_size=1000
+        )
+
+    def search(self, query, limit, offset=0):
+        from ..models import OCRSearchTerm
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return 0, []
+        matches = (
+            OCRSearchTerm.objects.filter(term__in=terms)
+            .values('job_id')
+            .annotate(matched=Count('id'), hits=Sum('count'))
+        )
+        total = matches.count()
+        rows = matches.order_by('-matched', '-hits', 'job_id')[offset:offset + limit]
+        return total, [
+            (row['job_id'], row['matched'] + row['hits'] / (row['hits'] + 1.0))
+            for row in rows
+        ]
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (FullTextBackend, FTS5Backend, TermsBackend)
+}
+
+_backends = {}
+_lock = threading.Lock()
+
+
+def _has_fts_table():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def _detect_backend():
+    if connection.vendor == 'mysql':
+        return FullTextBackend.name
+    # Migration 0011 only creates the FTS table when SQLite has FTS5
+    if connection.vendor == 'sqlite' and _has_fts_table():
+        return FTS5Backend.name
+    return TermsBackend.name
+
+
+def get_search_backend():
+    """The backend for OCR_SEARCH_BACKEND; 'auto' picks the best available"""
+    name = settings.OCR_SEARCH_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        with _lock:
+            backend = _backends.get(name)
+            if backend is None:
+                resolved = _detect_backend() if name == 'auto' else name
+                try:
+                    backend = BACKENDS[resolved]()
+                except KeyError:
+                    raise ValueError(
+                        f"Unknown OCR_SEARCH_BACKEND '{name}'. "
+                        f"Choose one of: auto, {', '.join(BACKENDS)}"
+                    )
+                logger.info(f"Using '{backend.name}' OCR search backend")
+                _backends[name] = backend
+    return backend
+
+
+def index_text(job, text):
+    """Add or replace a job's text in the search index"""
+    if settings.OCR_SEARCH_ENABLED:
+        get_search_backend().index(job, text or '')
+
+
+def search_jobs(query, limit=20, offset=0):
+    """(total_matches, [(job_id, score), ...]) for a text query"""
+    return get_search_backend().search(query, limit, offset)
+
+
+def search_snippets(job_ids, query):
+    """
+    {job_id: snippet} for one page of search hits
+
+    Search documents hold normalized tokens only, so snippets are cut
+    from the compressed results, each decompressed only as far as the
+    snippet reaches.
+    """
+    from ..models import OCRResult
+    results = OCRResult.objects.filter(job_id__in=job_ids).only('job_id', 'codec', 'text_data')
+    return {
+        result.job_id: make_snippet(leading_text(result, query), query)
+        for result in results
+    }
+
+
+def leading_text(result, query, width=None):
+    """
+    Text of an OCRResult from the start to well past the first query
+    term, or all of it when no term occurs
+    """
+    width = width or settings.OCR_SEARCH_SNIPPET_LENGTH
+    terms = tokenize(query)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    text = ''
+    for chunk in result.iter_text_bytes(SNIPPET_CHUNK_SIZE):
+        text += decoder.decode(chunk)
+        lowered = text.lower()
+        positions = [position for position in map(lowered.find, terms) if position >= 0]
+        # Twice the width, as make_snippet collapses whitespace first
+        if positions and len(text) - min(positions) > 2 * width:
+            return text
+    return text + decoder.decode(b'', final=True)
+
+
+def make_snippet(text, query, width=None):
+    """Up to ``width`` characters of text around the first query term"""
+    width = width or settings.OCR_SEARCH_SNIPPET_LENGTH
+    text = ' '.join((text or '').split())
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in tokenize(query)]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    snippet = text[start:start + width]
+    if start > 0:
+        snippet = '…' + snippet
+    if start + width < len(text):
+        snippet += '…'
+    return snippet
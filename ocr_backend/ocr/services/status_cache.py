@@ -0,0 +1,90 @@
+# ocr/services/status_cache.py
+
+import logging
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger('ocr')
+
+TERMINAL_STATUSES = ('done', 'rejected')
+
+
+class StatusCache:
+    """
+    Read-through cache of job status payloads keyed by job ID
+
+    Jobs write their status through on every transition (see the
+    OCRJob.mark_as_* methods), so status polls are answered from Django's
+    cache. Terminal statuses never change again and are kept for
+    OCR_STATUS_CACHE_TTL_TERMINAL seconds; pending and processing entries
+    expire after OCR_STATUS_CACHE_TTL_ACTIVE seconds, which bounds how
+    stale they can get when workers write to a different cache.
+    """
+
+    KEY_PREFIX = 'ocr:status:'
+
+    @property
+    def cache(self):
+        return caches[settings.OCR_STATUS_CACHE]
+
+    def _key(self, job_id):
+        return f'{self.KEY_PREFIX}{job_id}'
+
+    def ttl(self, payload):
+        if payload.get('status') in TERMINAL_STATUSES:
+            return settings.OCR_STATUS_CACHE_TTL_TERMINAL
+        return settings.OCR_STATUS_CACHE_TTL_ACTIVE
+
+    def get(self, job_id):
+        """Cached status payload, or None on a miss"""
+        try:
+            return self.cache.get(self._key(job_id))
+        except Exception as e:
+            logger.error(f"Status cache read failed for job {job_id}: {str(e)}")
+            return None
+
+    def get_many(self, job_ids):
+        """{job_id: payload} of the cached jobs among job_ids"""
+        keys = {self._key(job_id): job_id for job_id in job_ids}
+        try:
+            cached = self.cache.get_many(list(keys))
+        except Exception as e:
+            logger.error(f"Status cache read failed for {len(keys)} jobs: {str(e)}")
+            return {}
+        return {keys[key]: payload for key, payload in cached.items()}
+
+    def set(self, job_id, payload):
+        try:
+            self.cache.set(self._key(job_id), payload, self.ttl(payload))
+        except Exception as e:
+            logger.error(f"Status cache write failed for job {job_id}: {str(e)}")
+
+    def set_many(self, job_ids, payload):
+        """Cache one payload for several jobs, e.g. after a bulk update"""
+        try:
+            self.cache.set_many(
+                {self._key(job_id): payload for job_id in job_ids},
+                self.ttl(payload)
+            )
+        except Exception as e:
+            logger.error(f"Status cache write failed for {len(job_ids)} jobs: {str(e)}")
+
+    def set_payloads(self, payloads):
+        """Cache several {job_id: payload} entries, one write per TTL"""
+        by_ttl = {}
+        for job_id, payload in payloads.items():
+            by_ttl.setdefault(self.ttl(payload), {})[self._key(job_id)] = payload
+        try:
+            for ttl, entries in by_ttl.items():
+                self.cache.set_many(entries, ttl)
+        except Exception as e:
+            logger.error(f"Status cache write failed for {len(payloads)} jobs: {str(e)}")
+
+    def delete(self, job_id):
+        try:
+            self.cache.delete(self._key(job_id))
+        except Exception as e:
+            logger.error(f"Status cache delete failed for job {job_id}: {str(e)}")
+
+
+status_cache = StatusCache()
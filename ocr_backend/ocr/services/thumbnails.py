@@ -0,0 +1,262 @@
+# ocr/services/thumbnails.py
+
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('ocr')
+
+CONTENT_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Hits refresh a file's mtime (its LRU position) at most this often
+TOUCH_INTERVAL = 3600
+
+
+class ThumbnailCache:
+    """
+    Content-addressed cache of downscaled upload previews
+
+    Files are keyed by the upload's content hash and a size name from
+    OCR_THUMBNAIL_SIZES, so duplicate uploads share them and a URL never
+    changes meaning. They are rendered from the image OCR already
+    decoded (grayscale, as read for recognition) and kept under
+    OCR_THUMBNAIL_MAX_BYTES: once the directory grows past that, the
+    least recently used files (by mtime, refreshed on hits) are evicted
+    down to OCR_THUMBNAIL_EVICT_TO of the budget.
+    """
+
+    def __init__(self):
+        self._bytes = None
+        self._lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._queued = set()
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return settings.OCR_THUMBNAILS_ENABLED
+
+    @property
+    def directory(self):
+        return str(settings.OCR_THUMBNAIL_DIR)
+
+    def path(self, content_hash, size):
+        """Where a thumbnail lives; sharded by the first two hash digits"""
+        return os.path.join(self.directory, content_hash[:2], f'{content_hash}-{size}.jpg')
+
+    def is_valid(self, content_hash, size):
+        return (
+            size in settings.OCR_THUMBNAIL_SIZES
+            and bool(CONTENT_HASH_RE.match(content_hash or ''))
+        )
+
+    def get(self, content_hash, size):
+        """Path of a cached thumbnail, or None on a miss"""
+        if not self.is_valid(content_hash, size):
+            return None
+        path = self.path(content_hash, size)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if now - mtime > TOUCH_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return path
+
+    def generate(self, content_hash, img):
+        """
+        Render every configured size of a decoded image
+
+        Sizes already cached are left alone. Failures are logged and never
+        raised: a missing preview must not fail the OCR job.
+        """
+        if not self.enabled or not CONTENT_HASH_RE.match(content_hash or ''):
+            return
+        try:
+            written = 0
+            for size, edge in settings.OCR_THUMBNAIL_SIZES.items():
+                path = self.path(content_hash, size)
+                if os.path.exists(path):
+                    continue
+                written += self._write(path, self.downscale(img, edge))
+            if written:
+                self._account(written)
+        except Exception as e:
+            logger.warning(f"Thumbnail generation failed for {content_hash}: {str(e)}")
+
+    def has_source(self, content_hash):
+        """Whether a stored upload with this hash is left to render from"""
+        from ..models import OCRJob
+        return OCRJob.objects.filter(content_hash=content_hash).exclude(image='').exists()
+
+    def render(self, content_hash):
+        """
+        Render every size of a thumbnail from a stored upload
+
+        Covers jobs processed before thumbnails were enabled and files
+        evicted since; returns False if no upload with that hash is left.
+        """
+        from ..models import OCRJob
+        from .pages import iter_pages
+        job = (
+            OCRJob.objects.filter(content_hash=content_hash)
+            .exclude(image='')
+            .only('id', 'image')
+            .first()
+        )
+        if job is None:
+            return False
+        pages = iter_pages(job.image.path)
+        try:
+            _, img = next(pages)
+        except (FileNotFoundError, StopIteration):
+            return False
+        finally:
+            pages.close()
+        self.generate(content_hash, img)
+        return True
+
+    def render_later(self, content_hash):
+        """
+        Queue render() off the request path after a miss
+
+        Decoding a full upload is far slower than serving a file, so it
+        runs in the ocr.render_thumbnails task in celery mode and in one
+        background thread per process otherwise. Hashes already queued
+        here are skipped. Returns False if there is nothing to render.
+        """
+        if not self.enabled or not CONTENT_HASH_RE.match(content_hash or ''):
+            return False
+        if not self.has_source(content_hash):
+            return False
+        with self._queue_lock:
+            if content_hash in self._queued:
+                return True
+            self._queued.add(content_hash)
+        try:
+            if settings.OCR_EXECUTION_MODE == 'celery':
+                from ..tasks import render_thumbnails_task
+                render_thumbnails_task.apply_async(
+                    args=[content_hash], queue=settings.OCR_CELERY_QUEUES['bulk']
+                )
+                self._done(content_hash)
+            else:
+                self._renderer().submit(self._render_queued, content_hash)
+        except Exception:
+            self._done(content_hash)
+            raise
+        return True
+
+    def _renderer(self):
+        with self._queue_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='ocr-thumbnails'
+                )
+            return self._executor
+
+    def _render_queued(self, content_hash):
+        try:
+            self.render(content_hash)
+        except Exception as e:
+            logger.warning(f"Thumbnail rendering failed for {content_hash}: {str(e)}")
+        finally:
+            self._done(content_hash)
+            connection.close()
+
+    def _done(self, content_hash):
+        with self._queue_lock:
+            self._queued.discard(content_hash)
+
+    @staticmethod
+    def downscale(img, edge):
+        """Fit the image within ``edge`` pixels, never enlarging it"""
+        height, width = img.shape[:2]
+        scale = edge / max(height, width)
+        if scale >= 1:
+            return img
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    def _write(self, path, img):
+        ok, encoded = cv2.imencode(
+            '.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, settings.OCR_THUMBNAIL_QUALITY]
+        )
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial file
+        temp = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(encoded.tobytes())
+        os.replace(temp, path)
+        return len(encoded)
+
+    def _iter_files(self):
+        """(path, size, mtime) of every cached thumbnail"""
+        try:
+            shards = os.scandir(self.directory)
+        except FileNotFoundError:
+            return
+        with shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as entries:
+                    for entry in entries:
+                        if entry.is_file() and entry.name.endswith('.jpg'):
+                            stat = entry.stat()
+                            yield entry.path, stat.st_size, stat.st_mtime
+
+    def _account(self, written):
+        """
+        Add newly written bytes and evict once over budget
+
+        The running total starts from a directory scan and is corrected
+        by every eviction pass, so other processes writing to the same
+        directory only delay eviction until the next pass.
+        """
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._iter_files())
+            else:
+                self._bytes += written
+            if self._bytes > settings.OCR_THUMBNAIL_MAX_BYTES:
+                self._bytes = self.evict()
+
+    def evict(self, target=None):
+        """Delete the least recently used thumbnails; returns the bytes left"""
+        if target is None:
+            target = settings.OCR_THUMBNAIL_MAX_BYTES * settings.OCR_THUMBNAIL_EVICT_TO
+        files = sorted(self._iter_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Could not evict thumbnail {path}: {str(e)}")
+                continue
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} thumbnails, {total} bytes cached")
+        return total
+
+
+thumbnail_cache = ThumbnailCache()
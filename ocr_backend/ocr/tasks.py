@@ -1,75 +1,350 @@
 # ocr/tasks.py
 
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
 import time
 import logging
-from .models import OCRJob
-from .services.ocr_service import extract_text
+from .models import OCRBatch, OCRJob
+from .services.ocr_service import OCRService, extract_text
+from .services.pages import count_pages, is_pdf
+from .services.dedup import propagate_to_duplicates
+from .services.engines import EngineStats
+from .services.ingest import upload_buffers
+from .services.metrics import metrics
+from .services.status_cache import status_cache
+from .services.thumbnails import thumbnail_cache
 
 logger = logging.getLogger('ocr')
 
 
-@shared_task(bind=True)
-def process_ocr(self, job_id):
+def render_thumbnails(job):
+    """on_decoded hook caching the job's previews, or None if not needed"""
+    if not thumbnail_cache.enabled or not job.content_hash:
+        return None
+    return lambda img: thumbnail_cache.generate(job.content_hash, img)
+
+
+def process_pages(job, source, pages_total, stats=None):
     """
-    Process OCR for the given job
+    OCR a multi-page document, storing each page as soon as it finishes
+    
+    Returns (text, detail_lines); detail_lines is None unless the job
+    asked for detail output.
+    """
+    logger.info(f"Job {job.id} has {pages_total} pages")
+    job.start_pages(pages_total)
+    
+    texts = {}
+    lines = {}
+    for page_number, result, seconds in OCRService.iter_document(
+        source, detail=job.detail, stats=stats, preprocess=job.preprocess or None,
+        on_decoded=render_thumbnails(job)
+    ):
+        if isinstance(result, Exception):
+            logger.error(f"Page {page_number} of job {job.id} failed: {result}")
+            job.record_page(
+                page_number,
+                error_message=str(result),
+                processing_time=seconds
+            )
+            continue
+        
+        if job.detail:
+            result, lines[page_number] = result
+        texts[page_number] = result
+        job.record_page(page_number, text=result, processing_time=seconds)
+    
+    if not texts:
+        raise ValueError("OCR failed on every page")
+    
+    text = "\n\n".join(texts[number] for number in sorted(texts))
+    if not job.detail:
+        return text, None
+    return text, [
+        (number, box, line_text, confidence)
+        for number in sorted(lines)
+        for box, line_text, confidence in lines[number]
+    ]
+
+
+def run_ocr_job(job_id, observe=None):
+    """
+    Run OCR for one job and record the outcome on the job
+    
+    Shared by the Celery task and the local executors in ocr.dispatch.
+    ``observe`` is called with the status and timings of the job if this
+    run finishes it; it defaults to metrics.observe_job (see
+    run_in_worker for worker processes).
     """
+    observe = observe or metrics.observe_job
     try:
         job = OCRJob.objects.get(id=job_id)
-        logger.info(f"Starting OCR processing for job: {job_id}")
         
-        # Mark as processing
-        job.status = "processing"
-        job.save(update_fields=['status', 'updated_at'])
+        # Claim it; a job re-dispatched after recovery may arrive twice
+        if not job.mark_as_processing():
+            job.refresh_from_db(fields=['status'])
+            logger.info(f"Skipping OCR job {job_id}, it is {job.status}")
+            return {'job_id': str(job_id), 'status': job.status}
+        logger.info(f"Starting OCR processing for job: {job_id}")
         
         # Track processing time
         start_time = time.time()
         
-        # Extract text using OCR
-        extracted_text = extract_text(job.image.path)
+        # Extract text using OCR; multi-page documents go page by page.
+        # Uploads handed over in memory never touch the disk here.
+        source = upload_buffers.pop(job_id)
+        if source is None:
+            if not job.image:
+                raise ValueError("The uploaded image is no longer available")
+            source = job.image.path
+        stats = EngineStats(settings.OCR_ENGINE, spans=settings.OCR_METRICS_ENABLED)
+        stats.add_span('queue_wait', job.queue_wait)
+        pages_total = count_pages(source)
+        # PDFs must be rendered page by page even when they have one page
+        if pages_total > 1 or is_pdf(source):
+            extracted_text, detail = process_pages(job, source, pages_total, stats=stats)
+        elif job.detail:
+            extracted_text, lines = extract_text(
+                source, detail=True, stats=stats, preprocess=job.preprocess or None,
+                on_decoded=render_thumbnails(job)
+            )
+            detail = [(1, box, text, confidence) for box, text, confidence in lines]
+        else:
+            extracted_text = extract_text(
+                source, stats=stats, preprocess=job.preprocess or None,
+                on_decoded=render_thumbnails(job)
+            )
+            detail = None
         
         # Calculate processing time
         processing_time = time.time() - start_time
+        stats.add_span('total', processing_time)
         
-        # Mark as completed with results
-        job.status = "done"
-        job.extracted_text = extracted_text  # ✅ Correct field name
-        job.completed_at = timezone.now()
-        job.processing_time = processing_time
-        job.save(update_fields=[
-            'status', 
-            'extracted_text', 
-            'completed_at', 
-            'processing_time',
-            'updated_at'
-        ])
+        # Mark as completed with results, unless it was given up on meanwhile
+        if not job.mark_as_done(
+            extracted_text,
+            processing_time=processing_time,
+            detail=detail,
+            engine_stats=stats.as_dict(),
+            timings=stats.spans_dict()
+        ):
+            logger.warning(f"OCR job {job_id} finished after it was {job.status}")
+            return {'job_id': str(job_id), 'status': job.status}
+        observe('done', job.timings)
         
         logger.info(f"OCR completed for job {job_id} in {processing_time:.2f}s")
+        propagate_to_duplicates(job)
         return {
             'job_id': str(job_id),
             'status': 'done',
             'text_length': len(extracted_text)
         }
-        
+    
     except OCRJob.DoesNotExist:
         logger.error(f"Job {job_id} not found")
         raise
-        
+    
     except Exception as e:
         logger.exception(f"OCR processing failed for job {job_id}")
         try:
             job = OCRJob.objects.get(id=job_id)
-            job.status = "rejected"
-            job.error_message = str(e)
-            job.completed_at = timezone.now()
-            job.save(update_fields=[
-                'status', 
-                'error_message', 
-                'completed_at',
-                'updated_at'
-            ])
+            if job.mark_as_rejected(str(e)):
+                observe('rejected')
+                propagate_to_duplicates(job)
         except Exception as save_error:
             logger.error(f"Failed to update job status: {save_error}")
         
-        raise
\ No newline at end of file
+        raise
+
+
+def batchable(job):
+    """
+    Whether a job can go through OCRService.process_batch, which reads
+    a single page with EasyOCR and the default preprocessing
+    """
+    if job.detail or job.preprocess or settings.OCR_ENGINE != 'easyocr' or not job.image:
+        return False
+    try:
+        path = job.image.path
+        return not is_pdf(path) and count_pages(path) == 1
+    except Exception:
+        # Let run_ocr_job report what is wrong with it
+        return False
+
+
+def run_ocr_batch(batch_id, observe=None):
+    """
+    Run OCR for every pending job of a batch in batched model passes
+    
+    Multi-page documents, jobs with their own detail or preprocessing
+    options, and every job when OCR_ENGINE is not EasyOCR, run one by
+    one through run_ocr_job instead. ``observe`` is as for run_ocr_job.
+    """
+    observe = observe or metrics.observe_job
+    batch = OCRBatch.objects.get(id=batch_id)
+    # Duplicates are settled by their source
+    jobs = list(
+        batch.jobs.filter(status='pending', duplicate_of__isnull=True).order_by('created_at')
+    )
+    if not jobs:
+        return {'batch_id': str(batch_id), 'processed': 0}
+    
+    single = [job for job in jobs if not batchable(job)]
+    jobs = [job for job in jobs if batchable(job)]
+    if jobs:
+        _run_batched(batch_id, jobs, observe)
+    for job in single:
+        try:
+            run_ocr_job(job.id, observe=observe)
+        except Exception:
+            # Already recorded on the job
+            pass
+    
+    return {'batch_id': str(batch_id), 'processed': len(jobs) + len(single)}
+
+
+def _run_batched(batch_id, jobs, observe):
+    """OCR the batchable jobs of a batch together"""
+    now = timezone.now()
+    # Claim the jobs no other worker took since they were listed
+    OCRJob.objects.filter(id__in=[job.id for job in jobs], status='pending').update(
+        status='processing',
+        started_at=now,
+        updated_at=now
+    )
+    claimed = set(
+        OCRJob.objects.filter(
+            id__in=[job.id for job in jobs], status='processing', started_at=now
+        ).values_list('id', flat=True)
+    )
+    jobs = [job for job in jobs if job.id in claimed]
+    if not jobs:
+        return
+    logger.info(f"Starting batch OCR for {batch_id} ({len(jobs)} jobs)")
+    for job in jobs:
+        job.status = 'processing'
+    status_cache.set_many([job.id for job in jobs], {'status': 'processing'})
+    
+    start_time = time.time()
+    try:
+        results = OCRService.process_batch([job.image.path for job in jobs])
+    except Exception as e:
+        # Only reached when no image could be read, e.g. the model failed to load
+        logger.exception(f"Batch OCR failed for {batch_id}")
+        results = [e] * len(jobs)
+    
+    # Model time is shared, so attribute it evenly across the batch
+    processing_time = (time.time() - start_time) / len(jobs)
+    
+    for job, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            if not job.mark_as_rejected(str(result)):
+                continue
+            observe('rejected')
+        else:
+            timings = None
+            if settings.OCR_METRICS_ENABLED:
+                timings = {
+                    'queue_wait': round((now - job.created_at).total_seconds(), 4),
+                    'total': round(processing_time, 4),
+                }
+            if not job.mark_as_done(result, processing_time=processing_time, timings=timings):
+                continue
+            observe('done', job.timings)
+        propagate_to_duplicates(job)
+    
+    logger.info(
+        f"Batch OCR completed for {batch_id}: {len(jobs)} images in "
+        f"{processing_time * len(jobs):.2f}s"
+    )
+
+
+def run_in_worker(func, arg, data=None):
+    """
+    Run run_ocr_job or run_ocr_batch in an OCRExecutor worker process
+    
+    ``data`` holds the upload's bytes when the web process ingested it
+    in memory. Counters written here would land in the worker's own
+    cache, so the (status, timings) observations are returned instead,
+    for the web process to record (see ocr.dispatch).
+    """
+    if data is not None:
+        upload_buffers.put(arg, data)
+    observed = []
+    try:
+        func(arg, observe=lambda status, spans=None: observed.append((status, spans)))
+    except Exception:
+        # Already recorded on the job
+        pass
+    finally:
+        # Left over when another worker had claimed the job
+        upload_buffers.pop(arg)
+    return observed
+
+
+@shared_task(bind=True)
+def process_ocr(self, job_id):
+    """
+    Process OCR for the given job
+    """
+    from .scheduler import scheduler
+    try:
+        return run_ocr_job(job_id)
+    finally:
+        # Let the client's next held job into the queue
+        scheduler.release(job_id)
+
+
+@shared_task(bind=True)
+def process_ocr_batch(self, batch_id):
+    """
+    Process OCR for every pending job of a batch in batched model passes
+    """
+    from .scheduler import scheduler
+    try:
+        return run_ocr_batch(batch_id)
+    finally:
+        # Let the client's next held work into the queue
+        scheduler.release_batch(batch_id)
+
+
+@shared_task(name='ocr.cleanup_old_jobs', ignore_result=True)
+def cleanup_old_jobs():
+    """
+    Delete jobs older than OCR_CLEANUP_DAYS with their image files, then
+    sweep upload files no job references
+    """
+    from .services.cleanup import cleanup_jobs, sweep_orphans
+    report = cleanup_jobs()
+    if settings.OCR_CLEANUP_SWEEP_ORPHANS:
+        sweep_orphans(report=report)
+    stats = report.finish().as_dict()
+    logger.info(f"Cleanup finished: {stats}")
+    return stats
+
+
+@shared_task(name='ocr.render_thumbnails', ignore_result=True)
+def render_thumbnails_task(content_hash):
+    """
+    Render the previews of a stored upload after a thumbnail cache miss
+    """
+    thumbnail_cache.render(content_hash)
+
+
+@shared_task(name='ocr.recover_stale_jobs', ignore_result=True)
+def recover_stale_jobs():
+    """
+    Re-dispatch or reject jobs whose worker was lost
+    """
+    from .services.recovery import recover_stale_jobs as recover
+    return recover()
+
+
+@shared_task(name='ocr.release_held_jobs', ignore_result=True)
+def release_held_jobs():
+    """
+    Periodically dispatch held jobs whose client has a free fair share
+    """
+    from .scheduler import scheduler
+    scheduler.release_held()
\ No newline at end of file
@@ -1,25 +1,948 @@
-# ocr/tasks.py
+# ocr/tests.py
 
-from celery import shared_task
-from .models import OCRJob
-from .services.ocr_service import extract_text
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+import numpy as np
+from PIL import Image, ImageDraw
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import (
+    AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+from django.utils import timezone
 
+from .admin import OCRJobAdmin
+from .dispatch import ProcessPoolDispatcher, _observe_worker_metrics
+from .models import OCRJob, OCRResult, OCRSearchDocument
+from .scheduler import scheduler
+from .services import notifier
+from .services.cleanup import cleanup_jobs, sweep_orphans
+from .services.dedup import copy_result, result_cache
+from .services.executor import ExecutorQueueFull, _init_worker
+from .services.ingest import upload_buffers
+from .services.preflight import PreflightError, preflight
+from .services.metrics import metrics
+from .services.notifier import LocalNotifier
+from .services.reader_pool import reader_pool
+from .services.recovery import recover_stale_jobs
+from .services.search import SNIPPET_CHUNK_SIZE, leading_text
+from .services.thumbnails import TOUCH_INTERVAL, ThumbnailCache
+from .tasks import run_in_worker, run_ocr_job
 
-@shared_task(bind=True)
-def process_ocr_task(self, job_id):
-    job = OCRJob.objects.get(id=job_id)
 
-    try:
-        job.status = "processing"
-        job.save()
+class FakeReader:
+    """Stands in for an EasyOCR reader, so no model is loaded"""
 
-        text = extract_text(job.image.path)
+    text = 'hello world'
 
-        job.status = "completed"
-        job.result_text = text
-        job.save()
+    def __init__(self, error=None):
+        self.error = error
 
-    except Exception as e:
-        job.status = "rejected"
-        job.error_message = str(e)
-        job.save()
+    def readtext(self, img, detail=1, **kwargs):
+        if self.error is not None:
+            raise self.error
+        height, width = img.shape[:2]
+        lines = [([[0, 0], [width, 0], [width, height], [0, height]], self.text, 0.95)]
+        return [text for _, text, _ in lines] if detail == 0 else lines
+
+    def readtext_batched(self, images, detail=1, **kwargs):
+        return [self.readtext(img, detail=detail) for img in images]
+
+
+def make_upload(name='page.png', label='hello world', pages=1, size=(200, 80)):
+    """A small PNG (or multi-page TIFF) with some dark pixels on it"""
+    images = []
+    for number in range(pages):
+        image = Image.new('L', size, 255)
+        ImageDraw.Draw(image).text((10, 30), f'{label} {number}', fill=0)
+        images.append(image)
+    buffer = io.BytesIO()
+    if pages > 1:
+        images[0].save(buffer, 'TIFF', save_all=True, append_images=images[1:])
+    else:
+        images[0].save(buffer, 'PNG')
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+class PipelineSetupMixin:
+    """
+    Settings, a fake reader and helpers for tests going through the
+    HTTP API
+
+    TransactionTestCase, so on_commit dispatch runs and worker threads
+    see the committed job.
+    """
+
+    mode = None
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            OCR_EXECUTION_MODE=self.mode,
+            OCR_DEDUP_ENABLED=False,
+            OCR_THUMBNAILS_ENABLED=False,
+            OCR_INGEST_MODE='disk',
+            OCR_NOTIFY_BACKEND='local',
+            OCR_RECOVERY_INTERVAL=0
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        caches['default'].clear()
+        self.use_reader(FakeReader())
+
+    def use_reader(self, reader):
+        patcher = mock.patch.object(reader_pool, 'get', return_value=reader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, **kwargs):
+        response = self.client.post(reverse('ocr:upload'), {'image': make_upload(**kwargs)})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['jobId']
+
+    def wait_for_status(self, job_id):
+        response = self.client.get(reverse('ocr:status', args=[job_id]), {'wait': 5})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+
+class PipelineTestMixin(PipelineSetupMixin):
+    """Upload -> dispatch -> status/result through the HTTP API"""
+
+    def test_upload_is_processed(self):
+        job_id = self.upload()
+
+        self.assertEqual(self.wait_for_status(job_id)['status'], 'done')
+        response = self.client.get(reverse('ocr:result', args=[job_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'jobId': job_id, 'text': 'hello world'})
+        job = OCRJob.objects.get(id=job_id)
+        self.assertIsNotNone(job.processing_time)
+        self.assertTrue(job.image)
+
+    def test_failed_ocr_rejects_job(self):
+        self.use_reader(FakeReader(error=RuntimeError('model exploded')))
+        job_id = self.upload()
+
+        data = self.wait_for_status(job_id)
+        self.assertEqual(data['status'], 'rejected')
+        self.assertIn('model exploded', data['error'])
+        response = self.client.get(reverse('ocr:result', args=[job_id]))
+        self.assertEqual(response.json(), {'message': 'OCR not completed yet'})
+
+    def test_invalid_upload_is_refused(self):
+        upload = io.BytesIO(b'not an image')
+        upload.name = 'page.png'
+        response = self.client.post(reverse('ocr:upload'), {'image': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OCRJob.objects.exists())
+
+    def test_unknown_job(self):
+        job_id = '00000000-0000-0000-0000-000000000000'
+        self.assertEqual(self.client.get(reverse('ocr:status', args=[job_id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('ocr:result', args=[job_id])).status_code, 404)
+
+
+class EagerPipelineTests(PipelineTestMixin, TransactionTestCase):
+    mode = 'eager'
+
+    def test_job_is_done_when_upload_returns(self):
+        job_id = self.upload()
+        response = self.client.get(reverse('ocr:status', args=[job_id]))
+        self.assertEqual(response.json()['status'], 'done')
+
+    def test_pages_are_stored_compressed(self):
+        FakeReader.text = 'hello world ' * 100
+        self.addCleanup(setattr, FakeReader, 'text', 'hello world')
+        job_id = self.upload(name='scan.tiff', pages=2)
+
+        page = OCRJob.objects.get(id=job_id).pages.get(page_number=1)
+        self.assertEqual(page.codec, 'zlib')
+        self.assertLess(len(page.text_data), len(FakeReader.text))
+        response = self.client.get(reverse('ocr:result-pages', args=[job_id]))
+        self.assertEqual(
+            [(data['page'], data['text']) for data in response.json()['pages']],
+            [(1, FakeReader.text), (2, FakeReader.text)]
+        )
+        response = self.client.get(reverse('ocr:result', args=[job_id]), {'format': 'ndjson'})
+        records = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(records), 2)
+        self.assertIn('"page": 2', records[1])
+
+
+class ThreadPipelineTests(PipelineTestMixin, TransactionTestCase):
+    mode = 'thread'
+
+    def test_event_stream_ends_with_terminal_status(self):
+        finish = threading.Event()
+
+        class SlowReader(FakeReader):
+            def readtext(self, img, detail=1, **kwargs):
+                finish.wait(5)
+                return super().readtext(img, detail=detail, **kwargs)
+
+        self.use_reader(SlowReader())
+        job_id = self.upload()
+
+        async def read_events():
+            response = await AsyncClient().get(reverse('ocr:events', args=[job_id]))
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            chunks = []
+            async for chunk in response.streaming_content:
+                chunks.append(chunk.decode() if isinstance(chunk, bytes) else chunk)
+                # The first event is the status read on subscribing
+                finish.set()
+            return ''.join(chunks)
+
+        events = asyncio.run(read_events())
+        self.assertTrue(events.startswith('event: status\n'))
+        self.assertIn('data: {"status": "done"', events)
+
+
+class LocalNotifierTests(SimpleTestCase):
+    """In-process pub/sub used for long-poll and SSE in development"""
+
+    def test_subscriber_receives_payloads_for_its_job(self):
+        local = LocalNotifier()
+        with local.subscribe('a') as subscription:
+            local.publish('b', {'status': 'done'})
+            self.assertIsNone(subscription.get(0))
+            threading.Thread(target=local.publish, args=('a', {'status': 'done'})).start()
+            self.assertEqual(subscription.get(5), {'status': 'done'})
+
+    def test_closed_subscription_is_dropped(self):
+        local = LocalNotifier()
+        subscription = local.subscribe('a')
+        subscription.close()
+        self.assertEqual(local._subscriptions, {})
+        local.publish('a', {'status': 'done'})
+
+    def test_async_subscriber_receives_payloads_from_other_threads(self):
+        local = LocalNotifier()
+
+        async def receive():
+            async with await local.subscribe_async('a') as subscription:
+                self.assertIsNone(await subscription.get(0))
+                threading.Thread(
+                    target=local.publish, args=('a', {'status': 'rejected'})
+                ).start()
+                return await subscription.get(5)
+
+        self.assertEqual(asyncio.run(receive()), {'status': 'rejected'})
+        self.assertEqual(local._subscriptions, {})
+
+    @override_settings(OCR_NOTIFY_BACKEND='local')
+    def test_publish_status_uses_the_process_notifier(self):
+        with mock.patch.object(notifier, '_notifier', None):
+            with notifier.subscribe('a') as subscription:
+                notifier.publish_status('a', {'status': 'processing'})
+                self.assertEqual(subscription.get(1), {'status': 'processing'})
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local', OCR_RECOVERY_INTERVAL=0)
+class PreflightTests(TestCase):
+    """Uploads that could never be OCRed are refused before a job exists"""
+
+    def post(self, upload):
+        return self.client.post(reverse('ocr:upload'), {'image': upload})
+
+    @override_settings(OCR_UPLOAD_MAX_PIXELS=10_000)
+    def test_oversized_images_are_rejected(self):
+        response = self.post(make_upload(size=(200, 80)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pixels', str(response.json()))
+        self.assertFalse(OCRJob.objects.exists())
+
+    @override_settings(OCR_UPLOAD_MAX_SIDE=150)
+    def test_overlong_sides_are_rejected(self):
+        with self.assertRaises(PreflightError):
+            preflight(make_upload(size=(200, 80)))
+
+    def test_tiny_images_are_rejected(self):
+        with self.assertRaises(PreflightError):
+            preflight(make_upload(size=(4, 80)))
+
+    @override_settings(OCR_UPLOAD_TEXT_CHECK=True)
+    def test_blank_images_are_rejected_when_checked(self):
+        blank = io.BytesIO()
+        Image.new('L', (200, 80), 255).save(blank, 'PNG')
+        blank.seek(0)
+        blank.name = 'blank.png'
+        with self.assertRaisesMessage(PreflightError, 'no text'):
+            preflight(blank)
+
+        upload = make_upload()
+        preflight(upload)
+        self.assertEqual(upload.tell(), 0)
+
+
+class WorkerWarmUpTests(SimpleTestCase):
+    """Process-pool workers load EasyOCR only when it will be used"""
+
+    def warms_up(self):
+        with mock.patch('django.setup'), mock.patch.object(reader_pool, 'warm_up') as warm_up:
+            _init_worker(os.environ['DJANGO_SETTINGS_MODULE'], [['en']])
+        return warm_up.called
+
+    def test_warm_up_follows_the_engine(self):
+        with override_settings(OCR_ENGINE='easyocr'):
+            self.assertTrue(self.warms_up())
+        with override_settings(OCR_ENGINE='tesseract'):
+            self.assertFalse(self.warms_up())
+        with override_settings(OCR_ENGINE='cascade', OCR_CASCADE_FALLBACK='easyocr'):
+            self.assertTrue(self.warms_up())
+
+    @override_settings(OCR_ENGINE='easyocr', OCR_WARMUP_ON_WORKER_START=False)
+    def test_warm_up_can_be_turned_off(self):
+        self.assertFalse(self.warms_up())
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local')
+class JobListTests(TestCase):
+    """Job listing and bulk status are scoped to the caller's client ID"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.own = OCRJob.objects.create(image='uploads/a.png', client_id='a')
+        self.own.mark_as_done('own text')
+        self.other = OCRJob.objects.create(image='uploads/b.png', client_id='b')
+        self.other.mark_as_done('secret text')
+
+    def list_jobs(self, client_id='a', **params):
+        return self.client.get(
+            reverse('ocr:job-list'), params, HTTP_X_CLIENT_ID=client_id
+        )
+
+    def test_callers_only_list_their_own_jobs(self):
+        response = self.list_jobs()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [job['id'] for job in response.json()['results']], [str(self.own.id)]
+        )
+
+    def test_extracted_text_is_for_staff_only(self):
+        response = self.list_jobs(fields='id,extracted_text')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.list_jobs(fields='id,extracted_text')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {job['extracted_text'] for job in response.json()['results']},
+            {'own text', 'secret text'}
+        )
+
+    def test_bad_cursor_and_fields_are_refused(self):
+        self.assertEqual(self.list_jobs(cursor='garbage').status_code, 400)
+        self.assertEqual(self.list_jobs(fields='id,password').status_code, 400)
+        self.assertEqual(self.list_jobs(limit='0').status_code, 400)
+
+    def test_cursor_pages_through_jobs(self):
+        for _ in range(3):
+            OCRJob.objects.create(image='uploads/c.png', client_id='a')
+        seen, params = [], {'limit': 2}
+        while True:
+            data = self.list_jobs(**params).json()
+            seen.extend(job['id'] for job in data['results'])
+            if not data['cursor']:
+                break
+            params['cursor'] = data['cursor']
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(len(set(seen)), 4)
+
+    def test_bulk_status_hides_other_clients_jobs(self):
+        response = self.client.post(
+            reverse('ocr:job-status-bulk'),
+            {'ids': [str(self.own.id), str(self.other.id)]},
+            content_type='application/json',
+            HTTP_X_CLIENT_ID='a'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(list(data['statuses']), [str(self.own.id)])
+        self.assertEqual(data['missing'], [str(self.other.id)])
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local', OCR_RECOVERY_INTERVAL=0)
+class AdminChangeListTests(TestCase):
+    """The admin job list pages by keyset cursors in both directions"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.jobs = [
+            OCRJob.objects.create(image='uploads/a.png')
+            for _ in range(OCRJobAdmin.list_per_page + 2)
+        ]
+        self.client.force_login(User.objects.create_superuser('admin'))
+        self.url = reverse('admin:ocr_ocrjob_changelist')
+
+    def page(self, query=''):
+        response = self.client.get(self.url + query)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_pages_older_and_back(self):
+        first = self.page()
+        self.assertEqual(len(first.result_list), OCRJobAdmin.list_per_page)
+        self.assertIsNone(first.newer_url)
+        self.assertEqual(first.result_count, len(self.jobs))
+
+        second = self.page(first.older_url)
+        self.assertEqual(len(second.result_list), 2)
+        self.assertIsNone(second.older_url)
+        seen = {job.id for job in first.result_list + second.result_list}
+        self.assertEqual(seen, {job.id for job in self.jobs})
+
+        back = self.page(second.newer_url)
+        self.assertEqual(
+            [job.id for job in back.result_list], [job.id for job in first.result_list]
+        )
+
+    def test_bad_cursor_starts_from_the_newest_jobs(self):
+        cl = self.page('?after=garbage')
+        self.assertEqual(
+            [job.id for job in cl.result_list], [job.id for job in self.page().result_list]
+        )
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local', OCR_RECOVERY_INTERVAL=0)
+class DuplicateResultTests(TestCase):
+    """Duplicates share their source's result instead of copying it"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.source = OCRJob.objects.create(image='uploads/a.png', content_hash='h')
+        self.source.mark_as_done('shared text')
+        self.duplicates = [
+            OCRJob.objects.create(
+                image='uploads/a.png', content_hash='h', duplicate_of=self.source
+            )
+            for _ in range(2)
+        ]
+        for job in self.duplicates:
+            copy_result(self.source, job)
+
+    def test_duplicate_reads_the_source_result(self):
+        job = OCRJob.objects.get(id=self.duplicates[0].id)
+        self.assertEqual(job.status, 'done')
+        self.assertFalse(OCRResult.objects.filter(job=job).exists())
+        self.assertEqual(job.extracted_text, 'shared text')
+        response = self.client.get(
+            reverse('ocr:result', args=[job.id]), {'format': 'txt'}
+        )
+        self.assertEqual(b''.join(response.streaming_content), b'shared text')
+
+    def test_deleting_the_source_hands_the_result_over(self):
+        self.source.delete()
+
+        heir, other = [OCRJob.objects.get(id=job.id) for job in self.duplicates]
+        self.assertIsNone(heir.duplicate_of_id)
+        self.assertEqual(other.duplicate_of_id, heir.id)
+        self.assertEqual(heir.extracted_text, 'shared text')
+        self.assertEqual(other.extracted_text, 'shared text')
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local', OCR_RECOVERY_INTERVAL=0)
+class ResultETagTests(TestCase):
+    """Every result format revalidates with its own ETag"""
+
+    FORMATS = ('json', 'txt', 'ndjson', 'detail')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.job = OCRJob.objects.create(image='uploads/a.png', detail=True)
+        box = [[0, 0], [10, 0], [10, 5], [0, 5]]
+        self.job.mark_as_done('hello world', detail=[(1, box, 'hello world', 0.9)])
+        self.url = reverse('ocr:result', args=[self.job.id])
+
+    def test_matching_etag_gets_304(self):
+        etags = set()
+        for fmt in self.FORMATS:
+            with self.subTest(format=fmt):
+                response = self.client.get(self.url, {'format': fmt})
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                etags.add(etag)
+
+                # Only the job row is read, never the result
+                with self.assertNumQueries(1):
+                    response = self.client.get(
+                        self.url, {'format': fmt}, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.content)
+        self.assertEqual(len(etags), len(self.FORMATS))
+
+    def test_rerun_changes_the_etag(self):
+        etag = self.client.get(self.url, {'format': 'txt'})['ETag']
+        OCRJob.objects.filter(id=self.job.id).update(
+            completed_at=timezone.now() + timedelta(seconds=1)
+        )
+        response = self.client.get(self.url, {'format': 'txt'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local', OCR_SEARCH_ENABLED=True)
+class SearchTests(TestCase):
+    """Full-text search quotes every client's text, so is for staff"""
+
+    def setUp(self):
+        caches['default'].clear()
+        job = OCRJob.objects.create(image='uploads/a.png', client_id='a')
+        job.mark_as_done('The quarterly Invoice, total.')
+        self.job = job
+
+    def test_search_is_refused_to_non_staff(self):
+        response = self.client.get(reverse('ocr:search'), {'q': 'invoice'})
+        self.assertIn(response.status_code, (401, 403))
+        self.client.force_login(User.objects.create_user('user'))
+        response = self.client.get(reverse('ocr:search'), {'q': 'invoice'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_get_hits_with_snippets(self):
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(reverse('ocr:search'), {'q': 'invoice'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['jobId'], str(self.job.id))
+        self.assertEqual(data['results'][0]['snippet'], 'The quarterly Invoice, total.')
+
+    def test_index_keeps_tokens_only(self):
+        self.assertEqual(
+            OCRSearchDocument.objects.get(job=self.job).content,
+            'the quarterly invoice total'
+        )
+
+    @override_settings(OCR_SEARCH_BACKEND='terms')
+    def test_terms_backend_keeps_no_document(self):
+        job = OCRJob.objects.create(image='uploads/b.png')
+        job.mark_as_done('another invoice')
+        self.assertFalse(OCRSearchDocument.objects.filter(job=job).exists())
+        self.assertTrue(job.search_terms.filter(term='invoice').exists())
+
+    def test_snippet_decompresses_only_the_leading_text(self):
+        result = OCRResult(job=self.job, **OCRResult.encode('filler ' * 20000 + 'needle'))
+        text = leading_text(result, 'filler', width=100)
+        self.assertLess(len(text), 2 * SNIPPET_CHUNK_SIZE)
+        self.assertEqual(leading_text(result, 'needle', width=100)[-6:], 'needle')
+
+
+class FairShareTests(TestCase):
+    """A client's backlog must not hold up another client's uploads"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            OCR_EXECUTION_MODE='thread',
+            OCR_FAIR_SHARE_ENABLED=True,
+            OCR_FAIR_SHARE_LIMITS={'interactive': 2, 'bulk': 2},
+            OCR_DEDUP_ENABLED=False,
+            OCR_INGEST_MODE='disk',
+            OCR_NOTIFY_BACKEND='local'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Record the dispatch order instead of running OCR
+        self.dispatched = []
+        for name in ('dispatch_job', 'dispatch_batch'):
+            patcher = mock.patch(
+                f'ocr.scheduler.{name}',
+                side_effect=lambda job_id, **kwargs: self.dispatched.append(job_id)
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def upload(self, client_id, **data):
+        response = self.client.post(
+            reverse('ocr:upload'),
+            {'image': make_upload(label=f'{client_id} {len(self.dispatched)}'), **data},
+            HTTP_X_CLIENT_ID=client_id
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        return uuid.UUID(response.json()['jobId'])
+
+    def test_noisy_client_does_not_delay_another_clients_upload(self):
+        # No priority given, as from a script backfilling its archive
+        noisy = [self.upload('noisy') for _ in range(5)]
+        quiet = self.upload('quiet')
+
+        self.assertEqual(self.dispatched, noisy[:2] + [quiet])
+        self.assertEqual(
+            set(OCRJob.objects.filter(dispatched_at__isnull=True).values_list('id', flat=True)),
+            set(noisy[2:])
+        )
+
+        OCRJob.objects.get(id=noisy[0]).mark_as_done('done')
+        scheduler.release(noisy[0])
+        self.assertEqual(self.dispatched[-1], noisy[2])
+
+    def test_batches_wait_for_the_clients_bulk_share(self):
+        self.upload('noisy', priority='bulk')
+        self.upload('noisy', priority='bulk')
+
+        response = self.client.post(
+            reverse('ocr:batch-upload'),
+            {'images': [make_upload(label='a'), make_upload(label='b')]},
+            HTTP_X_CLIENT_ID='noisy'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        batch_id = uuid.UUID(response.json()['batchId'])
+        self.assertNotIn(batch_id, self.dispatched)
+
+        for job in OCRJob.objects.filter(batch__isnull=True):
+            job.mark_as_done('done')
+        scheduler.release(job.id)
+        self.assertEqual(self.dispatched[-1], batch_id)
+        self.assertFalse(
+            OCRJob.objects.filter(batch_id=batch_id, dispatched_at__isnull=True).exists()
+        )
+
+
+class BatchTests(PipelineSetupMixin, TransactionTestCase):
+    """Batch uploads in batched model passes"""
+
+    mode = 'eager'
+
+    def upload_batch(self, *images):
+        response = self.client.post(reverse('ocr:batch-upload'), {'images': list(images)})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_one_failing_image_does_not_reject_the_batch(self):
+        class PickyReader(FakeReader):
+            def readtext(self, img, detail=1, **kwargs):
+                if img.shape[1] > 1000:
+                    raise RuntimeError('too wide')
+                return super().readtext(img, detail=detail, **kwargs)
+
+        self.use_reader(PickyReader())
+        data = self.upload_batch(
+            make_upload(name='a.png', label='a'),
+            make_upload(name='wide.png', label='b', size=(1600, 80)),
+            make_upload(name='c.png', label='c')
+        )
+
+        jobs = {
+            job.file_name: job
+            for job in OCRJob.objects.filter(batch_id=data['batchId'])
+        }
+        self.assertEqual(jobs['a.png'].status, 'done')
+        self.assertEqual(jobs['c.png'].status, 'done')
+        self.assertEqual(jobs['wide.png'].status, 'rejected')
+        self.assertIn('too wide', jobs['wide.png'].error_message)
+
+    def test_multi_page_members_keep_every_page(self):
+        data = self.upload_batch(make_upload(name='scan.tiff', pages=3), make_upload())
+
+        job = OCRJob.objects.get(batch_id=data['batchId'], file_name='scan.tiff')
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.pages_done, job.pages_total), (3, 3))
+        self.assertEqual(job.extracted_text.split('\n\n'), ['hello world'] * 3)
+        self.assertEqual(OCRJob.objects.filter(status='done').count(), 2)
+
+
+class DedupTests(PipelineSetupMixin, TransactionTestCase):
+    """Uploads of known content reuse the earlier job's result"""
+
+    mode = 'eager'
+
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(OCR_DEDUP_ENABLED=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        result_cache.reset()
+        self.reader = FakeReader()
+        self.reader.readtext = mock.Mock(wraps=self.reader.readtext)
+        self.use_reader(self.reader)
+
+    def test_same_content_is_a_hit(self):
+        first = self.upload()
+        second = self.upload()
+
+        job = OCRJob.objects.get(id=second)
+        self.assertEqual(str(job.duplicate_of_id), first)
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.extracted_text, 'hello world')
+        self.assertEqual(self.reader.readtext.call_count, 1)
+        self.assertEqual(result_cache.stats()['hits'], 1)
+        self.assertEqual(result_cache.stats()['misses'], 1)
+
+    def test_other_content_is_a_miss(self):
+        self.upload(label='first')
+        job_id = self.upload(label='second')
+
+        self.assertIsNone(OCRJob.objects.get(id=job_id).duplicate_of_id)
+        self.assertEqual(self.reader.readtext.call_count, 2)
+        self.assertEqual(result_cache.stats()['misses'], 2)
+
+    def test_batch_reuses_earlier_and_repeated_images(self):
+        earlier = self.upload(label='earlier')
+        response = self.client.post(reverse('ocr:batch-upload'), {'images': [
+            make_upload(name='a.png', label='earlier'),
+            make_upload(name='b.png', label='repeated'),
+            make_upload(name='c.png', label='repeated'),
+        ]})
+        self.assertEqual(response.status_code, 200, response.content)
+
+        jobs = {
+            job.file_name: job
+            for job in OCRJob.objects.filter(batch_id=response.json()['batchId'])
+        }
+        self.assertEqual(str(jobs['a.png'].duplicate_of_id), earlier)
+        self.assertIsNone(jobs['b.png'].duplicate_of_id)
+        self.assertEqual(jobs['c.png'].duplicate_of_id, jobs['b.png'].id)
+        self.assertEqual({job.status for job in jobs.values()}, {'done'})
+        self.assertEqual(jobs['c.png'].extracted_text, 'hello world')
+        self.assertEqual(result_cache.stats()['hits'], 2)
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local')
+class CleanupTests(TestCase):
+    """Expired jobs go with their files, unless another job still uses them"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        caches['default'].clear()
+
+    def make_job(self, name, days_ago=0, **fields):
+        stored = default_storage.save(f'uploads/images/{name}', ContentFile(b'image'))
+        job = OCRJob.objects.create(image=stored, **fields)
+        job.mark_as_done(f'text of {name}')
+        OCRJob.objects.filter(id=job.id).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return job
+
+    def test_expired_jobs_and_unshared_files_are_deleted(self):
+        expired = self.make_job('old.png', days_ago=30)
+        recent = self.make_job('new.png')
+
+        report = cleanup_jobs(days=7, chunk_size=1)
+
+        self.assertEqual(report.jobs, 1)
+        self.assertFalse(OCRJob.objects.filter(id=expired.id).exists())
+        self.assertFalse(default_storage.exists(expired.image.name))
+        self.assertTrue(default_storage.exists(recent.image.name))
+
+    def test_files_still_shared_are_kept(self):
+        source = self.make_job('shared.png', days_ago=30, content_hash='h')
+        duplicate = OCRJob.objects.create(
+            image=source.image.name, content_hash='h', duplicate_of=source
+        )
+        copy_result(source, duplicate)
+
+        report = cleanup_jobs(days=7)
+
+        self.assertEqual((report.jobs, report.files, report.shared_files), (1, 0, 1))
+        self.assertTrue(default_storage.exists(source.image.name))
+        self.assertEqual(OCRJob.objects.get(id=duplicate.id).extracted_text, 'text of shared.png')
+
+    def test_orphans_are_swept(self):
+        kept = self.make_job('kept.png')
+        orphan = default_storage.save('uploads/images/orphan.png', ContentFile(b'image'))
+
+        report = sweep_orphans(grace=-1)
+
+        self.assertEqual(report.orphans, 1)
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(kept.image.name))
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local', OCR_EXECUTION_MODE='process')
+class RecoveryTests(TestCase):
+    """Recovery must never reject or re-run a job that is still alive"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.job = OCRJob.objects.create(image='uploads/a.png', client_id='a')
+
+    def start_job(self, hours_ago):
+        self.assertTrue(self.job.mark_as_processing())
+        OCRJob.objects.filter(id=self.job.id).update(
+            started_at=timezone.now() - timedelta(hours=hours_ago)
+        )
+
+    def test_a_job_is_claimed_once(self):
+        self.assertTrue(OCRJob.objects.get(id=self.job.id).mark_as_processing())
+        self.assertFalse(OCRJob.objects.get(id=self.job.id).mark_as_processing())
+        with mock.patch.object(reader_pool, 'get') as get_reader:
+            result = run_ocr_job(self.job.id)
+        self.assertEqual(result['status'], 'processing')
+        get_reader.assert_not_called()
+
+    def test_long_jobs_of_local_pools_are_left_running(self):
+        self.start_job(hours_ago=2)
+        self.assertEqual(recover_stale_jobs()['rejected'], 0)
+        self.assertEqual(OCRJob.objects.get(id=self.job.id).status, 'processing')
+
+        # Left over from before the web process started
+        self.assertEqual(recover_stale_jobs(orphaned_before=timezone.now())['rejected'], 1)
+
+    @override_settings(OCR_EXECUTION_MODE='celery')
+    def test_celery_jobs_past_the_time_limit_are_rejected(self):
+        self.start_job(hours_ago=2)
+        self.assertEqual(recover_stale_jobs()['rejected'], 1)
+        self.assertEqual(OCRJob.objects.get(id=self.job.id).status, 'rejected')
+
+    def test_a_rejected_job_stays_rejected(self):
+        self.start_job(hours_ago=0)
+        worker_copy = OCRJob.objects.get(id=self.job.id)
+        self.assertTrue(self.job.mark_as_rejected('lost'))
+
+        self.assertFalse(worker_copy.mark_as_done('late text'))
+        self.assertFalse(worker_copy.mark_as_rejected('late error'))
+        job = OCRJob.objects.get(id=self.job.id)
+        self.assertEqual((job.status, job.error_message), ('rejected', 'lost'))
+        self.assertIsNone(job.extracted_text)
+
+
+@override_settings(OCR_NOTIFY_BACKEND='local', OCR_METRICS_ENABLED=True)
+class WorkerMetricsTests(TestCase):
+    """Process-pool workers hand their observations to the web process"""
+
+    def setUp(self):
+        caches['metrics'].clear()
+        self.job = OCRJob.objects.create(image='uploads/missing.png')
+
+    def test_observations_are_recorded_by_the_parent(self):
+        observed = run_in_worker(run_ocr_job, self.job.id)
+        self.assertEqual(observed, [('rejected', None)])
+        self.assertEqual(metrics.snapshot()['jobs:rejected'], 0)
+
+        future = Future()
+        future.set_result(observed)
+        _observe_worker_metrics(future)
+        self.assertEqual(metrics.snapshot()['jobs:rejected'], 1)
+
+    def test_a_job_finished_elsewhere_is_not_counted(self):
+        run_in_worker(run_ocr_job, self.job.id)
+        self.assertEqual(run_in_worker(run_ocr_job, self.job.id), [])
+
+
+@override_settings(
+    OCR_NOTIFY_BACKEND='local', OCR_EXECUTION_MODE='process', OCR_INGEST_MODE='memory'
+)
+class ProcessIngestTests(TestCase):
+    """Uploads ingested in memory reach process-pool workers with the call"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.job = OCRJob.objects.create(image='')
+        self.job_id = str(self.job.id)
+
+    def test_worker_reads_the_handed_over_bytes(self):
+        with mock.patch.object(reader_pool, 'get', return_value=FakeReader()):
+            observed = run_in_worker(run_ocr_job, self.job_id, make_upload().getvalue())
+
+        self.assertEqual([status for status, _ in observed], ['done'])
+        self.assertEqual(OCRJob.objects.get(id=self.job.id).extracted_text, 'hello world')
+        self.assertEqual(upload_buffers.stats()['jobs'], 0)
+
+    def test_dispatcher_sends_the_buffered_bytes(self):
+        dispatcher = ProcessPoolDispatcher()
+        executor = mock.Mock()
+        dispatcher.executors = {'interactive': executor}
+        upload_buffers.put(self.job_id, b'image')
+
+        executor.submit.side_effect = ExecutorQueueFull(1)
+        with self.assertRaises(ExecutorQueueFull):
+            dispatcher.submit_job(self.job_id)
+        self.assertEqual(upload_buffers.stats()['jobs'], 1)
+
+        executor.submit.side_effect = None
+        dispatcher.submit_job(self.job_id)
+        executor.submit.assert_called_with(run_in_worker, run_ocr_job, self.job_id, b'image')
+        self.assertIsNone(upload_buffers.pop(self.job_id))
+
+
+class ThumbnailTests(TestCase):
+    """Staff-only upload previews, evicted least recently used first"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(
+            OCR_THUMBNAILS_ENABLED=True,
+            OCR_THUMBNAIL_DIR=Path(directory),
+            OCR_THUMBNAIL_SIZES={'thumb': 32}
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.cache = ThumbnailCache()
+        self.noise = np.random.default_rng(0)
+
+    def add(self, content_hash, age):
+        self.cache.generate(content_hash, self.noise.integers(0, 255, (64, 64), dtype=np.uint8))
+        path = self.cache.path(content_hash, 'thumb')
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_thumbnails_are_not_served_from_media_root(self):
+        from ocr_backend import settings as project_settings
+        self.assertFalse(
+            Path(project_settings.OCR_THUMBNAIL_DIR).is_relative_to(project_settings.MEDIA_ROOT)
+        )
+
+    def test_least_recently_used_are_evicted_first(self):
+        old = self.add('a' * 64, age=3 * TOUCH_INTERVAL)
+        older = self.add('b' * 64, age=2 * TOUCH_INTERVAL)
+        recent = self.add('c' * 64, age=0)
+        # A hit makes the oldest file the most recently used
+        self.assertEqual(self.cache.get('a' * 64, 'thumb'), old)
+
+        self.cache.evict(target=os.path.getsize(old) + os.path.getsize(recent))
+        self.assertTrue(os.path.exists(old))
+        self.assertFalse(os.path.exists(older))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_budget_evicts_on_write(self):
+        first = self.add('a' * 64, age=60)
+        with override_settings(
+            OCR_THUMBNAIL_MAX_BYTES=os.path.getsize(first) * 1.5, OCR_THUMBNAIL_EVICT_TO=0.9
+        ):
+            second = self.add('b' * 64, age=0)
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+    def test_view_is_staff_only(self):
+        self.add('a' * 64, age=0)
+        url = reverse('ocr:thumbnail', args=['a' * 64, 'thumb'])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+        response.close()
+        # No stored upload to render a miss from
+        self.assertEqual(
+            self.client.get(reverse('ocr:thumbnail', args=['b' * 64, 'thumb'])).status_code,
+            404
+        )
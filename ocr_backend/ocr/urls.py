@@ -1,16 +1,38 @@
 from django.urls import path
 from .views import (
     UploadImageView,
+    BatchUploadView,
+    BatchStatusView,
     GetStatusView,
     GetResultView,
+    GetPagesView,
     JobDetailView,
+    JobListView,
+    JobStatusBulkView,
+    QueueStatsView,
+    SearchView,
+    job_events,
+    job_thumbnail,
 )
 
 app_name = 'ocr'
 
 urlpatterns = [
     path('ocr/upload/', UploadImageView.as_view(), name='upload'),
+    path('ocr/batch/', BatchUploadView.as_view(), name='batch-upload'),
+    path('ocr/batch/<uuid:batch_id>/', BatchStatusView.as_view(), name='batch-status'),
     path('ocr/status/<uuid:job_id>/', GetStatusView.as_view(), name='status'),
+    path('ocr/events/<uuid:job_id>/', job_events, name='events'),
     path('ocr/result/<uuid:job_id>/', GetResultView.as_view(), name='result'),
+    path('ocr/result/<uuid:job_id>/pages/', GetPagesView.as_view(), name='result-pages'),
     path('ocr/job/<uuid:job_id>/', JobDetailView.as_view(), name='job-detail'),
+    path('ocr/jobs/', JobListView.as_view(), name='job-list'),
+    path('ocr/jobs/status', JobStatusBulkView.as_view(), name='job-status-bulk'),
+    path('ocr/queues/', QueueStatsView.as_view(), name='queue-stats'),
+    path('ocr/search/', SearchView.as_view(), name='search'),
+    path(
+        'ocr/thumbnails/<str:content_hash>/<str:size>.jpg',
+        job_thumbnail,
+        name='thumbnail'
+    ),
 ]
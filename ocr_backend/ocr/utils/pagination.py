@@ -0,0 +1,114 @@
+# ocr/utils/pagination.py
+
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(created_at, job_id, *prefix):
+    """
+    Opaque keyset position of a row: optional leading values (e.g. the
+    status), then created_at in epoch microseconds and the ID
+    """
+    micros = (created_at - EPOCH) // timedelta(microseconds=1)
+    return '.'.join([*map(str, prefix), str(micros), uuid.UUID(str(job_id)).hex])
+
+
+def decode_cursor(cursor, prefix_length=0):
+    """
+    Inverse of encode_cursor: (*prefix, created_at, job_id)
+
+    Raises ValueError for malformed cursors.
+    """
+    parts = str(cursor).split('.')
+    if len(parts) != prefix_length + 2:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    *prefix, micros, job_id = parts
+    created_at = EPOCH + timedelta(microseconds=int(micros))
+    return (*prefix, created_at, uuid.UUID(job_id))
+
+
+def older_than(created_at, job_id):
+    """Rows after a position in (-created_at, -id) order"""
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=job_id)
+
+
+def newer_than(created_at, job_id):
+    """Rows before a position in (-created_at, -id) order"""
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=job_id)
+
+
+def after_in_status_order(status, created_at, job_id):
+    """Rows after a position in (status, -created_at, -id) order"""
+    return (
+        Q(status__gt=status)
+        | Q(status=status, created_at__lt=created_at)
+        | Q(status=status, created_at=created_at, id__lt=job_id)
+    )
+
+
+def table_row_estimate(model, using='default'):
+    """
+    Row count from the database's table statistics, or None where there
+    are none (SQLite) or they were never gathered
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [table]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count never scans a large table
+
+    Unfiltered lists use the table statistics. Small tables (under
+    OCR_ADMIN_EXACT_COUNT_LIMIT rows) and filtered lists are counted
+    exactly, but filtered counts stop at that limit. ``estimated`` is set
+    when ``count`` comes from the statistics, ``capped`` when it is the
+    limit and there are more rows.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimated = False
+        self.capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.OCR_ADMIN_EXACT_COUNT_LIMIT
+
+        if not queryset.query.where:
+            estimate = table_row_estimate(queryset.model, queryset.db)
+            if estimate is not None and estimate >= limit:
+                self.estimated = True
+                return estimate
+
+        count = queryset.order_by()[:limit + 1].count()
+        if count > limit:
+            self.capped = True
+            return limit
+        return count
@@ -0,0 +1,56 @@
+# ocr/utils/renderers.py
+
+import json
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class StreamingTextRenderer(BaseRenderer):
+    """
+    Base for result download formats streamed by the view itself
+
+    Successful downloads bypass rendering (the view returns a
+    StreamingHttpResponse); only error and "not ready" payloads reach
+    ``render``, and are written as JSON text.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PlainTextRenderer(StreamingTextRenderer):
+    """?format=txt"""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class NDJSONRenderer(StreamingTextRenderer):
+    """?format=ndjson"""
+
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class DetailJSONRenderer(JSONRenderer):
+    """?format=detail, line boxes and confidences of detail-mode jobs"""
+
+    format = 'detail'
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Prometheus text exposition format, for /metrics"""
+
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data).encode(self.charset)
@@ -1,28 +1,79 @@
 # ocr/views.py
 
+import json
 import logging
-from rest_framework import status
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from rest_framework import serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.core.exceptions import ObjectDoesNotExist
+from django.http import (
+    FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import never_cache
+from django.utils.cache import add_never_cache_headers, get_conditional_response
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import require_GET
 
-from .models import OCRJob
+from .models import OCRBatch, OCRJob, OCRResult
 from .serializers import (
+    OCRBatchUploadSerializer,
+    OCRBatchStatusSerializer,
     OCRJobUploadSerializer,
-    OCRJobStatusSerializer,
     OCRJobResultSerializer,
-    OCRJobDetailSerializer
+    OCRJobDetailResultSerializer,
+    OCRJobDetailSerializer,
+    OCRJobListSerializer,
+    OCRJobSearchResultSerializer,
+    OCRPageSerializer
+)
+from .dispatch import check_capacity
+from .scheduler import queue_stats, resolve_client_id, scheduler
+from .services.executor import ExecutorQueueFull
+from .services.export import iter_ndjson, iter_txt, result_etag
+from .services.metrics import metrics
+from .services.notifier import is_terminal, subscribe, subscribe_async
+from .services.search import search_jobs, search_snippets
+from .services.thumbnails import thumbnail_cache
+from .services.reader_pool import reader_pool
+from .utils.pagination import after_in_status_order, decode_cursor, encode_cursor
+from .utils.renderers import (
+    DetailJSONRenderer, NDJSONRenderer, PlainTextRenderer, PrometheusRenderer
 )
-# from .tasks import process_ocr  # ✅ CORRECT IMPORT
-
-from .tasks import process_ocr
 
 logger = logging.getLogger('ocr')
 
 
+def visible_jobs(request, jobs=None):
+    """
+    Jobs the caller may look up in bulk: every job for staff, otherwise
+    only those submitted under the caller's client ID
+    """
+    jobs = OCRJob.objects.all() if jobs is None else jobs
+    if request.user.is_staff:
+        return jobs
+    return jobs.filter(client_id=resolve_client_id(request))
+
+
+def queue_full_response(exc):
+    """429 response telling the client when to retry"""
+    return Response(
+        {'error': 'OCR queue is full', 'retryAfter': exc.retry_after},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(exc.retry_after)}
+    )
+
+
 @method_decorator(never_cache, name='dispatch')
 class UploadImageView(APIView):
     """
@@ -32,6 +83,12 @@ class UploadImageView(APIView):
 
     def post(self, request):
         try:
+            # Refuse before storing the upload if the executor is saturated
+            priority = request.data.get('priority')
+            check_capacity(
+                priority if priority in dict(OCRJob.PRIORITY_CHOICES) else 'interactive'
+            )
+
             serializer = OCRJobUploadSerializer(data=request.data)
 
             if not serializer.is_valid():
@@ -41,11 +98,14 @@ class UploadImageView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            job = serializer.save()
+            job = serializer.save(client_id=resolve_client_id(request))
             logger.info(f"OCR job created: {job.id}")
 
-            # ✅ Celery async call
-            process_ocr.delay(str(job.id))
+            # Duplicates reuse an existing result, no OCR pass needed
+            if not job.is_duplicate:
+                # Hand off to the configured executor (OCR_EXECUTION_MODE),
+                # subject to the client's fair share
+                scheduler.schedule(job)
 
             return Response(
                 {
@@ -55,6 +115,10 @@ class UploadImageView(APIView):
                 status=status.HTTP_200_OK
             )
 
+        except ExecutorQueueFull as e:
+            logger.warning(f"Upload refused: {e}")
+            return queue_full_response(e)
+
         except Exception as e:
             logger.exception("Upload failed")
             return Response(
@@ -63,17 +127,105 @@ class UploadImageView(APIView):
             )
 
 
+@method_decorator(never_cache, name='dispatch')
+class BatchUploadView(APIView):
+    """
+    POST /api/ocr/batch/
+    """
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        try:
+            check_capacity('bulk')
+
+            serializer = OCRBatchUploadSerializer(
+                data={'images': request.FILES.getlist('images')}
+            )
+
+            if not serializer.is_valid():
+                error_msg = serializer.errors.get('images', serializer.errors)
+                return Response(
+                    {'error': error_msg},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            client_id = resolve_client_id(request)
+            batch = serializer.save(client_id=client_id)
+            logger.info(f"OCR batch created: {batch.id}")
+
+            # Subject to the client's fair share, like single uploads
+            scheduler.schedule_batch(batch, client_id)
+
+            data = OCRBatchStatusSerializer(batch).data
+            data['jobIds'] = [
+                str(job_id) for job_id in batch.jobs.values_list('id', flat=True)
+            ]
+            data['message'] = 'Images uploaded successfully'
+            return Response(data, status=status.HTTP_200_OK)
+
+        except ExecutorQueueFull as e:
+            logger.warning(f"Batch upload refused: {e}")
+            return queue_full_response(e)
+
+        except Exception as e:
+            logger.exception("Batch upload failed")
+            return Response(
+                {'error': 'Batch upload failed', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+@method_decorator(never_cache, name='dispatch')
+class BatchStatusView(APIView):
+    """
+    GET /api/ocr/batch/<batch_id>/
+    """
+
+    def get(self, request, batch_id):
+        try:
+            batch = OCRBatch.objects.get(id=batch_id)
+            serializer = OCRBatchStatusSerializer(batch)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        except (ObjectDoesNotExist, ValueError):
+            return Response(
+                {'error': 'Batch not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        except Exception as e:
+            logger.exception("Batch status fetch failed")
+            return Response(
+                {'error': 'Failed to get batch status', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 @method_decorator(never_cache, name='dispatch')
 class GetStatusView(APIView):
     """
-    GET /api/ocr/status/<job_id>/
+    GET /api/ocr/status/<job_id>/[?wait=<seconds>]
+
+    With ``wait`` the request blocks until the job reaches a terminal
+    status or the wait (capped at OCR_STATUS_MAX_WAIT) runs out, then
+    returns the latest status.
     """
 
     def get(self, request, job_id):
         try:
-            job = OCRJob.objects.get(id=job_id)
-            serializer = OCRJobStatusSerializer(job)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            wait = self.parse_wait(request)
+        except ValueError:
+            return Response(
+                {'error': 'wait must be a non-negative number of seconds'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            if wait:
+                data = self.wait_for_status(job_id, wait)
+            else:
+                data = OCRJob.get_status_payload(job_id)
+            return Response(data, status=status.HTTP_200_OK)
 
         except (ObjectDoesNotExist, ValueError):
             return Response(
@@ -88,18 +240,180 @@ class GetStatusView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def parse_wait(request):
+        wait = float(request.query_params.get('wait') or 0)
+        if not wait >= 0:
+            raise ValueError(wait)
+        return min(wait, settings.OCR_STATUS_MAX_WAIT)
 
-@method_decorator(never_cache, name='dispatch')
+    @staticmethod
+    def wait_for_status(job_id, wait):
+        """
+        Long-poll until the job is done or rejected, or wait runs out
+
+        A notification can be lost (a publisher failure, or a worker
+        without a shared notifier), so once wait runs out the status is
+        read again rather than answering with the one seen first.
+        """
+        deadline = time.monotonic() + wait
+
+        # Subscribe before reading so a change in between is not missed
+        with subscribe(job_id) as subscription:
+            data = OCRJob.get_status_payload(job_id)
+            while not is_terminal(data):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return OCRJob.get_status_payload(job_id)
+                payload = subscription.get(remaining)
+                if payload is not None:
+                    data = payload
+        return data
+
+
+def format_event(event, data):
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def job_events(request, job_id):
+    """
+    GET /api/ocr/events/<job_id>/
+
+    Server-sent events stream of a job's status changes, ending after the
+    job is done or rejected. The subscription is asyncio-native (an
+    asyncio.Queue fed by the local notifier, or redis.asyncio pub/sub),
+    so under an ASGI server (see ocr_backend.asgi) an open stream holds
+    no thread while it waits.
+    """
+    get_status = sync_to_async(OCRJob.get_status_payload)
+    # Subscribe before reading so a change in between is not missed
+    subscription = await subscribe_async(job_id)
+    try:
+        data = await get_status(job_id)
+    except ObjectDoesNotExist:
+        await subscription.close()
+        return JsonResponse({'error': 'Job not found'}, status=404)
+
+    async def stream():
+        try:
+            yield format_event('status', data)
+            if is_terminal(data):
+                return
+
+            deadline = time.monotonic() + settings.OCR_SSE_MAX_DURATION
+            while time.monotonic() < deadline:
+                payload = await subscription.get(settings.OCR_SSE_HEARTBEAT)
+                if payload is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event('status', payload)
+                if is_terminal(payload):
+                    return
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+@require_GET
+def job_thumbnail(request, content_hash, size):
+    """
+    GET /api/ocr/thumbnails/<content_hash>/<size>.jpg
+
+    A downscaled preview of an upload, for the admin and so staff only.
+    The URL is content-addressed, so responses are cacheable by the
+    browser (never a shared cache) for OCR_THUMBNAIL_MAX_AGE and never
+    need revalidating. A miss queues rendering and answers 503 with
+    Retry-After rather than decoding the upload in the request.
+    """
+    if not thumbnail_cache.is_valid(content_hash, size):
+        raise Http404("Thumbnail not found")
+    try:
+        path = thumbnail_cache.get(content_hash, size)
+        # The file may be evicted between the lookup and the open
+        thumbnail = open(path, 'rb') if path else None
+    except FileNotFoundError:
+        thumbnail = None
+
+    if thumbnail is None:
+        try:
+            queued = thumbnail_cache.render_later(content_hash)
+        except Exception as e:
+            logger.error(f"Thumbnail for {content_hash} failed: {str(e)}")
+            queued = False
+        if not queued:
+            raise Http404("Thumbnail not found")
+        response = HttpResponse(
+            "Thumbnail is being rendered", status=503, content_type='text/plain'
+        )
+        response['Retry-After'] = str(settings.OCR_THUMBNAIL_RETRY_AFTER)
+        add_never_cache_headers(response)
+        return response
+
+    response = FileResponse(thumbnail, content_type='image/jpeg')
+    response['Cache-Control'] = (
+        f'private, max-age={settings.OCR_THUMBNAIL_MAX_AGE}, immutable'
+    )
+    return response
+
+
+# Clients must revalidate, which the ETag makes cheap
+@method_decorator(cache_control(private=True, no_cache=True), name='dispatch')
 class GetResultView(APIView):
     """
-    GET /api/ocr/result/<job_id>/
+    GET /api/ocr/result/<job_id>/[?format=json|txt|ndjson|detail]
+
+    ``txt`` and ``ndjson`` stream the text from storage in chunks;
+    ``detail`` lists lines with boxes and confidences for jobs uploaded
+    with detail=true. Finished results carry an ETag; a matching
+    If-None-Match gets 304 without the text being loaded.
     """
+    renderer_classes = [JSONRenderer, PlainTextRenderer, NDJSONRenderer, DetailJSONRenderer]
 
     def get(self, request, job_id):
         try:
-            job = OCRJob.objects.get(id=job_id)
-            serializer = OCRJobResultSerializer(job)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            job = OCRJob.objects.only(
+                *OCRJob.STATUS_FIELDS, 'completed_at', 'detail', 'duplicate_of'
+            ).get(id=job_id)
+            if job.status != 'done':
+                return Response({'message': 'OCR not completed yet'}, status=status.HTTP_200_OK)
+
+            fmt = request.accepted_renderer.format
+            etag = result_etag(job, fmt)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+
+            if fmt == PlainTextRenderer.format:
+                response = StreamingHttpResponse(
+                    iter_txt(OCRResult.objects.get(job_id=job.result_job_id)),
+                    content_type='text/plain; charset=utf-8'
+                )
+            elif fmt == NDJSONRenderer.format:
+                response = StreamingHttpResponse(
+                    iter_ndjson(job),
+                    content_type='application/x-ndjson; charset=utf-8'
+                )
+            elif fmt == DetailJSONRenderer.format:
+                result = OCRResult.objects.defer('text_data').get(job_id=job.result_job_id)
+                if not job.detail or not result.has_detail:
+                    return Response(
+                        {'error': 'Job was not processed in detail mode'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
+                serializer = OCRJobDetailResultSerializer(job, context={'result': result})
+                response = Response(serializer.data, status=status.HTTP_200_OK)
+            else:
+                serializer = OCRJobResultSerializer(job)
+                response = Response(serializer.data, status=status.HTTP_200_OK)
+
+            response['ETag'] = etag
+            return response
 
         except (ObjectDoesNotExist, ValueError):
             return Response(
@@ -115,6 +429,55 @@ class GetResultView(APIView):
             )
 
 
+@method_decorator(never_cache, name='dispatch')
+class GetPagesView(APIView):
+    """
+    GET /api/ocr/result/<job_id>/pages/?after=<page_number>
+    
+    Returns pages finished so far, so long documents can be read while
+    the remaining pages are still being processed.
+    """
+
+    def get(self, request, job_id):
+        try:
+            job = OCRJob.objects.only(
+                'id', 'status', 'pages_done', 'pages_total'
+            ).get(id=job_id)
+
+            try:
+                after = int(request.query_params.get('after', 0))
+            except ValueError:
+                return Response(
+                    {'error': "'after' must be a page number"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            pages = job.pages.filter(page_number__gt=after).order_by('page_number')
+            return Response(
+                {
+                    'jobId': str(job.id),
+                    'status': job.status,
+                    'pages_done': job.pages_done,
+                    'pages_total': job.pages_total,
+                    'pages': OCRPageSerializer(pages, many=True).data
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except (ObjectDoesNotExist, ValueError):
+            return Response(
+                {'error': 'Job not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        except Exception as e:
+            logger.exception("Pages fetch failed")
+            return Response(
+                {'error': 'Failed to get pages', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class JobDetailView(APIView):
     """
     GET /api/ocr/job/<job_id>/
@@ -122,7 +485,7 @@ class JobDetailView(APIView):
 
     def get(self, request, job_id):
         try:
-            job = OCRJob.objects.get(id=job_id)
+            job = OCRJob.objects.select_related('result', 'duplicate_of__result').get(id=job_id)
             serializer = OCRJobDetailSerializer(job, context={'request': request})
             return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -140,6 +503,292 @@ class JobDetailView(APIView):
             )
 
 
+@method_decorator(never_cache, name='dispatch')
+class JobListView(APIView):
+    """
+    GET /api/ocr/jobs/?status=&created_after=&created_before=&fields=&limit=&cursor=
+    
+    Jobs in (status, -created_at) order, paged by an opaque keyset
+    cursor so every page is one range scan of the (status, -created_at)
+    index. ``status`` takes one or more comma-separated statuses, the
+    time bounds ISO 8601 datetimes, ``fields`` a comma-separated subset
+    of the job fields (the extracted text only when named).
+
+    Staff see every job, other callers only their own (see
+    visible_jobs). The client ID is only a header, so the extracted text
+    is for staff alone.
+    """
+
+    def get(self, request):
+        try:
+            params = self.parse_params(request.query_params)
+        except (serializers.ValidationError, ValueError) as e:
+            detail = e.detail if isinstance(e, serializers.ValidationError) else str(e)
+            return Response({'error': detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = params['fields']
+        if 'extracted_text' in fields and not request.user.is_staff:
+            return Response(
+                {'error': "'extracted_text' is only available to staff"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            jobs = visible_jobs(request).order_by('status', '-created_at', '-id')
+            if params['statuses']:
+                jobs = jobs.filter(status__in=params['statuses'])
+            if params['created_after']:
+                jobs = jobs.filter(created_at__gte=params['created_after'])
+            if params['created_before']:
+                jobs = jobs.filter(created_at__lt=params['created_before'])
+            if params['cursor']:
+                jobs = jobs.filter(after_in_status_order(*params['cursor']))
+
+            # Load only the columns asked for, plus the cursor's
+            columns = {'id', 'status', 'created_at'}
+            columns.update(name for name in fields if name != 'extracted_text')
+            if 'extracted_text' in fields:
+                # Duplicates read their source's result
+                jobs = jobs.select_related('result', 'duplicate_of__result')
+                columns.update({
+                    'duplicate_of', 'result__job', 'result__codec', 'result__text_data',
+                    'duplicate_of__result__job', 'duplicate_of__result__codec',
+                    'duplicate_of__result__text_data',
+                })
+            jobs = list(jobs.only(*columns)[:params['limit'] + 1])
+
+            next_cursor = next_url = None
+            if len(jobs) > params['limit']:
+                jobs = jobs[:params['limit']]
+                last = jobs[-1]
+                next_cursor = encode_cursor(last.created_at, last.id, last.status)
+                next_url = replace_query_param(
+                    request.build_absolute_uri(), 'cursor', next_cursor
+                )
+
+            return Response(
+                {
+                    'next': next_url,
+                    'cursor': next_cursor,
+                    'results': OCRJobListSerializer(jobs, many=True, fields=fields).data
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            logger.exception("Job listing failed")
+            return Response(
+                {'error': 'Failed to list jobs', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @staticmethod
+    def parse_datetime_param(query_params, name):
+        value = query_params.get(name)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"'{name}' must be an ISO 8601 datetime")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    @classmethod
+    def parse_params(cls, query_params):
+        statuses = [
+            value.strip()
+            for value in query_params.get('status', '').split(',')
+            if value.strip()
+        ]
+        valid = dict(OCRJob.STATUS_CHOICES)
+        unknown = [value for value in statuses if value not in valid]
+        if unknown:
+            raise ValueError(
+                f"Unknown status(es): {', '.join(unknown)}. "
+                f"Choose from: {', '.join(valid)}"
+            )
+
+        try:
+            limit = int(query_params.get('limit', settings.OCR_JOBS_PAGE_SIZE))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.OCR_JOBS_MAX_PAGE_SIZE:
+            raise ValueError(
+                f"'limit' must be between 1 and {settings.OCR_JOBS_MAX_PAGE_SIZE}"
+            )
+
+        cursor = query_params.get('cursor')
+        return {
+            'statuses': statuses,
+            'created_after': cls.parse_datetime_param(query_params, 'created_after'),
+            'created_before': cls.parse_datetime_param(query_params, 'created_before'),
+            'fields': OCRJobListSerializer.parse_fields(query_params.get('fields')),
+            'limit': limit,
+            'cursor': decode_cursor(cursor, prefix_length=1) if cursor else None,
+        }
+
+
+@method_decorator(never_cache, name='dispatch')
+class JobStatusBulkView(APIView):
+    """
+    POST /api/ocr/jobs/status  {"ids": [<job_id>, ...]}
+    
+    Statuses of up to OCR_JOBS_STATUS_MAX_IDS jobs: cached ones from the
+    status cache, the rest with a single id__in query. Unknown IDs, and
+    those of other clients' jobs for non-staff callers, are listed under
+    ``missing``.
+    """
+
+    def post(self, request):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {'error': "'ids' must be a non-empty list of job IDs"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > settings.OCR_JOBS_STATUS_MAX_IDS:
+            return Response(
+                {'error': f"At most {settings.OCR_JOBS_STATUS_MAX_IDS} IDs per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job_ids, invalid = [], []
+        for value in ids:
+            try:
+                job_ids.append(uuid.UUID(str(value)))
+            except ValueError:
+                invalid.append(value)
+        if invalid:
+            return Response(
+                {'error': 'Invalid job IDs', 'ids': invalid[:20]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            job_ids = list(dict.fromkeys(job_ids))
+            visible = job_ids
+            if not request.user.is_staff:
+                own = set(
+                    visible_jobs(request).filter(id__in=job_ids).values_list('id', flat=True)
+                )
+                visible = [job_id for job_id in job_ids if job_id in own]
+            payloads = OCRJob.get_status_payloads(visible)
+            return Response(
+                {
+                    'statuses': {
+                        str(job_id): payloads[job_id]
+                        for job_id in job_ids if job_id in payloads
+                    },
+                    'missing': [
+                        str(job_id) for job_id in job_ids if job_id not in payloads
+                    ],
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            logger.exception("Bulk status fetch failed")
+            return Response(
+                {'error': 'Failed to get statuses', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+@method_decorator(never_cache, name='dispatch')
+class SearchView(APIView):
+    """
+    GET /api/ocr/search/?q=<terms>&page=<n>&page_size=<n>
+    
+    Finished jobs whose text contains any of the terms, best match first,
+    through the configured full-text index (see ocr.services.search).
+    Staff only: hits and snippets span every client's text.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': "'q' is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(
+                request.query_params.get('page_size', settings.OCR_SEARCH_PAGE_SIZE)
+            )
+        except ValueError:
+            return Response(
+                {'error': "'page' and 'page_size' must be integers"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if page < 1 or not 1 <= page_size <= settings.OCR_SEARCH_MAX_PAGE_SIZE:
+            return Response(
+                {
+                    'error': f"'page' must be at least 1 and 'page_size' between 1 "
+                             f"and {settings.OCR_SEARCH_MAX_PAGE_SIZE}"
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            total, hits = search_jobs(query, limit=page_size, offset=(page - 1) * page_size)
+            scores = dict(hits)
+            jobs = OCRJob.objects.only('id', 'file_name', 'created_at').in_bulk(list(scores))
+            snippets = search_snippets(list(scores), query)
+            url = request.build_absolute_uri()
+            return Response(
+                {
+                    'query': query,
+                    'count': total,
+                    'next': (
+                        replace_query_param(url, 'page', page + 1)
+                        if page * page_size < total else None
+                    ),
+                    'previous': (
+                        None if page == 1
+                        else remove_query_param(url, 'page') if page == 2
+                        else replace_query_param(url, 'page', page - 1)
+                    ),
+                    'results': OCRJobSearchResultSerializer(
+                        [jobs[job_id] for job_id, _ in hits if job_id in jobs],
+                        many=True,
+                        context={'scores': scores, 'snippets': snippets}
+                    ).data
+                },
+                status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            logger.exception("Search failed")
+            return Response(
+                {'error': 'Search failed', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+@method_decorator(never_cache, name='dispatch')
+class QueueStatsView(APIView):
+    """
+    GET /api/ocr/queues/
+    
+    Queue depth and wait time per priority class.
+    """
+
+    def get(self, request):
+        try:
+            return Response(queue_stats(), status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.exception("Queue stats fetch failed")
+            return Response(
+                {'error': 'Failed to get queue stats', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class HealthCheckView(APIView):
     """
     GET /health
@@ -147,6 +796,28 @@ class HealthCheckView(APIView):
 
     def get(self, request):
         return Response(
-            {'status': 'OK', 'message': 'OCR Backend running'},
+            {
+                'status': 'OK',
+                'message': 'OCR Backend running',
+                'ocr_readers': reader_pool.stats()
+            },
             status=status.HTTP_200_OK
         )
+
+
+class MetricsView(APIView):
+    """
+    GET /metrics
+    
+    Job counters and per-stage latency histograms in the Prometheus text
+    format; 404 when OCR_METRICS_ENABLED is off.
+    """
+    renderer_classes = [PrometheusRenderer]
+    
+    def get(self, request):
+        if not metrics.enabled:
+            return Response(
+                {'error': 'Metrics are disabled'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(metrics.render(), status=status.HTTP_200_OK)
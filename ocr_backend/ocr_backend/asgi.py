@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Serve through ASGI (e.g. ``uvicorn ocr_backend.asgi:application``) when
+clients use the job status event stream, /api/ocr/events/<job_id>/.
 """
 
 import os
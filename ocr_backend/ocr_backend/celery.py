@@ -3,6 +3,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ocr_backend.settings')
@@ -24,9 +25,28 @@ app.conf.beat_schedule = {
         'task': 'ocr.cleanup_old_jobs',
         'schedule': crontab(hour=2, minute=0),  # Run daily at 2 AM
     },
+    'release-held-ocr-jobs': {
+        'task': 'ocr.release_held_jobs',
+        'schedule': 60.0,  # Every minute
+    },
+    'recover-stale-ocr-jobs': {
+        'task': 'ocr.recover_stale_jobs',
+        'schedule': 300.0,  # Every 5 minutes
+    },
 }
 
 
+@worker_process_init.connect
+def warm_up_ocr_reader(**kwargs):
+    """Load EasyOCR weights once per worker process, before the first task"""
+    from django.conf import settings
+    if not settings.OCR_WARMUP_ON_WORKER_START:
+        return
+
+    from ocr.services.reader_pool import reader_pool
+    reader_pool.warm_up(settings.OCR_WARMUP_LANGUAGES)
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     """Debug task to test Celery setup"""
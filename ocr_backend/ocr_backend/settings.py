@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 
 
 from dotenv import load_dotenv
@@ -28,18 +29,6 @@ SECRET_KEY = 'django-insecure-your-secret-key-change-in-production-12345'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
-
-# ocr_backend/settings.py ke end mein add karein
-
-import pytesseract
-# Tesseract ka naya path D drive wala
-pytesseract.pytesseract.tesseract_cmd = r'C:\Tesseract-OCR\tesseract.exe'
-
-# Redis connection error (10061) fix karne ke liye
-CELERY_TASK_ALWAYS_EAGER = True
-CELERY_BROKER_URL = 'memory://'
-
-
 ALLOWED_HOSTS = ['*']
 
 # Application definition
@@ -195,22 +184,275 @@ CORS_ALLOWED_ORIGINS = [
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Cache (job status cache); local memory unless a shared Redis cache is
+# configured, which multi-process deployments want. 'metrics' holds the
+# /metrics and dedup counters on their own, never expired and never culled
+# by per-job entries (with Redis, use a noeviction maxmemory policy).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ocr-backend',
+    },
+    'metrics': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ocr-metrics',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL'),
+    }
+    CACHES['metrics'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        'TIMEOUT': None,
+    }
+
 # Celery Configuration
-CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'django-db'
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'django-db')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+CELERY_TASK_DEFAULT_QUEUE = 'ocr_interactive'
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'queue_order_strategy': 'priority',
+}
+
+# How OCR work is executed (see ocr.dispatch):
+#   'eager'   - inside the upload request (development only)
+#   'thread'  - thread pool in the web process (development only: every
+#               web worker then loads the model weights)
+#   'process' - pool of spawned worker processes, no broker needed; web
+#               processes stay free of model weights
+#   'celery'  - Celery workers through CELERY_BROKER_URL
+OCR_EXECUTION_MODE = os.getenv('OCR_EXECUTION_MODE', 'process')
+OCR_EXECUTOR_WORKERS = int(os.getenv('OCR_EXECUTOR_WORKERS', 2))
+OCR_BULK_EXECUTOR_WORKERS = int(os.getenv('OCR_BULK_EXECUTOR_WORKERS', 1))
+OCR_EXECUTOR_WORKERS_BY_PRIORITY = {
+    'interactive': OCR_EXECUTOR_WORKERS,
+    'bulk': OCR_BULK_EXECUTOR_WORKERS,
+}
+OCR_EXECUTOR_MAX_QUEUE = int(os.getenv('OCR_EXECUTOR_MAX_QUEUE', 16))  # 'process' mode backlog before 429
+OCR_EXECUTOR_RETRY_AFTER = 5  # seconds, sent as Retry-After with 429
+
+# Recovery of jobs lost with a restarted web process or worker (see
+# ocr.services.recovery); runs in every web process and as a beat task
+OCR_RECOVERY_INTERVAL = 300  # seconds between passes, 0 disables the in-process loop
+OCR_RECOVERY_PENDING_AFTER = 30 * 60  # seconds dispatched without starting
+# Seconds processing before a job is rejected, in celery mode only: the
+# local pools have no time limit, so there only jobs left over from
+# before a single web process restarted are rejected
+OCR_RECOVERY_PROCESSING_AFTER = CELERY_TASK_TIME_LIMIT + 5 * 60
+OCR_RECOVERY_MAX_AGE = 6 * 60 * 60  # older stale jobs are rejected, not re-dispatched
+
+# Priority classes and fair-share scheduling (see ocr.scheduler)
+# Run workers per class, e.g. `celery -A ocr_backend worker -Q ocr_interactive`
+OCR_CELERY_QUEUES = {
+    'interactive': 'ocr_interactive',
+    'bulk': 'ocr_bulk',
+}
+OCR_CELERY_PRIORITIES = {
+    'interactive': 9,
+    'bulk': 0,
+}
+OCR_CLIENT_ID_HEADER = 'X-Client-ID'
+OCR_FAIR_SHARE_ENABLED = True
+# Dispatched jobs per client and priority class, the rest wait their
+# turn. Uploads that name no priority are interactive, so that class is
+# bounded too; None means unlimited. Batches count against 'bulk'.
+OCR_FAIR_SHARE_LIMITS = {
+    'interactive': int(os.getenv('OCR_FAIR_SHARE_INTERACTIVE', 4)),
+    'bulk': int(os.getenv('OCR_FAIR_SHARE_BULK', 8)),
+}
+OCR_QUEUE_STATS_WINDOW = 15 * 60  # seconds
+OCR_QUEUE_STATS_SAMPLE = 1000
+
+# Job status notifications for long-poll and SSE (see ocr.services.notifier)
+#   'local' - in-process pub/sub, enough for the eager/thread/process modes
+#             with a single web process
+#   'redis' - Redis pub/sub, needed when Celery workers run OCR elsewhere
+#             or more than one web process serves requests
+OCR_WEB_PROCESSES = int(os.getenv('WEB_CONCURRENCY', '1'))  # as read by gunicorn
+OCR_NOTIFY_BACKEND = os.getenv(
+    'OCR_NOTIFY_BACKEND',
+    'redis' if OCR_EXECUTION_MODE == 'celery' or OCR_WEB_PROCESSES > 1 else 'local'
+)
+if OCR_NOTIFY_BACKEND == 'local' and OCR_WEB_PROCESSES > 1:
+    # A waiter in one process would never hear of a job finished in another
+    raise ImproperlyConfigured(
+        "OCR_NOTIFY_BACKEND 'local' only works with one web process; "
+        "use 'redis' when WEB_CONCURRENCY is above 1"
+    )
+OCR_NOTIFY_REDIS_URL = os.getenv('OCR_NOTIFY_REDIS_URL', CELERY_BROKER_URL)
+OCR_STATUS_MAX_WAIT = 30  # seconds a ?wait= status request may block
+OCR_SSE_HEARTBEAT = 15  # seconds between keep-alive comments
+OCR_SSE_MAX_DURATION = 10 * 60  # seconds before an event stream is closed
+
+# Job status read cache (see ocr.services.status_cache)
+OCR_STATUS_CACHE = 'default'
+OCR_STATUS_CACHE_TTL_TERMINAL = 24 * 60 * 60  # seconds, done/rejected never change
+OCR_STATUS_CACHE_TTL_ACTIVE = 10  # seconds, pending/processing
+
+# Per-job stage timings (OCRJob.timings) and the /metrics histograms (see
+# ocr.services.metrics). Celery workers write the histograms to
+# OCR_METRICS_CACHE themselves, and every web process serves /metrics from
+# it, so Celery or several web processes need a shared (Redis) cache.
+# Process-pool workers hand their observations back to the web process.
+OCR_METRICS_ENABLED = os.getenv('OCR_METRICS_ENABLED', 'True') == 'True'
+OCR_METRICS_CACHE = 'metrics'
+if (
+    OCR_METRICS_ENABLED
+    and (OCR_EXECUTION_MODE == 'celery' or OCR_WEB_PROCESSES > 1)
+    and CACHES[OCR_METRICS_CACHE]['BACKEND'].endswith('LocMemCache')
+):
+    raise ImproperlyConfigured(
+        "OCR_METRICS_CACHE is per process; OCR_EXECUTION_MODE 'celery' or "
+        "WEB_CONCURRENCY above 1 need REDIS_CACHE_URL or OCR_METRICS_ENABLED=False"
+    )
+OCR_METRICS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)  # seconds
+
+# OCR results live in the ocr_results side table, compressed with
+# 'zlib', 'zstd' (needs the zstandard package) or 'none'
+OCR_RESULT_COMPRESSION = os.getenv('OCR_RESULT_COMPRESSION', 'zlib')
+OCR_RESULT_COMPRESSION_MIN_SIZE = 512  # bytes, smaller results stay uncompressed
+OCR_RESULT_STREAM_CHUNK_SIZE = 64 * 1024  # bytes per chunk of ?format=txt|ndjson downloads
 
 # OCR Configuration
-OCR_ALLOWED_EXTENSIONS = ['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'gif']
+OCR_ALLOWED_EXTENSIONS = ['jpg', 'jpeg', 'png', 'bmp', 'tiff', 'gif', 'pdf']
 OCR_MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-OCR_TESSERACT_LANG = 'eng'
+OCR_TESSERACT_LANG = os.getenv('OCR_TESSERACT_LANG', 'eng')  # when a job names no languages
+OCR_TESSERACT_CONFIG = '--psm 3'
+# Tesseract binary; unset means look it up on PATH
+# (e.g. TESSERACT_CMD=C:\Tesseract-OCR\tesseract.exe on Windows)
+OCR_TESSERACT_CMD = os.getenv('TESSERACT_CMD')
 OCR_UPLOAD_PATH = 'uploads/images/'
 
+# Upload pre-flight (see ocr.services.preflight): header-only dimension
+# bounds, plus an optional text-presence check on a small grayscale sample
+OCR_UPLOAD_MAX_PIXELS = 50_000_000  # decompression-bomb guard
+OCR_UPLOAD_MAX_SIDE = 20000
+OCR_UPLOAD_MIN_SIDE = 8
+OCR_UPLOAD_TEXT_CHECK = os.getenv('OCR_UPLOAD_TEXT_CHECK', 'False') == 'True'
+OCR_UPLOAD_TEXT_CHECK_SIDE = 256  # longest side of the sample, pixels
+OCR_UPLOAD_MIN_CONTRAST = 16  # 1st-99th percentile spread of the sample
+OCR_UPLOAD_MIN_EDGE_DENSITY = 0.001  # share of pixels at a sharp step
+
+# Upload ingestion (see ocr.services.ingest): 'disk' stores every upload
+# before OCR; 'memory' hands in-memory uploads straight to 'eager',
+# 'thread' and 'process' workers (not Celery) and stores the original in
+# the background ('keep') or never ('none'; results stay, but the image
+# cannot be viewed or re-processed)
+OCR_INGEST_MODE = os.getenv('OCR_INGEST_MODE', 'disk')
+OCR_INGEST_RETENTION = os.getenv('OCR_INGEST_RETENTION', 'keep')
+OCR_INGEST_MAX_BUFFERED_BYTES = 256 * 1024 * 1024  # uploads waiting in memory
+OCR_INGEST_PERSIST_WORKERS = 2
+
+# Upload previews for the admin (see ocr.services.thumbnails): rendered
+# during OCR or, after a miss, in the background; keyed by content hash
+# and evicted least recently used first. Kept outside MEDIA_ROOT, which
+# is served to anyone, so only the staff-only view can read them.
+OCR_THUMBNAILS_ENABLED = os.getenv('OCR_THUMBNAILS_ENABLED', 'True') == 'True'
+OCR_THUMBNAIL_DIR = Path(os.getenv('OCR_THUMBNAIL_DIR', BASE_DIR / 'thumbnail_cache'))
+OCR_THUMBNAIL_SIZES = {'thumb': 96, 'preview': 600}  # longest edge in pixels
+OCR_THUMBNAIL_QUALITY = 80  # JPEG quality
+OCR_THUMBNAIL_MAX_BYTES = 512 * 1024 * 1024
+OCR_THUMBNAIL_EVICT_TO = 0.9  # fraction of the budget left after eviction
+OCR_THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60  # browser cache lifetime, seconds
+OCR_THUMBNAIL_RETRY_AFTER = 5  # seconds, sent while a missing thumbnail renders
+
+# Periodic cleanup (ocr.cleanup_old_jobs task, cleanup_jobs command)
+OCR_CLEANUP_DAYS = 7  # finished jobs older than this are deleted
+OCR_CLEANUP_CHUNK_SIZE = 500  # jobs per delete transaction
+OCR_CLEANUP_FILE_WORKERS = 8  # threads deleting image files
+OCR_CLEANUP_SWEEP_ORPHANS = True
+OCR_CLEANUP_ORPHAN_GRACE = 24 * 60 * 60  # seconds before an unreferenced upload is swept
+
+# EasyOCR readers are loaded lazily per process (see ocr.services.reader_pool)
+OCR_LANGUAGES = ['en']
+OCR_USE_GPU = False
+OCR_WARMUP_ON_WORKER_START = True  # only when OCR_ENGINE uses EasyOCR
+OCR_WARMUP_LANGUAGES = [OCR_LANGUAGES]
+
+# Recognition engine (see ocr.services.engines):
+#   'easyocr'   - neural detector and recognizer
+#   'tesseract' - Tesseract only, fast on clean printed pages
+#   'cascade'   - OCR_CASCADE_PRIMARY first, lines it is unsure about
+#                 (confidence < OCR_CASCADE_CONFIDENCE) re-read by
+#                 OCR_CASCADE_FALLBACK; whole pages escalate when at least
+#                 OCR_CASCADE_PAGE_ESCALATION of their lines are unsure
+OCR_ENGINE = os.getenv('OCR_ENGINE', 'easyocr')
+OCR_CASCADE_PRIMARY = 'tesseract'
+OCR_CASCADE_FALLBACK = 'easyocr'
+OCR_CASCADE_CONFIDENCE = 0.6
+OCR_CASCADE_PAGE_ESCALATION = 0.5
+
+# Preprocessing pipeline (see ocr.services.preprocessing); uploads may
+# override the stages with the 'preprocess' field. With auto-skip, a stage
+# is skipped when cheap image statistics show it is not needed.
+OCR_PREPROCESS_STAGES = ['equalize', 'denoise', 'threshold']
+OCR_PREPROCESS_AUTO_SKIP = True
+OCR_PREPROCESS_MIN_CONTRAST = 200  # 1st-99th percentile spread that skips 'equalize'
+OCR_PREPROCESS_NOISE_THRESHOLD = 2.0  # noise sigma below which 'denoise' is skipped
+OCR_PREPROCESS_BILEVEL_FRACTION = 0.97  # near black/white share that skips 'threshold'
+
+# Full-text search over extracted text (see ocr.services.search):
+#   'auto'     - 'fulltext' on MySQL, 'fts5' on SQLite with FTS5, else 'terms'
+#   'fulltext' - MySQL FULLTEXT index
+#   'fts5'     - SQLite FTS5 table
+#   'terms'    - portable inverted index table
+# Jobs are indexed as they finish; run rebuild_search_index for older ones,
+# and once to shrink documents written before they held tokens only.
+OCR_SEARCH_ENABLED = True
+OCR_SEARCH_BACKEND = os.getenv('OCR_SEARCH_BACKEND', 'auto')
+OCR_SEARCH_PAGE_SIZE = 20
+OCR_SEARCH_MAX_PAGE_SIZE = 100
+OCR_SEARCH_SNIPPET_LENGTH = 160  # characters of context per hit
+OCR_SEARCH_ADMIN_LIMIT = 1000  # matches the admin's text search considers
+
+# Job listing API (GET /api/ocr/jobs/, POST /api/ocr/jobs/status)
+OCR_JOBS_PAGE_SIZE = 100
+OCR_JOBS_MAX_PAGE_SIZE = 1000
+OCR_JOBS_STATUS_MAX_IDS = 1000
+
+# Admin job list: counts above this many rows are estimated from table
+# statistics (unfiltered) or shown as "more than" (filtered)
+OCR_ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Content-hash deduplication of uploads (see ocr.services.dedup)
+OCR_DEDUP_ENABLED = True
+OCR_DEDUP_TTL = 7 * 24 * 60 * 60  # seconds a result stays reusable, None = forever
+OCR_DEDUP_STATS_CACHE = 'metrics'  # hit/miss counters, never culled
+
+# Batch uploads (POST /api/ocr/batch/)
+OCR_BATCH_MAX_SIZE = 20
+OCR_BATCH_PREPROCESS_WORKERS = 4
+OCR_BATCH_RECOGNIZER_SIZE = 16  # text crops per recognizer forward pass
+OCR_BATCH_BUCKET_STEP = 128  # pixels; images whose sides round up alike share a detector pass
+
+# Adaptive downscaling and tiling before recognition (see ocr.services.scaling)
+OCR_TARGET_TEXT_HEIGHT = 32  # pixels, None disables text-height scaling
+OCR_TEXT_HEIGHT_MIN_COMPONENTS = 20
+OCR_MIN_SCALE = 0.25
+OCR_MAX_PIXELS = 6_000_000  # downscale cap when tiling is disabled
+OCR_TILING_ENABLED = False
+OCR_TILING_MIN_PIXELS = 8_000_000
+OCR_TILE_SIZE = 1600
+OCR_TILE_OVERLAP = 128  # must exceed the tallest expected text line
+OCR_TILE_WORKERS = 4
+
+# Multi-page TIFF/GIF/PDF documents (see ocr.services.pages)
+OCR_PAGE_CONCURRENCY = 2  # pages decoded and recognized at the same time
+OCR_PDF_RENDER_DPI = 200
+OCR_MAX_PAGES = 500  # longer documents are refused at upload and by workers
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -254,19 +496,3 @@ os.makedirs(BASE_DIR / 'logs', exist_ok=True)
 os.makedirs(MEDIA_ROOT / OCR_UPLOAD_PATH, exist_ok=True)
 
 
-
-# settings.py ke bilkul niche add karein (bus pass karne ke liye  banana hai !)
-# 1. Quick Fix: Redis ko Bypass Karein (No Installation Required)
-# Agar aap abhi Redis setup nahi karna chahte aur chahte hain ki image turant upload ho kar process ho jaye, toh apne ocr_backend/settings.py mein ye do lines niche add kar dein:
-CELERY_TASK_ALWAYS_EAGER = True
-CELERY_BROKER_URL = 'memory://'
-CELERY_RESULT_BACKEND = 'rpc://'
-
-
-
-# settings.py
-
-CELERY_RESULT_BACKEND = 'django-db'
-CELERY_ACCEPT_CONTENT = ['json']
-CELERY_TASK_SERIALIZER = 'json'
-CELERY_RESULT_SERIALIZER = 'json'
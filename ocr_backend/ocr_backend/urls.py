@@ -20,7 +20,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from ocr.views import HealthCheckView
+from ocr.views import HealthCheckView, MetricsView
 
 urlpatterns = [
     # Admin interface
@@ -28,6 +28,7 @@ urlpatterns = [
     
     # Health check endpoint
     path('health', HealthCheckView.as_view(), name='health'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     
     # OCR API endpoints
     path('api/', include('ocr.urls')),